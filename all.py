@@ -1,8 +1,22 @@
 from customtkinter import *
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 import pygame
+import os
 import sys
-from queue import Queue, PriorityQueue
+from collections import deque
+
+import astar_solver
+import dial_solver
+import dungeon_io
+import instrumentation
+import jps_solver
+import hpa_solver
+import lpa_solver
+import reachability
+import result_cache
+from renderer import MIN_CELL_SIZE, DirtyRectRenderer, PixelArrayRenderer
+from search_events import CLOSED, DEFAULT_SPEED, FPS, FRAME_BUDGET, OPEN, PATH, SPEEDS, Playback, map_events, speed_name
+from search_trace import SearchTrace, TraceCursor
 
 # Define colors
 RED = (255, 0, 0)
@@ -15,22 +29,58 @@ PURPLE = (128, 0, 128)
 ORANGE = (255, 165, 0)
 GREY = (128, 128, 128)
 TURQUOISE = (64, 224, 208)
+SAND = (238, 214, 175)
+MUD = (101, 67, 33)
+
+# Tile costs the number keys paint with (0 paints walls); dearer terrain is
+# drawn darker, from sand to mud, and costs above the highest as it
+MAX_BRUSH_COST = 9
+
+def terrain_color(cost):
+    if cost <= 1:
+        return WHITE
+    shade = (min(cost, MAX_BRUSH_COST) - 2) / (MAX_BRUSH_COST - 2)
+    return tuple(round(light + (dark - light) * shade) for light, dark in zip(SAND, MUD))
 
 pygame.init()
 
+# Search counters and phase times, switched on with SEARCH_PROFILE (see instrumentation)
+PROFILER = instrumentation.from_environment()
+
+# Finished searches by grid contents, so re-running an unchanged grid shows the
+# path at once; SEARCH_CACHE_DIR keeps them on disk too (see result_cache)
+RESULT_CACHE = result_cache.ResultCache(directory=os.environ.get("SEARCH_CACHE_DIR"))
+
 class Spot:
+    # Spots whose colour changed since the last frame, drained by the renderer;
+    # None while nothing is rendering
+    changed = None
+
     def __init__(self, row, col, width, height, total_rows, total_cols):
         self.row = row
         self.col = col
         self.x = col * width
         self.y = row * height
-        self.color = WHITE
+        self._color = WHITE
+        # Cost of stepping onto this spot when it isn't a barrier
+        self.cost = 1
         self.neighbors = []
         self.width = width
         self.height = height
         self.total_rows = total_rows
         self.total_cols = total_cols
 
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, color):
+        if color != self._color:
+            self._color = color
+            if Spot.changed is not None:
+                Spot.changed.append(self)
+
     def get_pos(self):
         return self.row, self.col
 
@@ -50,7 +100,11 @@ class Spot:
         return self.color == TURQUOISE
 
     def reset(self):
-        self.color = WHITE
+        self.color = terrain_color(self.cost)
+
+    def make_terrain(self, cost):
+        self.cost = cost
+        self.reset()
 
     def make_start(self):
         self.color = ORANGE
@@ -87,6 +141,24 @@ class Spot:
         if self.col > 0 and not grid[self.row][self.col - 1].is_barrier():
             self.neighbors.append(grid[self.row][self.col - 1])
 
+def grid_cells(grid):
+    """One byte per spot as in dungeon_io: 0 for barriers, otherwise the spot's cost."""
+    return bytearray(0 if spot.is_barrier() else spot.cost for row in grid for spot in row)
+
+def place_dungeon(grid, dungeon):
+    """Lay a dungeon_io.Dungeon onto the grid; return its start and end spots."""
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    for index, cost in enumerate(dungeon.reachable):
+        if not cost:
+            spot_at(index).make_barrier()
+        elif cost > 1:
+            spot_at(index).make_terrain(cost)
+    start, end = spot_at(dungeon.start), spot_at(dungeon.goal)
+    start.make_start()
+    end.make_end()
+    return start, end
+
 def make_grid(rows, cols, win_width, win_height):
     grid = []
     cell_width = win_width // cols
@@ -106,15 +178,23 @@ def draw_grid(win, rows, cols, win_width, win_height):
     for j in range(cols):
         pygame.draw.line(win, GREY, (j * cell_width, 0), (j * cell_width, win_height))
 
-def draw(win, grid, rows, cols, win_width, win_height):
-    win.fill(WHITE)
+def clear_search(grid):
     for row in grid:
         for spot in row:
-            spot.draw(win)
-    draw_grid(win, rows, cols, win_width, win_height)
-    pygame.display.update()
+            if spot.is_open() or spot.is_closed() or spot.color == PURPLE:
+                spot.reset()
 
-def get_clicked_pos(pos, rows, cols, win_width, win_height):
+def make_renderer(win, grid, rows, cols, win_width, win_height):
+    # Cells too small for a rectangle and grid lines each are drawn as a zoomable pixel array
+    if min(win_width // cols, win_height // rows) < MIN_CELL_SIZE:
+        return PixelArrayRenderer(win, grid, Spot.changed, GREY, transposed=True)
+    return DirtyRectRenderer(win, grid, Spot.changed,
+                             lambda surface: draw_grid(surface, rows, cols, win_width, win_height))
+
+def get_clicked_pos(pos, rows, cols, win_width, win_height, view):
+    # None off the grid of a zoomed pixel array
+    if isinstance(view, PixelArrayRenderer):
+        return view.cell_at(pos)
     cell_width = win_width // cols
     cell_height = win_height // rows
     x, y = pos
@@ -126,144 +206,434 @@ def get_clicked_pos(pos, rows, cols, win_width, win_height):
         col = cols - 1
     return row, col
 
-def astar_algorithm(draw, grid, start, end):
-    count = 0
-    open_set = PriorityQueue()
-    open_set.put((0, count, start))
-    came_from = {}
-    g_score = {spot: float("inf") for row in grid for spot in row}
-    g_score[start] = 0
-    f_score = {spot: float("inf") for row in grid for spot in row}
-    f_score[start] = h(start.get_pos(), end.get_pos())
-    open_set_hash = {start}
-
-    nodes_expanded = 0
-
-    while not open_set.empty():
-        current = open_set.get()[2]
-        open_set_hash.remove(current)
-        nodes_expanded += 1
-
-        if current == end:
-            path_length = reconstruct_path(came_from, end, draw)
-            end.make_end()
-            messagebox.showinfo("Path Information", f"Nodes Expanded: {nodes_expanded}\nPath Length: {path_length}")
-            return True
-
-        for neighbor in current.neighbors:
-            temp_g_score = g_score[current] + 1
-
-            if temp_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = temp_g_score
-                f_score[neighbor] = temp_g_score + h(neighbor.get_pos(), end.get_pos())
-                if neighbor not in open_set_hash:
-                    count += 1
-                    open_set.put((f_score[neighbor], count, neighbor))
-                    open_set_hash.add(neighbor)
-                    neighbor.make_open()
-
-        draw()
-
-        if current != start:
-            current.make_closed()
-
-    messagebox.showinfo("Path Information", "No path found.")
-    return False
-
-def h(p1, p2):
-    x1, y1 = p1
-    x2, y2 = p2
-    return abs(x1 - x2) + abs(y1 - y2)
-
-def reconstruct_path(came_from, current, draw):
+# How each search event recolours a spot; start, end and barriers keep their colours
+EVENT_COLORS = {OPEN: Spot.make_open, CLOSED: Spot.make_closed, PATH: Spot.make_path}
+
+def apply_event(event):
+    kind, spot = event
+    if not (spot.is_start() or spot.is_end() or spot.is_barrier()):
+        EVENT_COLORS[kind](spot)
+
+# The algorithms below are generators of search_events over spots that return
+# the message to show once the main loop has played them back.
+
+def astar_algorithm(grid, start, end, heuristic="manhattan", tie_break="fifo"):
+    # The engine works on integer indices; map them back to spots here
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    neighbors = lambda index: [spot.row * cols + spot.col for spot in spot_at(index).neighbors]
+    start_index, end_index = start.row * cols + start.col, end.row * cols + end.col
+    landmarks = None
+    if heuristic == "alt":
+        landmarks = astar_solver.Landmarks(neighbors, len(grid) * cols, first=start_index)
+
+    path, nodes_expanded = yield from map_events(astar_solver.iter_astar(
+        start_index,
+        end_index,
+        neighbors,
+        astar_solver.make_heuristic(heuristic, end_index, cols, landmarks),
+        tie_break=astar_solver.make_tie_breaker(tie_break, start_index, end_index, cols),
+    ), spot_at)
+
+    if path is not None:
+        for index in reversed(path):
+            yield PATH, spot_at(index)
+        return f"Nodes Expanded: {nodes_expanded}\nPath Length: {len(path) - 1}"
+
+    return "No path found."
+
+def reconstruct_path(came_from, current):
     path_length = 0
     while current in came_from:
         current = came_from[current]
-        current.make_path()
-        draw()
+        yield PATH, current
         path_length += 1
     return path_length
 
-def bfs_algorithm(draw, grid, start, end):
+def bfs_algorithm(grid, start, end):
     print("--- Starting BFS algorithm ---\n")
-    queue = Queue()
-    queue.put(start)
+    queue = deque([start])
     came_from = {}
-    visited = {spot: False for row in grid for spot in row}
-    visited[start] = True
+    visited = {start}
 
     nodes_expanded = 0
 
-    while not queue.empty():
-        current = queue.get()
+    while queue:
+        current = queue.popleft()
         nodes_expanded += 1
 
         if current == end:
-            path_length = reconstruct_path(came_from, current, draw)
-            end.make_end()
-            messagebox.showinfo("Path Information", f"Nodes Expanded: {nodes_expanded}\nPath Length: {path_length}")
-            return True
+            path_length = yield from reconstruct_path(came_from, current)
+            return f"Nodes Expanded: {nodes_expanded}\nPath Length: {path_length}"
 
         for neighbor in current.neighbors:
-            if not visited[neighbor] and not neighbor.is_barrier():
+            if neighbor not in visited and not neighbor.is_barrier():
                 came_from[neighbor] = current
-                visited[neighbor] = True
-                queue.put(neighbor)
-                neighbor.make_open()
+                visited.add(neighbor)
+                queue.append(neighbor)
+                yield OPEN, neighbor
 
-        draw()
+        yield CLOSED, current
 
-        if current != start:
-            current.make_closed()
+    return "No path found."
 
-    messagebox.showinfo("Path Information", "No path found.")
-    return False
+def bidirectional_bfs_algorithm(grid, start, end):
+    # Frontiers grow from both corners; side 0 is the start's, side 1 the end's
+    frontiers = (deque([start]), deque([end]))
+    came_from = ({}, {})
+    side = {start: 0, end: 1}
+    depth = {start: 0, end: 0}
 
-def main(win, width, height, rows, cols, algorithm):
-    grid = make_grid(rows, cols, width, height)
-    start = grid[0][0]
-    start.make_start()
-    end = grid[rows - 1][cols - 1]
-    end.make_end()
+    nodes_expanded = 0
+
+    while frontiers[0] and frontiers[1]:
+        # Expand one whole layer of the smaller frontier
+        expanding = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        queue = frontiers[expanding]
+        meeting = None
+
+        for _ in range(len(queue)):
+            current = queue.popleft()
+            nodes_expanded += 1
+            for neighbor in current.neighbors:
+                if neighbor.is_barrier():
+                    continue
+                if neighbor not in side:
+                    side[neighbor] = expanding
+                    depth[neighbor] = depth[current] + 1
+                    came_from[expanding][neighbor] = current
+                    queue.append(neighbor)
+                    yield OPEN, neighbor
+                elif side[neighbor] != expanding:
+                    length = depth[current] + 1 + depth[neighbor]
+                    if meeting is None or length < meeting[0]:
+                        meeting = (length, current, neighbor)
+
+            yield CLOSED, current
+
+        if meeting:
+            path_length, meet_start, meet_end = meeting
+            if expanding == 1:
+                meet_start, meet_end = meet_end, meet_start
+            for came, spot in ((came_from[0], meet_start), (came_from[1], meet_end)):
+                while spot in came:
+                    yield PATH, spot
+                    spot = came[spot]
+            return f"Nodes Expanded: {nodes_expanded}\nPath Length: {path_length}"
+
+    return "No path found."
+
+def jps_algorithm(grid, start, end):
+    # The engine works on x * height + y indices with x = row and y = col
+    rows, cols = len(grid), len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    open_cells = bytearray(not spot.is_barrier() for row in grid for spot in row)
+
+    path, jump_points = yield from map_events(jps_solver.iter_jump_point_search(
+        open_cells, rows, cols,
+        start.row * cols + start.col,
+        end.row * cols + end.col,
+    ), spot_at)
+
+    if path is not None:
+        for index in reversed(path):
+            yield PATH, spot_at(index)
+        return f"Jump Points Expanded: {jump_points}\nPath Length: {len(path) - 1}"
+
+    return "No path found."
+
+def lpa_algorithm(grid, start, end, planner):
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+
+    # Clear the previous run's colours so the repaired region stands out
+    clear_search(grid)
+
+    # Newly blocked cells are expanded too, to raise their distance; apply_event leaves them black
+    path, nodes_expanded = yield from map_events(planner.iter_compute_path(), spot_at)
+
+    if path is not None:
+        for index in reversed(path):
+            yield PATH, spot_at(index)
+        return f"Nodes Expanded: {nodes_expanded}\nPath Length: {len(path) - 1}"
+
+    return "No path found."
+
+def hpa_algorithm(grid, start, end, hierarchy):
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+
+    # Only the abstract nodes (cluster entrances) are searched; the path is refined afterwards
+    path, nodes_expanded = yield from map_events(
+        hierarchy.iter_find_path(start.row * cols + start.col, end.row * cols + end.col), spot_at)
+
+    if path is not None:
+        for index in reversed(path):
+            yield PATH, spot_at(index)
+        return f"Abstract Nodes Expanded: {nodes_expanded}\nPath Length: {len(path) - 1}"
+
+    return "No path found."
+
+def dial_algorithm(grid, start, end):
+    # The engine works on x * height + y indices with x = row and y = col
+    rows, cols = len(grid), len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    cells = grid_cells(grid)
+
+    path, nodes_expanded = yield from map_events(dial_solver.iter_dial_search(
+        cells, rows, cols, start.row * cols + start.col, end.row * cols + end.col), spot_at)
+
+    if path is not None:
+        for index in reversed(path):
+            yield PATH, spot_at(index)
+        return (f"Nodes Expanded: {nodes_expanded}\nPath Length: {len(path) - 1}\n"
+                f"Path Cost: {dial_solver.path_cost(cells, path)}")
+
+    return "No path found."
+
+def cached_algorithm(grid, cached):
+    cols = len(grid[0])
+    clear_search(grid)
+    message = yield from result_cache.replay_path(cached, lambda index: grid[index // cols][index % cols])
+    return f"{message}\n(cached result)"
+
+def walled_off_algorithm(grid):
+    # The princess's component doesn't touch the knight's, so there is nothing to search
+    clear_search(grid)
+    return "No path found."
+    yield
+
+def main(win, width, height, rows, cols, algorithm, heuristic="manhattan", tie_break="fifo", speed=DEFAULT_SPEED,
+         dungeon=None):
+    with PROFILER.phase("grid_build"):
+        grid = make_grid(rows, cols, width, height)
+        if dungeon is not None:
+            start, end = place_dungeon(grid, dungeon)
+        else:
+            start = grid[0][0]
+            start.make_start()
+            end = grid[rows - 1][cols - 1]
+            end.make_end()
     run = True
 
+    # Only spots whose colour changed are repainted each frame
+    Spot.changed = []
+    view = make_renderer(win, grid, rows, cols, width, height)
+    draw = view.render
+
+    # The LPA* planner and the HPA* clusters outlive a single run; barrier edits are reported to them
+    planner = None
+    hierarchy = None
+
+    # Components of the open spots, kept once a search finds no path so later
+    # hopeless runs are answered at once; only opened spots are merged in
+    components = None
+
+    def barrier_changed(spot):
+        nonlocal components
+        index = spot.row * cols + spot.col
+        if planner is not None:
+            planner.open_cells[index] = not spot.is_barrier()
+            planner.update_cells([index])
+        if hierarchy is not None:
+            hierarchy.open_cells[index] = not spot.is_barrier()
+            hierarchy.update_cells([index])
+        if components is not None:
+            if spot.is_barrier():
+                components = None
+            else:
+                components.open_cells[index] = 1
+                components.cells_opened([index])
+
+    # The running search, played back a frame's worth of events at a time
+    playback = None
+    clock = pygame.time.Clock()
+
+    # Left clicks paint walls, or terrain of this cost once a number key picks one
+    brush = None
+
+    def show_status():
+        brush_name = "walls" if brush is None else f"cost {brush}"
+        pygame.display.set_caption(f"Rescuing the Princess - speed: {speed_name(speed)} (up/down to change)"
+                                   f" - brush: {brush_name} (0-{MAX_BRUSH_COST} to change)")
+
+    show_status()
     while run:
-        draw(win, grid, rows, cols, width, height)
+        if playback is not None and playback.advance(FRAME_BUDGET):
+            PROFILER.report(engine=algorithm, width=rows, height=cols)
+            if not playback.found_path and components is None:
+                open_cells = bytearray(not spot.is_barrier() for row in grid for spot in row)
+                components = reachability.ReachabilityIndex(open_cells, rows, cols)
+            # Show the finished path before the blocking message box
+            draw()
+            messagebox.showinfo("Path Information", playback.result)
+            playback = None
+        draw()
+        clock.tick(FPS)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
+            if view.handle_event(event):
+                continue
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    for row in grid:
-                        for spot in row:
-                            spot.update_neighbors(grid)
-
-                    if algorithm == "astar":
-                        astar_algorithm(lambda: draw(win, grid, rows, cols, width, height), grid, start, end)
+                if event.key == pygame.K_SPACE and playback is None:
+                    with PROFILER.phase("grid_build"):
+                        for row in grid:
+                            for spot in row:
+                                spot.update_neighbors(grid)
+
+                    open_cells = grid_cells(grid)
+                    start_index, end_index = start.row * cols + start.col, end.row * cols + end.col
+                    key = result_cache.make_key(
+                        result_cache.grid_digest(open_cells, rows, cols, start_index, end_index),
+                        frontend="all", engine=algorithm, heuristic=heuristic, tie_break=tie_break)
+                    cached = RESULT_CACHE.get(key)
+
+                    search = None
+                    if cached is not None:
+                        search = cached_algorithm(grid, cached)
+                    elif components is not None and not components.connected(start_index, end_index):
+                        search = walled_off_algorithm(grid)
+                    elif algorithm == "astar":
+                        search = astar_algorithm(grid, start, end, heuristic, tie_break)
                     elif algorithm == "bfs":
-                        bfs_algorithm(lambda: draw(win, grid, rows, cols, width, height), grid, start, end)
+                        search = bfs_algorithm(grid, start, end)
+                    elif algorithm == "bibfs":
+                        search = bidirectional_bfs_algorithm(grid, start, end)
+                    elif algorithm == "jps":
+                        search = jps_algorithm(grid, start, end)
+                    elif algorithm == "dial":
+                        search = dial_algorithm(grid, start, end)
+                    elif algorithm == "lpa":
+                        if planner is None:
+                            planner = lpa_solver.LPAStar(open_cells, rows, cols, start_index, end_index)
+                        search = lpa_algorithm(grid, start, end, planner)
+                    elif algorithm == "hpa":
+                        if hierarchy is None:
+                            hierarchy = hpa_solver.HierarchicalPlanner(open_cells, rows, cols)
+                        search = hpa_algorithm(grid, start, end, hierarchy)
+                    if search is not None and cached is None:
+                        search = result_cache.record_path(search, RESULT_CACHE, key,
+                                                          lambda spot: spot.row * cols + spot.col)
+                    if search is not None:
+                        playback = Playback(PROFILER.watch(search), apply_event, speed)
+
+                # Step through the playback speeds, up to "instant"
+                if event.key in (pygame.K_UP, pygame.K_DOWN):
+                    step = 1 if event.key == pygame.K_UP else -1
+                    speed = min(max(speed + step, 0), len(SPEEDS) - 1)
+                    if playback is not None:
+                        playback.level = speed
+                    show_status()
+
+                # Pick the brush: 0 for walls, 1 to MAX_BRUSH_COST for terrain of that cost
+                if pygame.K_0 <= event.key <= pygame.K_0 + MAX_BRUSH_COST:
+                    brush = event.key - pygame.K_0 or None
+                    show_status()
 
                 if event.key == pygame.K_c:
                     for row in grid:
                         for spot in row:
                             if spot != start and spot != end:
-                                spot.reset()
-
-        # Handle mouse clicks outside the event loop
+                                spot.make_terrain(1)
+                    planner = None
+                    hierarchy = None
+                    components = None
+                    playback = None
+
+        # Handle mouse clicks outside the event loop; the grid can't be edited under a running search
+        if playback is not None:
+            continue
         if pygame.mouse.get_pressed()[0]:  # Left mouse button
             pos = pygame.mouse.get_pos()
-            row, col = get_clicked_pos(pos, rows, cols, width, height)
-            spot = grid[row][col]
-            if spot != start and spot != end:
-                spot.make_barrier()
+            cell = get_clicked_pos(pos, rows, cols, width, height, view)
+            spot = None if cell is None else grid[cell[0]][cell[1]]
+            if spot is not None and spot != start and spot != end:
+                was_barrier = spot.is_barrier()
+                if brush is None:
+                    spot.make_barrier()
+                else:
+                    spot.make_terrain(brush)
+                if spot.is_barrier() != was_barrier:
+                    barrier_changed(spot)
         elif pygame.mouse.get_pressed()[2]:  # Right mouse button
             pos = pygame.mouse.get_pos()
-            row, col = get_clicked_pos(pos, rows, cols, width, height)
-            spot = grid[row][col]
-            if spot != start and spot != end:
-                spot.reset()
+            cell = get_clicked_pos(pos, rows, cols, width, height, view)
+            spot = None if cell is None else grid[cell[0]][cell[1]]
+            if spot is not None and spot != start and spot != end:
+                was_barrier = spot.is_barrier()
+                spot.make_terrain(1)
+                if was_barrier:
+                    barrier_changed(spot)
+
+    pygame.quit()
+
+def replay(win, width, height, trace, speed=DEFAULT_SPEED):
+    """Play back a trace recorded by "bfs_solver.py --trace".
+
+    Space pauses and resumes, left/right step back and forth by 1% of the
+    trace, home/end and the number keys jump to the start, the end or that
+    many tenths of the way, and up/down change the speed.
+    """
+    rows, cols = trace.width, trace.height
+    grid = make_grid(rows, cols, width, height)
+    spot_at = lambda index: grid[index // cols][index % cols]
+    for index, cost in enumerate(trace.open_cells):
+        if not cost:
+            spot_at(index).make_barrier()
+        elif cost > 1:
+            spot_at(index).make_terrain(cost)
+    spot_at(trace.start).make_start()
+    spot_at(trace.goal).make_end()
+    path = trace.path()
+    summary = f"{trace.engine}, path length {len(path) - 1 if path else 'none'}, {trace.nodes_expanded} nodes expanded"
+
+    Spot.changed = []
+    view = make_renderer(win, grid, rows, cols, width, height)
+    draw = view.render
+    apply = lambda event: apply_event((event[0], spot_at(event[1])))
+    cursor = TraceCursor(trace, apply, lambda: clear_search(grid))
+    playback = Playback(cursor.play(), apply, speed)
+    scrub = max(len(trace) // 100, 1)
+    clock = pygame.time.Clock()
+    run = True
+
+    while run:
+        if playback is not None and playback.advance(FRAME_BUDGET):
+            playback = None
+        draw()
+        pygame.display.set_caption(f"Replay ({summary}) - step {cursor.step}/{len(trace)} - speed: {speed_name(speed)}")
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            if view.handle_event(event):
+                continue
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    if playback is not None:
+                        playback = None
+                    else:
+                        if cursor.step == len(trace):
+                            cursor.seek(0)
+                        playback = Playback(cursor.play(), apply, speed)
+                elif event.key == pygame.K_LEFT:
+                    cursor.seek(cursor.step - scrub)
+                elif event.key == pygame.K_RIGHT:
+                    cursor.seek(cursor.step + scrub)
+                elif event.key == pygame.K_HOME:
+                    cursor.seek(0)
+                elif event.key == pygame.K_END:
+                    cursor.seek(len(trace))
+                elif pygame.K_0 <= event.key <= pygame.K_9:
+                    cursor.seek(len(trace) * (event.key - pygame.K_0) // 10)
+                elif event.key in (pygame.K_UP, pygame.K_DOWN):
+                    step = 1 if event.key == pygame.K_UP else -1
+                    speed = min(max(speed + step, 0), len(SPEEDS) - 1)
+                    if playback is not None:
+                        playback.level = speed
 
     pygame.quit()
 
@@ -301,26 +671,35 @@ def display_algorithm_gui():
     window = CTk()
     window.title("Rescuing the Princess | Visualizer")
     window.configure(bg="#242424")
-    app_width, app_height = 420, 260
+    app_width, app_height = 420, 320
     screen_width, screen_height = window.winfo_screenwidth(), window.winfo_screenheight()
     x, y = (screen_width / 2) - (app_width / 2), (screen_height / 2) - (app_height / 2)
     window.geometry(f'{app_width}x{app_height}+{int(x)}+{int(y)}')
     window.resizable(0, 0)
 
     label1 = CTkLabel(window, text="Algorithm", fg_color="transparent", font=("calibri", 15), text_color="#00FF89")
-    label1.place(relx=0.5, rely=0.15, anchor=CENTER)
+    label1.place(relx=0.5, rely=0.12, anchor=CENTER)
 
     choice = StringVar()
-    combobox1 = CTkComboBox(window, values=["A* Algorithm", "BFS Algorithm"], variable=choice, state="readonly", button_color="#00FF89")
+    combobox1 = CTkComboBox(window, values=["A* Algorithm", "BFS Algorithm", "Bidirectional BFS", "Jump Point Search", "LPA* (incremental)", "HPA* (hierarchical)", "Dial (tile costs)"], variable=choice, state="readonly", button_color="#00FF89")
     combobox1.set("A* Algorithm")
-    combobox1.place(relx=0.5, rely=0.30, anchor=CENTER)
+    combobox1.place(relx=0.5, rely=0.24, anchor=CENTER)
 
     label2 = CTkLabel(window, text="Grid Dimensions (e.g., 10x5)", fg_color="transparent", font=("calibri", 15), text_color="#FF0099")
-    label2.place(relx=0.5, rely=0.50, anchor=CENTER)
+    label2.place(relx=0.5, rely=0.40, anchor=CENTER)
 
     gridDimension = StringVar()
     entryGridDimension = CTkEntry(window, textvariable=gridDimension, width=120, placeholder_text="e.g., 10x5")
-    entryGridDimension.place(relx=0.5, rely=0.65, anchor=CENTER)
+    entryGridDimension.place(relx=0.5, rely=0.52, anchor=CENTER)
+
+    # Playback speed of the search, from one event per frame up to "instant"
+    speed_label = CTkLabel(window, text=f"Speed: {speed_name(DEFAULT_SPEED)}", fg_color="transparent", font=("calibri", 15), text_color="#00FF89")
+    speed_label.place(relx=0.5, rely=0.66, anchor=CENTER)
+
+    speed_slider = CTkSlider(window, from_=0, to=len(SPEEDS) - 1, number_of_steps=len(SPEEDS) - 1, button_color="#FF0099",
+                             command=lambda value: speed_label.configure(text=f"Speed: {speed_name(round(value))}"))
+    speed_slider.set(DEFAULT_SPEED)
+    speed_slider.place(relx=0.5, rely=0.76, anchor=CENTER)
 
     def parse_grid_dimensions(dim_str):
         parts = dim_str.lower().split('x')
@@ -338,19 +717,64 @@ def display_algorithm_gui():
 
     def runner():
         grid_dims = parse_grid_dimensions(gridDimension.get())
-        algorithm_choice = choice.get()
         if grid_dims:
             rows, cols = grid_dims
-            if algorithm_choice == "A* Algorithm":
-                algorithm = "astar"
-            elif algorithm_choice == "BFS Algorithm":
-                algorithm = "bfs"
-            main(pygame.display.set_mode((WIDTH, HEIGHT)), WIDTH, HEIGHT, rows, cols, algorithm)
+            main(pygame.display.set_mode((WIDTH, HEIGHT)), WIDTH, HEIGHT, rows, cols, chosen_algorithm(),
+                 speed=round(speed_slider.get()))
         else:
             messagebox.showerror("Error", "Invalid input.")
 
-    submit_button = CTkButton(window, text="Start", command=runner, font=('calibri', 12, 'bold'))
-    submit_button.place(relx=0.5, rely=0.85, anchor=CENTER)
+    def chosen_algorithm():
+        algorithm_choice = choice.get()
+        if algorithm_choice == "A* Algorithm":
+            return "astar"
+        elif algorithm_choice == "BFS Algorithm":
+            return "bfs"
+        elif algorithm_choice == "Bidirectional BFS":
+            return "bibfs"
+        elif algorithm_choice == "Jump Point Search":
+            return "jps"
+        elif algorithm_choice == "LPA* (incremental)":
+            return "lpa"
+        elif algorithm_choice == "HPA* (hierarchical)":
+            return "hpa"
+        elif algorithm_choice == "Dial (tile costs)":
+            return "dial"
+
+    # Starts from a text or binary dungeon file; its size replaces the entered dimensions
+    def dungeon_runner():
+        filename = filedialog.askopenfilename(filetypes=[("Dungeons", "*.txt *.dgn"), ("All files", "*.*")])
+        if not filename:
+            return
+        try:
+            with PROFILER.phase("parse"):
+                dungeon = dungeon_io.read_dungeon(filename)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Invalid Dungeon", str(error))
+            return
+        main(pygame.display.set_mode((WIDTH, HEIGHT)), WIDTH, HEIGHT, dungeon.width, dungeon.height,
+             chosen_algorithm(), speed=round(speed_slider.get()), dungeon=dungeon)
+
+    # Replays a trace recorded by "bfs_solver.py --trace" instead of solving live
+    def replay_runner():
+        filename = filedialog.askopenfilename(filetypes=[("Search traces", "*.trc"), ("All files", "*.*")])
+        if not filename:
+            return
+        try:
+            trace = SearchTrace.load(filename)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Invalid Trace", str(error))
+            return
+        replay(pygame.display.set_mode((WIDTH, HEIGHT)), WIDTH, HEIGHT, trace, speed=round(speed_slider.get()))
+
+    submit_button = CTkButton(window, text="Start", command=runner, width=120, font=('calibri', 12, 'bold'))
+    submit_button.place(relx=0.2, rely=0.90, anchor=CENTER)
+
+    dungeon_button = CTkButton(window, text="Open Dungeon", command=dungeon_runner, width=120, font=('calibri', 12, 'bold'))
+    dungeon_button.place(relx=0.5, rely=0.90, anchor=CENTER)
+
+    replay_button = CTkButton(window, text="Replay Trace", command=replay_runner, width=120, font=('calibri', 12, 'bold'))
+    replay_button.place(relx=0.8, rely=0.90, anchor=CENTER)
 
     window.mainloop()
 
@@ -0,0 +1,199 @@
+import heapq
+import math
+from array import array
+from collections import deque
+
+from search_events import CLOSED, OPEN, drive
+
+
+# A* search over integer node indices.
+#
+# The open set is a plain binary heap (heapq) instead of queue.PriorityQueue,
+# which takes a threading lock on every put and get. Improved entries are
+# pushed again and stale ones are skipped when popped (lazy deletion), and
+# g-scores live in a dict keyed by node index, so only nodes the search
+# actually touches cost any memory.
+#
+# neighbors(node) returns the nodes reachable in one unit-cost step and
+# heuristic(node) a consistent estimate of the distance to the goal.
+# tie_break(node, g, h, count) returns the secondary heap key used among
+# nodes of equal f (see make_tie_breaker); None keeps insertion order.
+# on_open(node) is called whenever a node is pushed onto the open set and
+# on_expanded(node) after a node's neighbours have been generated, which is
+# where the visualizers colour cells.
+def astar(start, goal, neighbors, heuristic, on_open=None, on_expanded=None, tie_break=None):
+    """Return ``(path, nodes_expanded)``; ``path`` is a list of nodes or None."""
+    return drive(iter_astar(start, goal, neighbors, heuristic, tie_break), on_open, on_expanded)
+
+
+def iter_astar(start, goal, neighbors, heuristic, tie_break=None):
+    """Like astar(), but yields search_events and returns ``(path, nodes_expanded)``."""
+    count = 0
+    start_h = heuristic(start)
+    open_heap = [(start_h, tie_break(start, 0, start_h, count) if tie_break else 0, count, start)]
+    g_score = {start: 0}
+    came_from = {}
+    closed = set()
+    nodes_expanded = 0
+
+    while open_heap:
+        current = heapq.heappop(open_heap)[3]
+        if current in closed:
+            continue  # stale entry left behind by a cheaper push
+        closed.add(current)
+        nodes_expanded += 1
+
+        if current == goal:
+            return reconstruct_path(came_from, current), nodes_expanded
+
+        tentative_g = g_score[current] + 1
+        for neighbor in neighbors(current):
+            if neighbor in closed:
+                continue
+            if tentative_g < g_score.get(neighbor, tentative_g + 1):
+                yield OPEN, neighbor
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                count += 1
+                neighbor_h = heuristic(neighbor)
+                key = tie_break(neighbor, tentative_g, neighbor_h, count) if tie_break else 0
+                heapq.heappush(open_heap, (tentative_g + neighbor_h, key, count, neighbor))
+
+        yield CLOSED, current
+
+    return None, nodes_expanded
+
+
+def reconstruct_path(came_from, current):
+    path = [current]
+    while current in came_from:
+        current = came_from[current]
+        path.append(current)
+    path.reverse()
+    return path
+
+
+# Heuristics. Nodes are indexed ``row * width + col``.
+
+def manhattan(goal, width):
+    """Manhattan-distance heuristic to ``goal``."""
+    goal_row, goal_col = divmod(goal, width)
+
+    def heuristic(node):
+        row, col = divmod(node, width)
+        return abs(row - goal_row) + abs(col - goal_col)
+    return heuristic
+
+
+def octile(goal, width):
+    """Octile-distance heuristic to ``goal`` (admissible, but weaker on 4-connected grids)."""
+    goal_row, goal_col = divmod(goal, width)
+
+    def heuristic(node):
+        row, col = divmod(node, width)
+        d_row, d_col = abs(row - goal_row), abs(col - goal_col)
+        return max(d_row, d_col) + (math.sqrt(2) - 1) * min(d_row, d_col)
+    return heuristic
+
+
+class Landmarks:
+    """Precomputed BFS distances from a few landmark nodes (the ALT heuristic).
+
+    By the triangle inequality ``|d(L, goal) - d(L, node)|`` never exceeds the
+    true distance from ``node`` to ``goal``. Landmarks are picked by
+    farthest-point selection so they sit on the edges of the map, where the
+    bound is tightest. The distances describe the grid as it was when they
+    were built; rebuild them after any cell changes.
+    """
+
+    def __init__(self, neighbors, num_nodes, count=4, first=0):
+        self.num_nodes = num_nodes
+        self.distances = []
+        self.nodes = []
+
+        # Farthest-point selection, seeded by the node farthest from ``first``
+        closest = self._distances_from(neighbors, first)
+        for _ in range(count):
+            candidate = max(range(num_nodes), key=closest.__getitem__)
+            if closest[candidate] <= 0 or candidate in self.nodes:
+                break
+            field = self._distances_from(neighbors, candidate)
+            self.nodes.append(candidate)
+            self.distances.append(field)
+            for node in range(num_nodes):
+                if field[node] != -1 and (closest[node] == -1 or field[node] < closest[node]):
+                    closest[node] = field[node]
+            closest[candidate] = 0
+
+    def _distances_from(self, neighbors, source):
+        distances = array('i', [-1]) * self.num_nodes
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbor in neighbors(current):
+                if distances[neighbor] == -1:
+                    distances[neighbor] = distances[current] + 1
+                    queue.append(neighbor)
+        return distances
+
+    def heuristic(self, goal, width):
+        """ALT bound to ``goal``, never weaker than Manhattan distance."""
+        fallback = manhattan(goal, width)
+        to_goal = [(field, field[goal]) for field in self.distances if field[goal] != -1]
+
+        def heuristic(node):
+            best = fallback(node)
+            for field, goal_distance in to_goal:
+                distance = field[node]
+                if distance != -1 and abs(goal_distance - distance) > best:
+                    best = abs(goal_distance - distance)
+            return best
+        return heuristic
+
+
+HEURISTICS = ("manhattan", "octile", "alt")
+
+
+def make_heuristic(name, goal, width, landmarks=None):
+    if name == "manhattan":
+        return manhattan(goal, width)
+    if name == "octile":
+        return octile(goal, width)
+    if name == "alt":
+        if landmarks is None:
+            raise ValueError("The 'alt' heuristic needs precomputed Landmarks")
+        return landmarks.heuristic(goal, width)
+    raise ValueError(f"Unknown heuristic '{name}', expected one of {HEURISTICS}")
+
+
+# Tie-breaking among open nodes with equal f. On open 4-connected grids many
+# nodes share the same f, and plain FIFO order expands almost all of them.
+#   fifo   - insertion order (the previous behaviour)
+#   lifo   - newest first, which tends to dive along one path
+#   high_g - prefer nodes further from the start
+#   low_h  - prefer nodes closer to the goal (same order as high_g for equal f)
+#   cross  - prefer nodes near the straight start-goal line (cross product),
+#            then nodes further from the start
+TIE_BREAKERS = ("fifo", "lifo", "high_g", "low_h", "cross")
+
+
+def make_tie_breaker(name, start, goal, width):
+    if name == "fifo":
+        return None
+    if name == "lifo":
+        return lambda node, g, h, count: -count
+    if name == "high_g":
+        return lambda node, g, h, count: -g
+    if name == "low_h":
+        return lambda node, g, h, count: h
+    if name == "cross":
+        start_row, start_col = divmod(start, width)
+        goal_row, goal_col = divmod(goal, width)
+        line_row, line_col = start_row - goal_row, start_col - goal_col
+
+        def cross(node, g, h, count):
+            row, col = divmod(node, width)
+            return abs((row - goal_row) * line_col - line_row * (col - goal_col)), -g
+        return cross
+    raise ValueError(f"Unknown tie-breaking policy '{name}', expected one of {TIE_BREAKERS}")
@@ -0,0 +1,149 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bfs_solver
+import result_cache
+
+# Headless batch solving.
+#
+# Every dungeon file named on the command line, found in a named directory
+# (``*.txt`` and binary ``*.dgn``) or matched by a glob is solved in a pool of worker processes
+# with no prompts. Each file is solved by every selected
+# engine without removals, then once more spending its "Obstacle to remove"
+# budget, and one JSON object per file is written to stdout as soon as its
+# turn comes, in input order:
+#
+#   {"file": ..., "width": ..., "height": ..., "obstacles": ..., "removal_budget": ...,
+#    "bfs": {"length": ..., "nodes_expanded": ..., "seconds": ...},
+#    "astar": {...},
+#    "removals": {"mode": ..., "length": ..., "removed": [[x, y], ...], "seconds": ...}}
+#
+# Lengths are null when there is no walk. For dungeons with tile costs each
+# engine's record also holds the "cost" of its path (only the "dial" engine
+# looks for the cheapest one). A file that can't be solved gives
+# {"file": ..., "error": ...} instead, and the exit status is 1. With
+# --cache-dir, results are shared through a result_cache directory, so
+# resubmitted dungeons come back without being solved again.
+
+
+def find_dungeon_files(patterns):
+    """Expand files, directories and glob patterns into a sorted, duplicate-free list."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for extension in ("*.txt", "*.dgn"):
+                files.extend(glob.glob(os.path.join(pattern, extension)))
+        elif os.path.exists(pattern):
+            files.append(pattern)
+        else:
+            files.extend(glob.glob(pattern, recursive=True))
+    return sorted(dict.fromkeys(files))
+
+
+def solve_file(input_file, engines=("bfs", "astar"), removal_mode="last", heuristic="manhattan",
+               include_paths=False, cache_dir=None):
+    """Solve one dungeon file and return its result record."""
+    record = {"file": input_file}
+    cache = result_cache.shared_cache(cache_dir) if cache_dir else None
+    try:
+        searches = {}
+        for engine in engines:
+            bfs = bfs_solver.BFS(engine=engine, heuristic=heuristic, cache=cache)
+            bfs.load_grid(input_file)
+            start_time = time.perf_counter()
+            path = bfs.search()
+            searches[engine] = _path_record(path, start_time, include_paths, nodes_expanded=bfs.nodes_expanded)
+            if path is not None and bfs.max_cost() > 1:
+                searches[engine]["cost"] = bfs.path_cost(path)
+
+        record.update(width=bfs.grid_width, height=bfs.grid_height, obstacles=len(bfs.obstacles),
+                      removal_budget=bfs.num_obstacles_to_remove, **searches)
+        # "last" mode re-runs the first engine after opening the obstacles
+        bfs = bfs_solver.BFS(removal_mode=removal_mode, engine=engines[0], heuristic=heuristic, cache=cache)
+        bfs.load_grid(input_file)
+        start_time = time.perf_counter()
+        path, removed = bfs.solve_with_removals()
+        record["removals"] = {"mode": removal_mode, **_path_record(
+            path, start_time, include_paths, removed=[list(obstacle) for obstacle in removed])}
+    except Exception as e:
+        logging.error("Batch solve of %s failed: %s", input_file, e)
+        return {"file": input_file, "error": f"{type(e).__name__}: {e}"}
+    return record
+
+
+def _path_record(path, start_time, include_paths, **details):
+    seconds = round(time.perf_counter() - start_time, 6)
+    record = {"length": len(path) - 1 if path is not None else None, **details, "seconds": seconds}
+    if include_paths:
+        record["path"] = [list(step) for step in path] if path is not None else None
+    return record
+
+
+def _quiet_worker():
+    # Per-file INFO lines from thousands of solves would swamp logs/bfs_log.txt
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def solve_all(files, workers=None, **options):
+    """Yield the result record of every file, in order, solving them in parallel."""
+    if workers == 1:
+        _quiet_worker()
+        for input_file in files:
+            yield solve_file(input_file, **options)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Hand out several small files per task so the pool isn't dominated by IPC
+    chunksize = max(1, len(files) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as pool:
+        yield from pool.map(_solve_with_options, [(input_file, options) for input_file in files],
+                            chunksize=chunksize)
+
+
+def _solve_with_options(job):
+    input_file, options = job
+    return solve_file(input_file, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve many dungeon files in parallel and print one JSON line per file.")
+    parser.add_argument("inputs", nargs="+",
+                        help="dungeon files, directories (their *.txt and *.dgn files) or glob patterns")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU; 1 solves in this process)")
+    parser.add_argument("--engines", nargs="+", choices=tuple(bfs_solver.SEARCH_ENGINES), default=["bfs", "astar"],
+                        help="engines to run without removals (default: bfs astar)")
+    parser.add_argument("--removal-mode", choices=bfs_solver.REMOVAL_MODES, default="last",
+                        help="how to spend each file's removal budget (default: last)")
+    parser.add_argument("--heuristic", choices=bfs_solver.astar_solver.HEURISTICS, default="manhattan",
+                        help="A* heuristic (default: manhattan)")
+    parser.add_argument("--paths", action="store_true",
+                        help="include the paths themselves, not just their lengths")
+    parser.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("SEARCH_CACHE_DIR"),
+                        help="reuse results stored in DIR for identical dungeons and store new ones there "
+                             "(default: $SEARCH_CACHE_DIR or no cache)")
+    args = parser.parse_args()
+
+    files = find_dungeon_files(args.inputs)
+    if not files:
+        print("No dungeon files found.", file=sys.stderr)
+        return 1
+    logging.info("Batch solving %d dungeon files.", len(files))
+
+    failures = 0
+    for record in solve_all(files, workers=args.workers, engines=args.engines, removal_mode=args.removal_mode,
+                            heuristic=args.heuristic, include_paths=args.paths, cache_dir=args.cache_dir):
+        failures += "error" in record
+        print(json.dumps(record), flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
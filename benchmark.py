@@ -0,0 +1,341 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import bfs_solver
+import dungeon_io
+from search_events import CLOSED, OPEN, drive
+
+try:
+    # The game.py cores run headless on SDL's dummy video driver
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import game
+except ImportError:  # without pygame only the bfs_solver engines are benchmarked
+    game = None
+
+# Reproducible pathfinding benchmarks.
+#
+# Every case is a dungeon generated from its layout, size, obstacle density
+# and the suite seed, so the same command always searches the same grids.
+# Each engine is timed on a fresh grid (best of --repeat runs), then run once
+# more under tracemalloc for its peak memory and once as an event stream
+# (see search_events) for its peak frontier, the most nodes open at once.
+# Path lengths, nodes expanded and frontiers don't depend on the machine;
+# times and memory do, so a baseline is only comparable on the machine
+# (and Python) that saved it.
+#
+# Saved results hold one record per line so that a regression also shows
+# up in a plain diff against the saved baseline:
+#
+#   python benchmark.py --save benchmark_baseline.json
+#   python benchmark.py --compare benchmark_baseline.json
+
+LAYOUTS = ("random", "rooms", "maze")
+# Rooms of the "rooms" layout are ROOM_SIZE - 1 cells across
+ROOM_SIZE = 16
+# Open squares left at the start and goal corners of random and rooms dungeons
+CORNER_SIZE = 3
+SIZES = (64, 256, 512)
+# (layout, obstacle density) of the cases run at every size
+CASES = (("random", 0.1), ("random", 0.3), ("rooms", 0.1), ("maze", 0.0))
+
+SOLVER_ENGINES = tuple(bfs_solver.SEARCH_ENGINES)
+GAME_ENGINES = ("game.bfs", "game.astar")
+# game.py grids are Spot objects; past this many cells setting one up takes
+# far longer than searching it
+GAME_MAX_CELLS = 512 * 512
+# Slack added to every time compared with a baseline
+MIN_SECONDS = 0.001
+
+
+def generate_dungeon(width, height, layout="random", density=0.2, seed=0, removal_budget=0):
+    """Generate a dungeon_io.Dungeon; the same arguments always give the same grid.
+
+    random - every cell is an obstacle with probability ``density``
+    rooms  - rooms joined by one doorway per wall, ``density`` of their floor cluttered
+    maze   - a perfect maze of one-cell corridors (``density`` is not used)
+
+    A CORNER_SIZE square at the start and at the goal corner is always
+    open (except in mazes, whose corners are open anyway), but there may
+    be no walk between them.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}', expected one of {LAYOUTS}")
+    rng = random.Random(f"{layout} {width}x{height} {density} {seed}")
+    size = width * height
+    if layout == "maze":
+        reachable = _carve_maze(width, height, rng)
+    else:
+        reachable = bytearray(rng.random() >= density for _ in range(size))
+        if layout == "rooms":
+            _build_rooms(reachable, width, height, rng)
+        # Clear the corners so the search doesn't end where it begins
+        corner = min(CORNER_SIZE, width, height)
+        for x in range(corner):
+            reachable[x * height:x * height + corner] = bytes([1]) * corner
+            reachable[(width - x) * height - corner:(width - x) * height] = bytes([1]) * corner
+    obstacles = dungeon_io.ObstacleList.from_map(height, reachable, size - reachable.count(1))
+    return dungeon_io.Dungeon(width, height, reachable, obstacles, removal_budget)
+
+
+def _build_rooms(reachable, width, height, rng):
+    # Wall off every ROOM_SIZE-th column and row...
+    for x in range(ROOM_SIZE, width, ROOM_SIZE):
+        reachable[x * height:(x + 1) * height] = bytes(height)
+    for y in range(ROOM_SIZE, height, ROOM_SIZE):
+        reachable[y::height] = bytes(width)
+    # ...then open one doorway in each wall between two rooms, away from the corners
+    for x in range(ROOM_SIZE, width, ROOM_SIZE):
+        for y in range(1, height, ROOM_SIZE):
+            reachable[x * height + rng.randrange(y, min(y + ROOM_SIZE - 1, height))] = 1
+    for y in range(ROOM_SIZE, height, ROOM_SIZE):
+        for x in range(1, width, ROOM_SIZE):
+            reachable[rng.randrange(x, min(x + ROOM_SIZE - 1, width)) * height + y] = 1
+
+
+def _carve_maze(width, height, rng):
+    # Rooms sit on even coordinates; a randomized depth-first walk knocks
+    # out the wall between each room and the next unvisited one
+    reachable = bytearray(width * height)
+    reachable[0] = 1
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        unvisited = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                     if 0 <= x + dx < width and 0 <= y + dy < height and not reachable[(x + dx) * height + y + dy]]
+        if not unvisited:
+            stack.pop()
+            continue
+        next_x, next_y = rng.choice(unvisited)
+        reachable[(x + next_x) // 2 * height + (y + next_y) // 2] = 1
+        reachable[next_x * height + next_y] = 1
+        stack.append((next_x, next_y))
+    # On even sizes the goal corner is a wall cell; join it to the nearest room
+    goal_x, goal_y = width - 1, height - 1
+    reachable[goal_x * height + goal_y] = reachable[(goal_x - goal_x % 2) * height + goal_y] = 1
+    return reachable
+
+
+def prepare_search(engine, dungeon):
+    """Set ``engine`` up on ``dungeon`` with no state from earlier runs.
+
+    Returns search(on_open=None, on_expanded=None), which runs the search
+    once and returns ``(path_length, nodes_expanded)``, or None when the
+    engine can't run on this dungeon. Without callbacks the bfs_solver
+    engines run their plain search loops; with them, their event streams.
+    """
+    if engine in GAME_ENGINES:
+        return _prepare_game_search(engine, dungeon)
+    bfs = bfs_solver.BFS(engine=engine)
+    bfs.set_dungeon(dungeon)
+
+    def search(on_open=None, on_expanded=None):
+        if on_open is None and on_expanded is None:
+            path = bfs.search()
+            nodes_expanded = bfs.nodes_expanded
+        else:
+            path, nodes_expanded = drive(getattr(bfs, bfs_solver.TRACE_ENGINES[engine])(), on_open, on_expanded)
+        return (len(path) - 1 if path is not None else None), nodes_expanded
+
+    return search
+
+
+def _prepare_game_search(engine, dungeon):
+    if game is None or dungeon.width != dungeon.height or dungeon.width * dungeon.height > GAME_MAX_CELLS:
+        return None
+    game.Spot.changed = None
+    grid = game.make_grid(dungeon.width, game.WIDTH)
+    start, end = game.place_dungeon(grid, dungeon)
+    for row in grid:
+        for spot in row:
+            spot.update_neighbors(grid)
+    algorithm = game.bfs_algorithm if engine == "game.bfs" else game.astar_algorithm
+
+    def search(on_open=None, on_expanded=None):
+        # The cores yield no closed event for the goal, so nodes_expanded is
+        # one less than they print
+        nodes_expanded = path_spots = 0
+        with contextlib.redirect_stdout(io.StringIO()):  # the cores print their results
+            for kind, spot in algorithm(grid, start, end):
+                if kind == CLOSED:
+                    nodes_expanded += 1
+                    if on_expanded:
+                        on_expanded(spot)
+                elif kind == OPEN:
+                    if on_open:
+                        on_open(spot)
+                else:
+                    path_spots += 1
+        return (path_spots - 1 if path_spots else None), nodes_expanded
+
+    return search
+
+
+def measure(engine, dungeon, repeat=3):
+    """Benchmark one engine on one dungeon; return its result record, or None if it can't run there."""
+    seconds = None
+    for _ in range(repeat):
+        search = prepare_search(engine, dungeon)
+        if search is None:
+            return None
+        start_time = time.perf_counter()
+        path_length, nodes_expanded = search()
+        elapsed = time.perf_counter() - start_time
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    search = prepare_search(engine, dungeon)
+    tracemalloc.start()
+    try:
+        search()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # A node is on the frontier from its open event until its closed one
+    frontier = set()
+    peak_frontier = 0
+
+    def on_open(node):
+        nonlocal peak_frontier
+        frontier.add(node)
+        peak_frontier = max(peak_frontier, len(frontier))
+
+    prepare_search(engine, dungeon)(on_open, frontier.discard)
+    return {"engine": engine, "length": path_length, "nodes_expanded": nodes_expanded,
+            "peak_frontier": peak_frontier, "peak_memory_kb": peak_memory // 1024, "seconds": round(seconds, 6)}
+
+
+def case_name(layout, size, density, seed):
+    return f"{layout}-{size}x{size}-d{density:.2f}-s{seed}"
+
+
+def run_suite(sizes=SIZES, cases=CASES, engines=SOLVER_ENGINES + GAME_ENGINES, seed=1, repeat=3, dungeon_dir=None):
+    """Yield the result record of every engine on every case, in order."""
+    for size in sizes:
+        for layout, density in cases:
+            name = case_name(layout, size, density, seed)
+            dungeon = generate_dungeon(size, size, layout, density, seed)
+            if dungeon_dir:
+                dungeon_io.write_binary_dungeon(os.path.join(dungeon_dir, name + ".dgn"), dungeon)
+            for engine in engines:
+                record = measure(engine, dungeon, repeat)
+                if record is not None:
+                    yield {"case": name, **record}
+
+
+def save_results(filename, results, settings):
+    # One record per line keeps diffs between baselines readable
+    with open(filename, "w") as file:
+        file.write("{\n")
+        for key, value in settings.items():
+            file.write(f"  {json.dumps(key)}: {json.dumps(value)},\n")
+        file.write('  "results": [\n')
+        file.write(",\n".join(f"    {json.dumps(record)}" for record in results))
+        file.write("\n  ]\n}\n")
+
+
+def compare_results(baseline, results, tolerance, engines=SOLVER_ENGINES + GAME_ENGINES):
+    """Compare results with a saved baseline; return ``(lines, regressions)``.
+
+    A different path length, more nodes expanded or a bigger frontier is a
+    regression, and so is a time or peak memory more than ``tolerance``
+    (a fraction) above the baseline's; times also get MIN_SECONDS of slack,
+    as the smallest cases are mostly timer noise. So is a baseline record
+    missing from results although its case was run and its engine was one of
+    ``engines`` or no longer exists.
+    """
+    saved = {(record["case"], record["engine"]): record for record in baseline["results"]}
+    lines, regressions = [], 0
+    for record in results:
+        base = saved.pop((record["case"], record["engine"]), None)
+        if base is None:
+            lines.append(f"{record['case']:<28} {record['engine']:<16} new")
+            continue
+        problems = []
+        if record["length"] != base["length"]:
+            problems.append(f"length {base['length']} -> {record['length']}")
+        for key in ("nodes_expanded", "peak_frontier"):
+            if record[key] > base[key]:
+                problems.append(f"{key} {base[key]} -> {record[key]}")
+        if record["seconds"] > base["seconds"] * (1 + tolerance) + MIN_SECONDS:
+            problems.append(f"seconds {base['seconds']} -> {record['seconds']}")
+        if record["peak_memory_kb"] > base["peak_memory_kb"] * (1 + tolerance):
+            problems.append(f"peak_memory_kb {base['peak_memory_kb']} -> {record['peak_memory_kb']}")
+        ratio = record["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        status = "REGRESSION: " + ", ".join(problems) if problems else "ok"
+        lines.append(f"{record['case']:<28} {record['engine']:<16} {ratio:6.2f}x time  {status}")
+        regressions += bool(problems)
+
+    cases_run = {record["case"] for record in results}
+    for case, engine in saved:
+        if case in cases_run and (engine in engines or engine not in SOLVER_ENGINES + GAME_ENGINES):
+            lines.append(f"{case:<28} {engine:<16} REGRESSION: missing from the results")
+            regressions += 1
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pathfinding engines on generated dungeons.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES),
+                        help=f"square grid sizes to generate (default: {' '.join(map(str, SIZES))})")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=list(LAYOUTS),
+                        help="dungeon layouts to include (default: all)")
+    parser.add_argument("--engines", nargs="+", choices=SOLVER_ENGINES + GAME_ENGINES,
+                        default=list(SOLVER_ENGINES + GAME_ENGINES),
+                        help="engines to run (default: all; the game.* cores need pygame)")
+    parser.add_argument("--seed", type=int, default=1, help="dungeon generator seed (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per engine, best kept (default: 3)")
+    parser.add_argument("--save", metavar="FILE", help="save the results, e.g. as a new baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed time and memory growth over the baseline (default: 0.25)")
+    parser.add_argument("--dungeons", metavar="DIR",
+                        help="also write every generated dungeon to DIR as a binary dungeon file")
+    args = parser.parse_args()
+
+    # Per-search INFO lines would end up inside the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    engines = args.engines
+    if game is None:
+        print("pygame is not installed; skipping the game.py engines.", file=sys.stderr)
+        engines = [engine for engine in engines if engine not in GAME_ENGINES]
+    if args.dungeons:
+        os.makedirs(args.dungeons, exist_ok=True)
+
+    cases = [(layout, density) for layout, density in CASES if layout in args.layouts]
+    print(f"{'case':<28} {'engine':<16} {'length':>7} {'expanded':>9} {'frontier':>8} {'memory KB':>9} {'seconds':>9}")
+    results = []
+    for record in run_suite(args.sizes, cases, engines, args.seed, args.repeat, args.dungeons):
+        results.append(record)
+        length = "-" if record["length"] is None else record["length"]
+        print(f"{record['case']:<28} {record['engine']:<16} {length:>7} {record['nodes_expanded']:>9} "
+              f"{record['peak_frontier']:>8} {record['peak_memory_kb']:>9} {record['seconds']:>9.4f}", flush=True)
+
+    if args.save:
+        save_results(args.save, results, {"python": platform.python_version(), "machine": platform.machine(),
+                                          "seed": args.seed, "repeat": args.repeat})
+        print(f"Saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        lines, regressions = compare_results(baseline, results, args.tolerance, engines)
+        print(f"\nCompared with {args.compare}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{regressions} regression(s).")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,25 @@
+import argparse
 import logging
 import os
 import time
+from array import array
 from collections import deque
 
+import astar_solver
+import bitset_solver
+import dial_solver
+import dungeon_io
+import goal_field
+import hpa_solver
+import instrumentation
+import jps_solver
+import lpa_solver
+import reachability
+import result_cache
+import wavefront_solver
+from search_events import CLOSED, OPEN, drive
+from search_trace import SearchTrace
+
 # Create a directory for logs if it doesn't exist
 log_directory = "logs"
 if not os.path.exists(log_directory):
@@ -16,105 +33,244 @@ logging.basicConfig(
     format='%(message)s'
 )
 
-# Class representing each cell in the grid
-class Cell:
-    def __init__(self, x, y, reachable):
-        self.x = x
-        self.y = y
-        self.reachable = reachable
-        self.parent = None
+# Strategies for spending the "Obstacle to remove = k" budget:
+#   optimal - search (cell, removals used) states for the true shortest path
+#   last    - pop the last k obstacles from the input file and re-run BFS
+REMOVAL_MODES = ("optimal", "last")
 
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+# Start-to-goal searches, by name, and the BFS method running each. All but
+# "dial" treat every open cell as cost 1 and ignore tile costs
+SEARCH_ENGINES = {
+    "bfs": "process",
+    "bidirectional": "process_bidirectional",
+    "astar": "process_astar",
+    "jps": "process_jps",
+    "lpa": "process_incremental",
+    "field": "process_goal_field",
+    "hpa": "process_hierarchical",
+    "wavefront": "process_wavefront",
+    "bitset": "process_bitset",
+    "dial": "process_dial",
+}
 
-    def __hash__(self):
-        return hash((self.x, self.y))
+# The same engines as event generators (see search_events), for recording traces
+TRACE_ENGINES = {
+    "bfs": "iter_process",
+    "bidirectional": "iter_process_bidirectional",
+    "astar": "iter_astar",
+    "jps": "iter_jps",
+    "lpa": "iter_incremental",
+    "field": "iter_goal_field",
+    "hpa": "iter_hierarchical",
+    "wavefront": "iter_wavefront",
+    "bitset": "iter_bitset",
+    "dial": "iter_dial",
+}
 
 # BFS algorithm implementation
+#
+# The grid is stored as flat arrays indexed by ``x * grid_height + y``:
+# ``reachable`` holds one byte per cell and ``parent`` one predecessor index
+# per cell, so a 4000x4000 dungeon costs a few tens of MB instead of 16M
+# objects. For binary dungeon files ``reachable`` is the file's own
+# memory-mapped obstacle map (see dungeon_io). A cell's byte is 0 for an
+# obstacle and otherwise its tile cost, 1 for plain floor.
 class BFS:
-    def __init__(self, width=6, height=6):
+    def __init__(self, width=6, height=6, removal_mode="last", engine="bfs",
+                 heuristic="manhattan", tie_break="fifo", num_landmarks=4, profiler=None,
+                 cache=None):
+        if removal_mode not in REMOVAL_MODES:
+            raise ValueError(f"Unknown removal mode '{removal_mode}', expected one of {REMOVAL_MODES}")
+        if engine not in SEARCH_ENGINES:
+            raise ValueError(f"Unknown search engine '{engine}', expected one of {tuple(SEARCH_ENGINES)}")
+        if heuristic not in astar_solver.HEURISTICS:
+            raise ValueError(f"Unknown heuristic '{heuristic}', expected one of {astar_solver.HEURISTICS}")
+        if tie_break not in astar_solver.TIE_BREAKERS:
+            raise ValueError(f"Unknown tie-breaking policy '{tie_break}', expected one of {astar_solver.TIE_BREAKERS}")
         self.grid_width = width
         self.grid_height = height
-        self.cells = []
-        self.obstacles = []
+        self.reachable = bytearray()
+        self.parent = array('i')
+        self.obstacles = dungeon_io.ObstacleList(height)
         self.num_obstacles_to_remove = 0
+        self.removal_mode = removal_mode
+        self.engine = engine
+        self.nodes_expanded = 0
+        # A* settings; landmarks for the ALT heuristic are built on first use
+        self.heuristic = heuristic
+        self.tie_break = tie_break
+        self.num_landmarks = num_landmarks
+        self.landmarks = None
+        # LPA* state kept between queries by the "lpa" engine
+        self.replanner = None
+        # Goal distance field kept between queries by the "field" engine and path_from()
+        self.goal_field = None
+        # Cluster data kept between queries by the "hpa" engine
+        self.hierarchy = None
+        # Components of the open cells, kept once a search finds no path so later
+        # hopeless queries are turned down without searching (see reachability)
+        self.reachability = None
+        # Search counters and phase times (see instrumentation); disabled by default
+        self.profiler = profiler or instrumentation.SearchProfiler()
+        # Finished results by grid contents and settings (see result_cache); None disables it
+        self.cache = cache
+        self._grid_digest = None
+        # Highest tile cost in the grid, found on first use
+        self._max_cost = None
 
     def init_grid(self, input_file):
-        logging.info(f"Initializing grid from file: {input_file}")
         try:
-            with open(input_file, 'r') as file:
-                # Read grid dimensions
-                dimensions = file.readline().strip()
-                self.grid_width, self.grid_height = map(int, dimensions.split())
-                
-                # Read obstacle positions and the number of obstacles to remove
-                for line in file:
-                    line = line.strip()
-                    
-                    # Check if line contains obstacle coordinates
-                    if " " in line and "Obstacle" not in line:
-                        x, y = map(int, line.split())
-                        self.obstacles.append((x, y))
-                    
-                    # Check for "Obstacle to remove" line and extract the number
-                    elif "Obstacle to remove" in line:
-                        self.num_obstacles_to_remove = int(line.split('=')[1].strip())
-                        break  # Exit loop after reading this line
-                
-                # Initialize cells with reachability based on obstacles
-                for x in range(self.grid_width):
-                    for y in range(self.grid_height):
-                        reachable = (x, y) not in self.obstacles
-                        self.cells.append(Cell(x, y, reachable))
-
-                # Set start and end points
-                self.start = self.get_cell(0, 0)
-                self.end = self.get_cell(self.grid_width - 1, self.grid_height - 1)
-                logging.info(f"Grid initialized: {self.grid_width}x{self.grid_height} with obstacles at {self.obstacles}")
-        
+            self.load_grid(input_file)
         except ValueError as e:
-            logging.error(f"Error parsing input file {input_file}: {e}")
-            print("Invalid input format! Ensure dimensions and obstacles are formatted correctly in the input file.")
+            logging.error("Error parsing input file %s: %s", input_file, e)
+            print(f"Invalid input format! {e}")
         except FileNotFoundError:
-            logging.error(f"Input file {input_file} not found.")
+            logging.error("Input file %s not found.", input_file)
             print(f"Error: Input file '{input_file}' not found.")
         except Exception as e:
-            logging.error(f"Unexpected error while initializing grid: {e}")
+            logging.error("Unexpected error while initializing grid: %s", e)
             print("An unexpected error occurred while initializing the grid.")
 
+    def load_grid(self, input_file):
+        """Like init_grid, but raises instead of printing when the file can't be used."""
+        logging.info("Initializing grid from file: %s", input_file)
+        with self.profiler.phase("parse"):
+            dungeon = dungeon_io.read_dungeon(input_file)
+        self.set_dungeon(dungeon)
+
+    def set_dungeon(self, dungeon):
+        """Use a loaded or generated dungeon_io.Dungeon as the grid."""
+        with self.profiler.phase("grid_build"):
+            self.grid_width, self.grid_height = dungeon.width, dungeon.height
+            self.reachable = dungeon.reachable
+            self.obstacles = dungeon.obstacles
+            self.num_obstacles_to_remove = dungeon.removal_budget
+            self.reset_grid()
+            self.landmarks = None
+            self.replanner = None
+            self.goal_field = None
+            self.hierarchy = None
+            self.reachability = None
+            self._grid_digest = None
+            self._max_cost = None
+
+        # Set start and end points (always the corners for text files)
+        self.start = dungeon.start
+        self.end = dungeon.goal
+        logging.info("Grid initialized: %dx%d with %d obstacles", self.grid_width, self.grid_height, len(self.obstacles))
+
     def remove_obstacles(self, num_obstacles):
         removed_obstacles = []
         try:
             for _ in range(min(num_obstacles, len(self.obstacles))):
                 obstacle = self.obstacles.pop()
-                self.get_cell(obstacle[0], obstacle[1]).reachable = True
+                self.reachable[self.get_cell(obstacle[0], obstacle[1])] = 1
                 removed_obstacles.append(obstacle)
-            logging.info(f"Removed {len(removed_obstacles)} obstacles, new reachable cells: {removed_obstacles}")
+            self._cells_opened(removed_obstacles)
+            logging.info("Removed %d obstacles, new reachable cells: %s", len(removed_obstacles), removed_obstacles)
         except Exception as e:
-            logging.error(f"Error while removing obstacles: {e}")
+            logging.error("Error while removing obstacles: %s", e)
             print("An error occurred during obstacle removal.")
         return removed_obstacles
 
+    def remove_obstacles_at(self, positions):
+        """Open the obstacles at the given (x, y) positions."""
+        targets = set(positions)
+        self.obstacles = dungeon_io.ObstacleList(
+            self.grid_height, (obstacle for obstacle in self.obstacles if obstacle not in targets))
+        for x, y in targets:
+            self.reachable[self.get_cell(x, y)] = 1
+        self._cells_opened(targets)
+        logging.info("Removed obstacles at %s", sorted(targets))
+        return list(positions)
+
+    def _cells_opened(self, positions):
+        # Keep derived search data in step with the grid after obstacles open
+        if positions:
+            self.landmarks = None
+            self._grid_digest = None
+            if self.replanner is not None:
+                self.replanner.update_cells([self.get_cell(x, y) for x, y in positions])
+            if self.goal_field is not None:
+                self.goal_field.cells_opened([self.get_cell(x, y) for x, y in positions])
+            if self.hierarchy is not None:
+                self.hierarchy.update_cells([self.get_cell(x, y) for x, y in positions])
+            if self.reachability is not None:
+                self.reachability.cells_opened([self.get_cell(x, y) for x, y in positions])
+
+    def solve_with_removals(self, num_obstacles=None):
+        """Spend the removal budget according to ``removal_mode``.
+
+        Returns ``(path, removed_obstacles)``; ``path`` is None when no walk
+        exists. The removed obstacles are opened on the grid in both modes.
+        """
+        if num_obstacles is None:
+            num_obstacles = self.num_obstacles_to_remove
+        key = None
+        if self.cache is not None:
+            key = self._cache_key("removals", removal_mode=self.removal_mode, removal_budget=num_obstacles)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._cached_removals(cached, num_obstacles)
+
+        if self.removal_mode == "last":
+            removed_obstacles = self.remove_obstacles(num_obstacles)
+            self.reset_grid()
+            path = self.search()
+        else:
+            path, removed_obstacles = self.process_with_removals(num_obstacles)
+            if path is not None and removed_obstacles:
+                self.remove_obstacles_at(removed_obstacles)
+        if key is not None:
+            self.cache.put(key, {"path": path, "removed": removed_obstacles})
+        return path, removed_obstacles
+
+    def _cached_removals(self, cached, num_obstacles):
+        # Open the same obstacles a fresh solve would have, without searching
+        logging.info("Reusing the cached %s-mode removal result.", self.removal_mode)
+        removed_obstacles = [tuple(obstacle) for obstacle in cached["removed"]]
+        if self.removal_mode == "last":
+            self.remove_obstacles(num_obstacles)
+            self.reset_grid()
+        elif cached["path"] is not None and removed_obstacles:
+            self.remove_obstacles_at(removed_obstacles)
+        return _path_tuples(cached["path"]), removed_obstacles
+
+    def _cache_key(self, query, **settings):
+        # The grid is hashed once and again only after obstacles open
+        if self._grid_digest is None:
+            self._grid_digest = result_cache.grid_digest(
+                self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+        if settings.get("removal_mode") == "last":
+            # "last" mode opens the final obstacles of the file, so their order matters
+            # too, and re-runs the configured search
+            count = min(settings["removal_budget"], len(self.obstacles))
+            settings["last_obstacles"] = [self.obstacles[index]
+                                          for index in range(len(self.obstacles) - count, len(self.obstacles))]
+            settings.update(engine=self.engine, heuristic=self.heuristic, tie_break=self.tie_break)
+        if settings.get("heuristic") == "alt":
+            # The landmarks change the nodes expanded and the trace, if not the path
+            settings["num_landmarks"] = self.num_landmarks
+        return result_cache.make_key(self._grid_digest, query=query, **settings)
+
     def find_path(self):
         try:
             start_time = time.time()
             logging.info("Starting BFS search algorithm without obstacle removal...")
-            path_without_removal = self.process()
+            path_without_removal = self.search()
             
-            if path_without_removal == "No solution":
+            if path_without_removal is None:
                 logging.info("No solution found without obstacle removal.")
 
-            removed_obstacles = self.remove_obstacles(self.num_obstacles_to_remove)
-            logging.info("Re-running BFS after obstacle removal...")
-            
-            self.reset_grid()
-            path_with_removal = self.process()
+            logging.info("Re-running BFS with up to %d obstacle removal(s) (%s mode)...",
+                         self.num_obstacles_to_remove, self.removal_mode)
+            path_with_removal, removed_obstacles = self.solve_with_removals()
             
             end_time = time.time()
             time_taken = end_time - start_time
-            logging.info(f"Time taken for pathfinding: {time_taken:.4f} seconds")
+            logging.info("Time taken for pathfinding: %.4f seconds", time_taken)
 
-            if path_with_removal == "No solution":
+            if path_with_removal is None:
                 print("No solution is found! We need to eliminate more obstacles to find such a walk.")
                 logging.info("No solution found after obstacle removal.")
                 return
@@ -123,98 +279,742 @@ class BFS:
             self.display_results(path_without_removal, path_with_removal, removed_obstacles)
 
         except Exception as e:
-            logging.error(f"Error while finding path: {e}")
+            logging.error("Error while finding path: %s", e)
             print("An error occurred during pathfinding.")
 
     def get_cell(self, x, y):
-        return self.cells[x * self.grid_height + y]
+        return x * self.grid_height + y
+
+    def get_coords(self, cell):
+        return divmod(cell, self.grid_height)
 
     def reset_grid(self):
-        for cell in self.cells:
-            cell.parent = None
+        self.parent = array('i', [-1]) * len(self.reachable)
+
+    def search(self):
+        """Run the configured search engine; see ``SEARCH_ENGINES``."""
+        key = None
+        if self.cache is not None:
+            key = self._cache_key("search", engine=self.engine, heuristic=self.heuristic, tie_break=self.tie_break)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.nodes_expanded = cached["nodes_expanded"]
+                logging.info("Reusing the cached %s search result.", self.engine)
+                return _path_tuples(cached["path"])
+
+        if self.reachability is not None and not self.reachability.connected(self.start, self.end):
+            self.nodes_expanded = 0
+            logging.info("The goal is walled off from the start; skipping the %s search.", self.engine)
+            return None
+
+        if not self.profiler.enabled:
+            path = getattr(self, SEARCH_ENGINES[self.engine])()
+        else:
+            # Profiled searches run the engine's event stream through the profiler
+            events = getattr(self, TRACE_ENGINES[self.engine])()
+            cells, self.nodes_expanded = drive(self.profiler.watch(events))
+            with self.profiler.phase("reconstruction"):
+                path = None if cells is None else [self.get_coords(cell) for cell in cells]
+            self.profiler.report(engine=self.engine, width=self.grid_width, height=self.grid_height,
+                                 path_length=None if path is None else len(path) - 1,
+                                 nodes_expanded=self.nodes_expanded)
+        logging.info("%s search expanded %d nodes", self.engine, self.nodes_expanded)
+        if path is None and self.reachability is None:
+            self.reachability = reachability.ReachabilityIndex(self.reachable, self.grid_width, self.grid_height)
+        if key is not None:
+            self.cache.put(key, {"path": path, "nodes_expanded": self.nodes_expanded})
+        return path
 
     def process(self):
-        queue = deque([(self.start, [])])
-        visited = set([self.start])
+        """Return the shortest path as a list of (x, y) tuples, or None."""
+        queue = deque([self.start])
+        visited = bytearray(len(self.reachable))
+        visited[self.start] = 1
+        self.nodes_expanded = 0
 
         while queue:
-            current, path = queue.popleft()
-            new_path = path + [(current.x, current.y)]
+            current = queue.popleft()
+            self.nodes_expanded += 1
 
             if current == self.end:
-                return " -> ".join(f"({x},{y})" for x, y in new_path)
+                return self.reconstruct_path(current)
 
             for neighbor in self.get_adjacent_cells(current):
-                if neighbor.reachable and neighbor not in visited:
-                    neighbor.parent = current
-                    queue.append((neighbor, new_path))
-                    visited.add(neighbor)
+                if self.reachable[neighbor] and not visited[neighbor]:
+                    self.parent[neighbor] = current
+                    queue.append(neighbor)
+                    visited[neighbor] = 1
+
+        return None
+
+    def record_trace(self):
+        """Run the configured engine headless and return its search_trace.SearchTrace."""
+        trace = SearchTrace(self.grid_width, self.grid_height, self.start, self.end, self.reachable, self.engine)
+        trace.record(getattr(self, TRACE_ENGINES[self.engine])())
+        self.nodes_expanded = trace.nodes_expanded
+        logging.info("%s search trace holds %d events", self.engine, len(trace))
+        return trace
+
+    # process() and process_bidirectional() stay plain loops because yielding
+    # events costs the plain BFS about a third of its speed; the generator
+    # versions below are only used for recording traces.
+
+    def iter_process(self):
+        """Like process(), but yields search_events and returns ``(cells, nodes_expanded)``."""
+        queue = deque([self.start])
+        visited = bytearray(len(self.reachable))
+        visited[self.start] = 1
+        nodes_expanded = 0
+
+        while queue:
+            current = queue.popleft()
+            nodes_expanded += 1
+
+            if current == self.end:
+                return self._cell_path(current), nodes_expanded
+
+            for neighbor in self.get_adjacent_cells(current):
+                if self.reachable[neighbor] and not visited[neighbor]:
+                    self.parent[neighbor] = current
+                    queue.append(neighbor)
+                    visited[neighbor] = 1
+                    yield OPEN, neighbor
+
+            yield CLOSED, current
+
+        return None, nodes_expanded
+
+    def _cell_path(self, cell):
+        path = [cell]
+        while cell != self.start:
+            cell = self.parent[cell]
+            path.append(cell)
+        path.reverse()
+        return path
+
+    def reconstruct_path(self, cell):
+        # Follow the predecessor array back to the start once the goal is reached
+        path = [self.get_coords(cell)]
+        while cell != self.start:
+            cell = self.parent[cell]
+            path.append(self.get_coords(cell))
+        path.reverse()
+        return path
+
+    def process_bidirectional(self):
+        """Shortest path found by growing BFS frontiers from both corners.
+
+        The smaller frontier is expanded one whole layer at a time. The first
+        layer that touches the other side's visited cells holds a shortest
+        path, so the search stops after finishing it. Returns the same kind of
+        result as ``process``.
+        """
+        self.nodes_expanded = 0
+        if self.start == self.end:
+            return [self.get_coords(self.start)]
+        if not self.reachable[self.end]:
+            return None
+
+        # side: 1 = reached from the start, 2 = reached from the goal
+        size = len(self.reachable)
+        side = bytearray(size)
+        depth = array('i', [0]) * size
+        towards_end = array('i', [-1]) * size
+        side[self.start], side[self.end] = 1, 2
+        frontiers = {1: deque([self.start]), 2: deque([self.end])}
+
+        while frontiers[1] and frontiers[2]:
+            expanding = 1 if len(frontiers[1]) <= len(frontiers[2]) else 2
+            parents = self.parent if expanding == 1 else towards_end
+            queue = frontiers[expanding]
+            best = None
+
+            for _ in range(len(queue)):
+                current = queue.popleft()
+                self.nodes_expanded += 1
+                for neighbor in self.get_adjacent_cells(current):
+                    if not self.reachable[neighbor]:
+                        continue
+                    if not side[neighbor]:
+                        side[neighbor] = expanding
+                        depth[neighbor] = depth[current] + 1
+                        parents[neighbor] = current
+                        queue.append(neighbor)
+                    elif side[neighbor] != expanding:
+                        length = depth[current] + 1 + depth[neighbor]
+                        if best is None or length < best[0]:
+                            best = (length, current, neighbor)
+
+            if best is not None:
+                _, meet_forward, meet_backward = best
+                if expanding == 2:
+                    meet_forward, meet_backward = meet_backward, meet_forward
+                path = self.reconstruct_path(meet_forward)
+                cell = meet_backward
+                while cell != -1:
+                    path.append(self.get_coords(cell))
+                    cell = towards_end[cell]
+                return path
+
+        return None
+
+    def iter_process_bidirectional(self):
+        """Like process_bidirectional(), but yields search_events and returns ``(cells, nodes_expanded)``."""
+        nodes_expanded = 0
+        if self.start == self.end:
+            return [self.start], nodes_expanded
+        if not self.reachable[self.end]:
+            return None, nodes_expanded
+
+        # side: 1 = reached from the start, 2 = reached from the goal
+        size = len(self.reachable)
+        side = bytearray(size)
+        depth = array('i', [0]) * size
+        towards_end = array('i', [-1]) * size
+        side[self.start], side[self.end] = 1, 2
+        frontiers = {1: deque([self.start]), 2: deque([self.end])}
+
+        while frontiers[1] and frontiers[2]:
+            expanding = 1 if len(frontiers[1]) <= len(frontiers[2]) else 2
+            parents = self.parent if expanding == 1 else towards_end
+            queue = frontiers[expanding]
+            best = None
+
+            for _ in range(len(queue)):
+                current = queue.popleft()
+                nodes_expanded += 1
+                for neighbor in self.get_adjacent_cells(current):
+                    if not self.reachable[neighbor]:
+                        continue
+                    if not side[neighbor]:
+                        side[neighbor] = expanding
+                        depth[neighbor] = depth[current] + 1
+                        parents[neighbor] = current
+                        queue.append(neighbor)
+                        yield OPEN, neighbor
+                    elif side[neighbor] != expanding:
+                        length = depth[current] + 1 + depth[neighbor]
+                        if best is None or length < best[0]:
+                            best = (length, current, neighbor)
+
+                yield CLOSED, current
+
+            if best is not None:
+                _, meet_forward, meet_backward = best
+                if expanding == 2:
+                    meet_forward, meet_backward = meet_backward, meet_forward
+                path = self._cell_path(meet_forward)
+                cell = meet_backward
+                while cell != -1:
+                    path.append(cell)
+                    cell = towards_end[cell]
+                return path, nodes_expanded
+
+        return None, nodes_expanded
+
+    def process_astar(self, heuristic=None, tie_break=None):
+        """Shortest path found by A* with the configured heuristic and tie-breaking."""
+        path, self.nodes_expanded = drive(self.iter_astar(heuristic, tie_break))
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_astar(self, heuristic=None, tie_break=None):
+        heuristic = heuristic or self.heuristic
+        tie_break = tie_break or self.tie_break
+        if heuristic == "alt" and self.landmarks is None:
+            self.landmarks = astar_solver.Landmarks(
+                self._open_neighbors, len(self.reachable), count=self.num_landmarks, first=self.start)
+        return astar_solver.iter_astar(
+            self.start,
+            self.end,
+            self._open_neighbors,
+            astar_solver.make_heuristic(heuristic, self.end, self.grid_height, self.landmarks),
+            tie_break=astar_solver.make_tie_breaker(tie_break, self.start, self.end, self.grid_height),
+        )
+
+    def process_jps(self):
+        """Shortest path found by Jump Point Search; nodes_expanded counts jump points."""
+        path, self.nodes_expanded = drive(self.iter_jps())
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_jps(self):
+        return jps_solver.iter_jump_point_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+
+    def process_incremental(self):
+        """Shortest path from an LPA* planner that survives obstacle removals.
+
+        The first query is a full search; after remove_obstacles only the
+        region whose distances changed is re-expanded.
+        """
+        path, self.nodes_expanded = drive(self.iter_incremental())
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_incremental(self):
+        if self.replanner is None:
+            self.replanner = lpa_solver.LPAStar(
+                self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+        return self.replanner.iter_compute_path()
+
+    def process_goal_field(self):
+        """Shortest path read off a distance field from the goal.
+
+        The first query computes the field with one reverse BFS; later
+        queries, from any start, walk down it in O(path length), and
+        remove_obstacles patches it instead of starting over.
+        """
+        path, self.nodes_expanded = drive(self.iter_goal_field())
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
 
-        return "No solution"
+    def iter_goal_field(self):
+        field = self._goal_field()
+        nodes_expanded = 0
+        if field.distances is None:
+            nodes_expanded = yield from field.iter_build()
+        return field.path_from(self.start), nodes_expanded
+
+    def process_hierarchical(self):
+        """Near-shortest path from HPA* over CLUSTER_SIZE clusters; see hpa_solver.
+
+        nodes_expanded counts abstract nodes. Cluster data is built as
+        queries need it and kept, and remove_obstacles only drops the
+        clusters around the opened cells.
+        """
+        path, self.nodes_expanded = drive(self.iter_hierarchical())
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_hierarchical(self):
+        if self.hierarchy is None:
+            self.hierarchy = hpa_solver.HierarchicalPlanner(self.reachable, self.grid_width, self.grid_height)
+        return self.hierarchy.iter_find_path(self.start, self.end)
+
+    def process_wavefront(self):
+        """Shortest path from a level-synchronous BFS; see wavefront_solver.
+
+        Each BFS layer is expanded with NumPy array operations when NumPy is
+        installed; the path and nodes_expanded match process().
+        """
+        path, self.nodes_expanded = wavefront_solver.wavefront_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_wavefront(self):
+        return wavefront_solver.iter_wavefront_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+
+    def process_bitset(self):
+        """Shortest path from a BFS over anti-diagonal bitsets; see bitset_solver.
+
+        Needs no third-party packages. Path lengths match process(), and
+        nodes_expanded counts the cells of the layers grown from either end.
+        """
+        path, self.nodes_expanded = bitset_solver.bitset_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_bitset(self):
+        return bitset_solver.iter_bitset_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+
+    def process_dial(self):
+        """Cheapest path by tile costs from Dial's bucket-queue search; see dial_solver.
+
+        On unit-cost grids it finds the same path as process().
+        """
+        path, self.nodes_expanded = dial_solver.dial_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def iter_dial(self):
+        return dial_solver.iter_dial_search(
+            self.reachable, self.grid_width, self.grid_height, self.start, self.end)
+
+    def max_cost(self):
+        """Highest tile cost in the grid; above 1 only when the dungeon has tile costs."""
+        if self._max_cost is None:
+            self._max_cost = dungeon_io.max_cost(self.reachable)
+        return self._max_cost
+
+    def path_cost(self, path):
+        """Total tile cost of a path of (x, y) tuples."""
+        return dial_solver.path_cost(self.reachable, [self.get_cell(x, y) for x, y in path])
+
+    def cost_note(self, path):
+        # Appended to reported path lengths, on grids with tile costs only
+        return f" (tile cost {self.path_cost(path)})" if self.max_cost() > 1 else ""
+
+    def path_from(self, x, y):
+        """Shortest path from (x, y) to the goal, from the cached goal distance field."""
+        path = self._goal_field().path_from(self.get_cell(x, y))
+        if path is None:
+            return None
+        return [self.get_coords(cell) for cell in path]
+
+    def _goal_field(self):
+        if self.goal_field is None or self.goal_field.goal != self.end:
+            self.goal_field = goal_field.GoalField(self.reachable, self.grid_width, self.grid_height, self.end)
+        return self.goal_field
+
+    def _open_neighbors(self, cell):
+        reachable = self.reachable
+        return [neighbor for neighbor in self.get_adjacent_cells(cell) if reachable[neighbor]]
+
+    def compare_astar_policies(self):
+        """Nodes expanded by A* for every heuristic and tie-breaking policy.
+
+        Returns a list of ``(heuristic, tie_break, path_length, nodes_expanded)``
+        sorted by nodes expanded.
+        """
+        results = []
+        for heuristic in astar_solver.HEURISTICS:
+            for tie_break in astar_solver.TIE_BREAKERS:
+                path = self.process_astar(heuristic, tie_break)
+                path_length = len(path) - 1 if path is not None else None
+                results.append((heuristic, tie_break, path_length, self.nodes_expanded))
+        results.sort(key=lambda result: result[3])
+        return results
+
+    def display_astar_comparison(self):
+        print("\n-- A* nodes expanded by heuristic and tie-breaking policy --\n")
+        print(f"{'Heuristic':<12}{'Tie-break':<12}{'Path length':<14}{'Nodes expanded':<16}")
+        for heuristic, tie_break, path_length, nodes_expanded in self.compare_astar_policies():
+            length_text = str(path_length) if path_length is not None else "no solution"
+            print(f"{heuristic:<12}{tie_break:<12}{length_text:<14}{nodes_expanded:<16}")
+
+    def process_with_removals(self, num_obstacles):
+        """Shortest path that may walk through up to ``num_obstacles`` obstacles.
+
+        Searches the layered (cell, removals used) state space in order of
+        distance plus Manhattan distance to the goal, then removals used.
+        Every step changes that estimate by 0 or 2, so FIFO buckets keyed by
+        removals replace a priority queue, and states of one cell still come
+        out in order of distance. A state is dominated when its cell was
+        already reached no later with no more removals; dominated states are
+        never queued or expanded.
+
+        Once the unused budget covers the Manhattan distance to the goal, the
+        straight walk from there is optimal, so the search stops early.
+        Returns ``(path, removed_obstacles)`` or ``(None, [])``.
+        """
+        budget = max(0, num_obstacles)
+        size = len(self.reachable)
+        end_x, end_y = self.get_coords(self.end)
+        start_x, start_y = self.get_coords(self.start)
+
+        # Fewest removals among expanded states, and the estimate/removals of
+        # the last queued state, per cell
+        expanded = array('i', [budget + 1]) * size
+        queued_f = array('i', [-1]) * size
+        queued_removals = array('i', [budget + 1]) * size
+
+        # Queued states live in parallel arrays; the buckets hold state ids
+        state_cell = array('i', [self.start])
+        state_removals = array('i', [0])
+        state_parent = array('i', [-1])
+        f = abs(end_x - start_x) + abs(end_y - start_y)
+        buckets, next_buckets = {0: deque([0])}, {}
+
+        while buckets or next_buckets:
+            if not buckets:
+                buckets, next_buckets = next_buckets, {}
+                f += 2
+            removals = min(buckets)
+            bucket = buckets.pop(removals)
+
+            while bucket:
+                state = bucket.popleft()
+                current = state_cell[state]
+                if removals >= expanded[current]:
+                    continue
+                expanded[current] = removals
+
+                x, y = self.get_coords(current)
+                h = abs(end_x - x) + abs(end_y - y)
+                if budget - removals >= h:
+                    path = []
+                    while state != -1:
+                        path.append(self.get_coords(state_cell[state]))
+                        state = state_parent[state]
+                    path.reverse()
+                    path.extend(self._straight_walk(x, y, end_x, end_y))
+                    removed_obstacles = [
+                        (px, py) for px, py in path[1:] if not self.reachable[self.get_cell(px, py)]
+                    ]
+                    return path, removed_obstacles
+
+                for neighbor in self.get_adjacent_cells(current):
+                    used = removals if self.reachable[neighbor] else removals + 1
+                    if used >= expanded[neighbor]:
+                        continue
+                    nx, ny = self.get_coords(neighbor)
+                    neighbor_f = f if abs(end_x - nx) + abs(end_y - ny) < h else f + 2
+                    if used >= queued_removals[neighbor] and neighbor_f >= queued_f[neighbor]:
+                        continue
+                    queued_f[neighbor] = neighbor_f
+                    queued_removals[neighbor] = used
+                    if neighbor_f == f and used == removals:
+                        bucket.append(len(state_cell))
+                    else:
+                        target = buckets if neighbor_f == f else next_buckets
+                        target.setdefault(used, deque()).append(len(state_cell))
+                    state_cell.append(neighbor)
+                    state_removals.append(used)
+                    state_parent.append(state)
+
+        return None, []
+
+    def _straight_walk(self, x, y, end_x, end_y):
+        # L-shaped walk to the goal, bending wherever it crosses fewer obstacles
+        step_x = 1 if end_x > x else -1
+        step_y = 1 if end_y > y else -1
+        xs = range(x + step_x, end_x + step_x, step_x) if x != end_x else range(0)
+        ys = range(y + step_y, end_y + step_y, step_y) if y != end_y else range(0)
+        x_first = [(nx, y) for nx in xs] + [(end_x, ny) for ny in ys]
+        y_first = [(x, ny) for ny in ys] + [(nx, end_y) for nx in xs]
+        return min(x_first, y_first, key=lambda walk: sum(
+            1 for px, py in walk if not self.reachable[self.get_cell(px, py)]))
+
+    @staticmethod
+    def format_path(path):
+        return " -> ".join(f"({x},{y})" for x, y in path)
 
     def get_adjacent_cells(self, cell):
+        x, y = divmod(cell, self.grid_height)
         cells = []
-        if cell.x < self.grid_width - 1:
-            cells.append(self.get_cell(cell.x + 1, cell.y))
-        if cell.y > 0:
-            cells.append(self.get_cell(cell.x, cell.y - 1))
-        if cell.x > 0:
-            cells.append(self.get_cell(cell.x - 1, cell.y))
-        if cell.y < self.grid_height - 1:
-            cells.append(self.get_cell(cell.x, cell.y + 1))
+        if x < self.grid_width - 1:
+            cells.append(cell + self.grid_height)
+        if y > 0:
+            cells.append(cell - 1)
+        if x > 0:
+            cells.append(cell - self.grid_height)
+        if y < self.grid_height - 1:
+            cells.append(cell + 1)
         return cells
 
+    def distance_field(self, source):
+        """BFS distance from ``source`` to every cell, -1 where unreachable."""
+        return wavefront_solver.distance_field(self.reachable, self.grid_width, self.grid_height, source)
+
+    def obstacle_impact(self):
+        """Rank every obstacle by the path length its single removal would give.
+
+        Two distance fields, one from the start and one from the goal, are
+        computed once. Removing obstacle ``o`` gives a path of
+        ``min(from_start[a]) + 2 + min(from_goal[b])`` over its open
+        neighbours ``a`` and ``b``, so the whole report costs O(M*N + K).
+        Returns ``(baseline, ranking)`` where ``ranking`` is a list of
+        ``(obstacle, path_length)`` sorted shortest first; lengths are None
+        when the goal stays unreachable.
+        """
+        from_start = self.distance_field(self.start)
+        from_goal = self.distance_field(self.end)
+        baseline = from_start[self.end] if from_start[self.end] != -1 else None
+        # A blocked goal can only be entered by removing the goal obstacle itself
+        goal_blocked = not self.reachable[self.end] and self.end != self.start
+
+        ranking = []
+        for x, y in dict.fromkeys(self.obstacles):
+            cell = self.get_cell(x, y)
+            if cell == self.start or cell == self.end:
+                to_cell = 0 if cell == self.start else None
+                from_cell = 0 if cell == self.end else None
+            else:
+                to_cell = from_cell = None
+            for neighbor in self.get_adjacent_cells(cell):
+                if from_start[neighbor] != -1 and (to_cell is None or from_start[neighbor] + 1 < to_cell):
+                    to_cell = from_start[neighbor] + 1
+                if goal_blocked:
+                    continue
+                if from_goal[neighbor] != -1 and (from_cell is None or from_goal[neighbor] + 1 < from_cell):
+                    from_cell = from_goal[neighbor] + 1
+
+            path_length = baseline
+            if to_cell is not None and from_cell is not None:
+                if path_length is None or to_cell + from_cell < path_length:
+                    path_length = to_cell + from_cell
+            ranking.append(((x, y), path_length))
+
+        ranking.sort(key=lambda entry: float("inf") if entry[1] is None else entry[1])
+        return baseline, ranking
+
+    def display_obstacle_impact(self, top=None):
+        baseline, ranking = self.obstacle_impact()
+        if top is not None:
+            ranking = ranking[:top]
+
+        baseline_text = baseline if baseline is not None else "no solution"
+        print(f"\n-- Impact of removing a single obstacle (current shortest path: {baseline_text}) --\n")
+        if not ranking:
+            print("There are no obstacles to remove.")
+            return
+        print(f"{'Rank':<6}{'Obstacle':<14}{'Path length':<14}{'Saved':<8}")
+        for rank, (obstacle, path_length) in enumerate(ranking, start=1):
+            if path_length is None:
+                length_text, saved_text = "no solution", "-"
+            elif baseline is None:
+                length_text, saved_text = str(path_length), "unblocks"
+            else:
+                length_text, saved_text = str(path_length), str(baseline - path_length)
+            print(f"{rank:<6}{str(obstacle):<14}{length_text:<14}{saved_text:<8}")
+
+    def display_start_queries(self, starts):
+        print(f"\n-- Shortest paths from {len(starts)} start(s) to the princess --\n")
+        for x, y in starts:
+            if not (0 <= x < self.grid_width and 0 <= y < self.grid_height):
+                print(f"From ({x},{y}): outside the {self.grid_width}x{self.grid_height} grid.")
+                continue
+            path = self.path_from(x, y)
+            if path is None:
+                print(f"From ({x},{y}): no solution is found.")
+            else:
+                print(f"From ({x},{y}): the shortest path is {len(path) - 1}. Such path is {self.format_path(path)}")
+
     def display_results(self, path_without_removal, path_with_removal, removed_obstacles):
         print("\n-- The shortest path without eliminating any obstacles --\n")
-        if path_without_removal != "No solution":
-            print(f"1- The shortest path without eliminating any obstacles is {len(path_without_removal.split(' -> ')) - 1}.")
-            print(f"Such path is {path_without_removal}\n")
+        if path_without_removal is not None:
+            print(f"1- The shortest path without eliminating any obstacles is {len(path_without_removal) - 1}"
+                  f"{self.cost_note(path_without_removal)}.")
+            print(f"Such path is {self.format_path(path_without_removal)}\n")
         else:
             print("No solution is found without eliminating any obstacles.")
 
         print("\n-- The shortest path with eliminating obstacles --\n")
-        if path_with_removal != "No solution":
-            print(f"2- The shortest path with removal of {self.num_obstacles_to_remove} obstacle(s) at positions {removed_obstacles} is {len(path_with_removal.split(' -> ')) - 1}.")
-            print(f"Such path is {path_with_removal}\n")
+        if path_with_removal is not None:
+            print(f"2- The shortest path with removal of {len(removed_obstacles)} obstacle(s) at positions {removed_obstacles} is {len(path_with_removal) - 1}"
+                  f"{self.cost_note(path_with_removal)}.")
+            print(f"Such path is {self.format_path(path_with_removal)}\n")
         else:
             print("No solution is found after eliminating obstacles.")
 
 
+def _path_tuples(path):
+    # Cached paths come back from JSON as lists of lists
+    return None if path is None else [tuple(step) for step in path]
+
+
 # Main program execution
 def main():
-    input_file = 'dungeon_input.txt'
-    bfs = BFS()
-    bfs.init_grid(input_file)
+    parser = argparse.ArgumentParser(description="Rescue the princess with BFS.")
+    parser.add_argument("input_file", nargs="?", default="dungeon_input.txt",
+                        help="text or binary dungeon file to solve (default: dungeon_input.txt)")
+    parser.add_argument("--removal-mode", choices=REMOVAL_MODES, default="last",
+                        help="how to spend the 'Obstacle to remove' budget (default: last)")
+    parser.add_argument("--engine", choices=tuple(SEARCH_ENGINES), default="bfs",
+                        help="search used for start-to-goal queries (default: bfs)")
+    parser.add_argument("--heuristic", choices=astar_solver.HEURISTICS, default="manhattan",
+                        help="A* heuristic (default: manhattan)")
+    parser.add_argument("--tie-break", choices=astar_solver.TIE_BREAKERS, default="fifo",
+                        help="A* tie-breaking among equal f (default: fifo)")
+    parser.add_argument("--landmarks", type=int, default=4,
+                        help="number of landmarks for the alt heuristic (default: 4)")
+    parser.add_argument("--compare-astar", action="store_true",
+                        help="report A* nodes expanded for every heuristic and tie-break and exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="solve once with the selected engine, write a binary search trace to FILE "
+                             "for replay in game.py or all.py, and exit")
+    parser.add_argument("--impact", nargs="?", type=int, const=0, default=None, metavar="TOP",
+                        help="rank obstacles by the path length their single removal gives and exit "
+                             "(optionally only the TOP best)")
+    parser.add_argument("--starts", nargs="+", metavar="X,Y",
+                        help="answer shortest-path queries from these knight positions with one cached "
+                             "goal distance field and exit")
+    parser.add_argument("--profile", choices=instrumentation.MODES,
+                        default=os.environ.get("SEARCH_PROFILE", instrumentation.DISABLED),
+                        help="report search counters and phase times as JSON lines "
+                             "(default: $SEARCH_PROFILE or disabled)")
+    parser.add_argument("--profile-file", metavar="FILE", default=os.environ.get("SEARCH_PROFILE_FILE"),
+                        help="append the profiling reports to FILE (default: $SEARCH_PROFILE_FILE or stderr)")
+    parser.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("SEARCH_CACHE_DIR"),
+                        help="keep solved results in DIR and reuse them for identical dungeons "
+                             "(default: $SEARCH_CACHE_DIR or no cache)")
+    args = parser.parse_args()
+
+    bfs = BFS(removal_mode=args.removal_mode, engine=args.engine, heuristic=args.heuristic,
+              tie_break=args.tie_break, num_landmarks=args.landmarks,
+              profiler=instrumentation.SearchProfiler(args.profile, args.profile_file),
+              cache=result_cache.ResultCache(directory=args.cache_dir) if args.cache_dir else None)
+    bfs.init_grid(args.input_file)
+    if not bfs.reachable:
+        return  # init_grid has already explained why the file couldn't be used
+
+    if args.compare_astar:
+        logging.info("Comparing A* heuristics and tie-breaking policies.")
+        bfs.display_astar_comparison()
+        return
+
+    if args.trace:
+        logging.info("Recording a %s search trace to %s.", bfs.engine, args.trace)
+        trace = bfs.record_trace()
+        trace.save(args.trace)
+        path = trace.path()
+        print(f"Shortest path: {len(path) - 1 if path else 'no solution'}")
+        print(f"Nodes expanded ({bfs.engine}): {bfs.nodes_expanded}")
+        print(f"Wrote {len(trace)} search events to {args.trace} ({os.path.getsize(args.trace)} bytes)")
+        return
+
+    if args.starts:
+        try:
+            starts = [tuple(map(int, start.split(","))) for start in args.starts]
+            if any(len(start) != 2 for start in starts):
+                raise ValueError
+        except ValueError:
+            print("Invalid start position! Use X,Y, e.g. --starts 0,0 3,4")
+            return
+        logging.info("Answering %d start queries from the goal distance field.", len(starts))
+        bfs.display_start_queries(starts)
+        return
+
+    if args.impact is not None:
+        logging.info("Ranking obstacles by single-removal impact.")
+        bfs.display_obstacle_impact(top=args.impact or None)
+        return
+
+    if bfs.max_cost() > 1 and bfs.engine != "dial":
+        logging.warning("The %s engine ignores the dungeon's tile costs.", bfs.engine)
+        print(f"Note: the {bfs.engine} engine ignores this dungeon's tile costs; use --engine dial for the cheapest path.")
 
     print("\n--The shortest path without eliminating any obstacles--\n")
     logging.info("Attempt to find the shortest path without removing any obstacles.")
-    path_without_removal = bfs.process()
-    if path_without_removal != "No solution":
-        original_path_length = len(path_without_removal.split(" -> "))
-        print(f"1- The shortest path without eliminating any obstacles is {original_path_length - 1}.")
-        print(f"Such path is {path_without_removal}\n")
+    path_without_removal = bfs.search()
+    if path_without_removal is not None:
+        original_path_length = len(path_without_removal)
+        print(f"1- The shortest path without eliminating any obstacles is {original_path_length - 1}"
+              f"{bfs.cost_note(path_without_removal)}.")
+        print(f"Such path is {bfs.format_path(path_without_removal)}")
+        print(f"Nodes expanded ({bfs.engine}): {bfs.nodes_expanded}\n")
     else:
         print("No solution is found! You may need to eliminate more obstacles to find such a walk.")
 
     # Attempt to remove specified number of obstacles and find the shortest path
     print("\n--The shortest path with eliminating obstacles--\n")
     if bfs.num_obstacles_to_remove > 0:
-        logging.info(f"Attempt to remove {bfs.num_obstacles_to_remove} obstacle(s).")
-        
-        removed_obstacles = bfs.remove_obstacles(bfs.num_obstacles_to_remove)
-        if removed_obstacles:
-            bfs.reset_grid()
-            logging.info(f"Removed obstacles at {removed_obstacles}. Attempting to find the new shortest path.")
-            path_with_removal = bfs.process()
-
-            if path_with_removal != "No solution":
-                new_path_length = len(path_with_removal.split(" -> "))
-                print(f"2- The shortest path with removal of {bfs.num_obstacles_to_remove} obstacle(s) at positions {removed_obstacles} is {new_path_length - 1}.")
-                print(f"Such path is {path_with_removal}\n")
-            else:
-                print("No solution is found after removing obstacles. You may need to eliminate more obstacles to find such a walk.")
-        else:
+        logging.info("Attempt to remove up to %d obstacle(s) (%s mode).", bfs.num_obstacles_to_remove, bfs.removal_mode)
+
+        path_with_removal, removed_obstacles = bfs.solve_with_removals()
+        if path_with_removal is not None:
+            new_path_length = len(path_with_removal)
+            print(f"2- The shortest path with removal of {len(removed_obstacles)} obstacle(s) at positions {removed_obstacles} is {new_path_length - 1}"
+                  f"{bfs.cost_note(path_with_removal)}.")
+            print(f"Such path is {bfs.format_path(path_with_removal)}\n")
+        elif bfs.removal_mode == "last" and not removed_obstacles:
             print("No suitable obstacles to remove.")
+        else:
+            print("No solution is found after removing obstacles. You may need to eliminate more obstacles to find such a walk.")
     else:
         print("No obstacles specified for removal in the input file.")
 
@@ -232,15 +1032,16 @@ def main():
                     print(f"Cannot remove more than {len(bfs.obstacles)} obstacles.")
                     continue
                 
-                logging.info(f"User requested to remove {obstacles_to_remove} additional obstacles.")
+                logging.info("User requested to remove %d additional obstacles.", obstacles_to_remove)
                 additional_removed_obstacles = bfs.remove_obstacles(obstacles_to_remove)
                 if additional_removed_obstacles:
                     bfs.reset_grid()
-                    path_after_additional_removal = bfs.process()
-                    if path_after_additional_removal != "No solution":
-                        new_path_length = len(path_after_additional_removal.split(" -> "))
-                        print(f"\nThe shortest path after removing {obstacles_to_remove} additional obstacle(s) at {additional_removed_obstacles} is {new_path_length - 1}.")
-                        print(f"Such path is {path_after_additional_removal}")
+                    path_after_additional_removal = bfs.search()
+                    if path_after_additional_removal is not None:
+                        new_path_length = len(path_after_additional_removal)
+                        print(f"\nThe shortest path after removing {obstacles_to_remove} additional obstacle(s) at {additional_removed_obstacles} is {new_path_length - 1}"
+                              f"{bfs.cost_note(path_after_additional_removal)}.")
+                        print(f"Such path is {bfs.format_path(path_after_additional_removal)}")
                     else:
                         print("No path found after removing the additional obstacles.")
                 else:
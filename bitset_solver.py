@@ -0,0 +1,137 @@
+from search_events import CLOSED, OPEN, drive
+
+# Byte value -> "1" for open cells and "0" for blocked ones, to turn an
+# anti-diagonal of the grid into the binary digits of an int
+_DIGITS = bytes.maketrans(bytes(range(256)), b"0" + b"1" * 255)
+
+
+# Bit-parallel BFS over anti-diagonal bitsets, using nothing but Python ints.
+#
+# Each anti-diagonal of the grid (the cells with x + y == d) is a Python int
+# with bit x set where the cell is open, and a BFS layer is kept the same
+# way, as {d: bits} for the diagonals it touches. Every step moves a cell
+# one diagonal up or down, so expanding a layer costs a few shifts, ORs and
+# ANDs per touched diagonal instead of a loop per cell: diagonal d's bits
+# reach ``bits | bits << 1`` on diagonal d + 1 and ``bits | bits >> 1`` on
+# d - 1, and ANDing with that diagonal's not-yet-reached bits keeps the new
+# cells. Diagonals rather than rows because a BFS front on an open grid runs
+# diagonally: it fills a few diagonals, where along rows it would put a bit
+# or two in each of a great many full-width ints.
+#
+# The cost of a layer grows with the diagonals it touches, so layers are
+# grown from both ends, always on the side touching fewer, until a new
+# layer meets the other side's newest one. Layers are kept (about one bit
+# per reached cell), and the path is rebuilt by stepping from the meeting
+# cell back to each end through neighbours one layer nearer. Path lengths
+# match bfs_solver.BFS.process, though among equally short paths another
+# may be picked. Thin fronts, such as a maze's corridors, gain nothing from
+# the bits and pay for the ints, so there the plain BFS is faster.
+#
+# Cells are indexed ``x * height + y`` and open_cells holds one truthy byte
+# per walkable cell. Like BFS.process, a blocked start still steps onto its
+# open neighbours, and a blocked goal is only reached by starting on it.
+def diagonal_bits(open_cells, width, height):
+    """The open cells of every anti-diagonal as ints, bit x of int d set where (x, d - x) is open."""
+    # Diagonal d runs from x = max(0, d - height + 1) to min(d, width - 1), every
+    # height - 1 cells of the x * height + y layout
+    step = max(height - 1, 1)
+    diagonals = []
+    for d in range(width + height - 1):
+        first_x, last_x = max(0, d - height + 1), min(d, width - 1)
+        cells = bytes(open_cells[d + first_x * (height - 1):d + last_x * (height - 1) + 1:step])
+        diagonals.append(int(cells.translate(_DIGITS)[::-1] or b"0", 2) << first_x)
+    return diagonals
+
+
+def bitset_search(open_cells, width, height, start, goal):
+    """Return ``(path, nodes_expanded)``; ``path`` lists every cell or is None.
+
+    nodes_expanded counts the cells of the layers expanded from either end.
+    """
+    return drive(_search(open_cells, width, height, start, goal, False))
+
+
+def iter_bitset_search(open_cells, width, height, start, goal):
+    """Like bitset_search(), but yields search_events layer by layer and returns its result."""
+    return _search(open_cells, width, height, start, goal, True)
+
+
+def _search(open_cells, width, height, start, goal, trace):
+    # A generator either way, so both entry points share it; it only yields when tracing
+    if start == goal:
+        return [start], 1
+    if not open_cells[goal]:
+        return None, 0
+    last_diagonal = width + height - 2
+    # Per end: the diagonals' cells it hasn't reached yet, and its layers so far
+    sides = []
+    for cell in (start, goal):
+        remaining = diagonal_bits(open_cells, width, height)
+        x, y = divmod(cell, height)
+        remaining[x + y] &= ~(1 << x)
+        sides.append((remaining, [{x + y: 1 << x}]))
+    nodes_expanded = 0
+
+    while True:
+        side = 0 if len(sides[0][1][-1]) <= len(sides[1][1][-1]) else 1
+        remaining, layers = sides[side]
+        layer = layers[-1]
+        if not layer:
+            return None, nodes_expanded
+        other = sides[1 - side][1][-1]
+
+        spread = {}
+        for d, bits in layer.items():
+            if d < last_diagonal:
+                spread[d + 1] = spread.get(d + 1, 0) | bits | bits << 1
+            if d > 0:
+                spread[d - 1] = spread.get(d - 1, 0) | bits | bits >> 1
+        new_layer = {}
+        meet = None
+        for d, bits in spread.items():
+            # remaining[d] only has the bits of cells on the grid, so this also
+            # drops the steps off its edges
+            bits &= remaining[d]
+            if bits:
+                remaining[d] ^= bits
+                new_layer[d] = bits
+                if meet is None and bits & other.get(d, 0):
+                    both = bits & other[d]
+                    x = (both & -both).bit_length() - 1
+                    meet = x * height + d - x
+        layers.append(new_layer)
+        nodes_expanded += sum(bits.bit_count() for bits in layer.values())
+
+        if trace:
+            for cell in _cells(new_layer, height):
+                yield OPEN, cell
+            for cell in _cells(layer, height):
+                yield CLOSED, cell
+        if meet is not None:
+            # The first meeting is always with the other end's newest layer
+            to_start = _walk_back(sides[0][1], meet, width, height)
+            to_goal = _walk_back(sides[1][1], meet, width, height)
+            return to_start[::-1] + to_goal[1:], nodes_expanded
+
+
+def _walk_back(layers, cell, width, height):
+    # cell lies in the last layer; step through neighbours one layer nearer the first
+    path = [cell]
+    x, y = divmod(cell, height)
+    for layer in reversed(layers[:-1]):
+        for next_x, next_y, inside in ((x + 1, y, x < width - 1), (x, y - 1, y > 0),
+                                       (x - 1, y, x > 0), (x, y + 1, y < height - 1)):
+            if inside and layer.get(next_x + next_y, 0) >> next_x & 1:
+                x, y = next_x, next_y
+                break
+        path.append(x * height + y)
+    return path
+
+
+def _cells(layer, height):
+    for d, bits in layer.items():
+        while bits:
+            lowest = bits & -bits
+            x = lowest.bit_length() - 1
+            yield x * height + d - x
+            bits ^= lowest
@@ -0,0 +1,132 @@
+from array import array
+
+from search_events import CLOSED, OPEN
+
+# Tile costs are bytes (see dungeon_io), so no step costs more than this
+MAX_COST = 255
+
+
+# Dial's algorithm: Dijkstra with a bucket queue, for small integer costs.
+#
+# Each cell's byte in open_cells is the cost of stepping onto it (0 is a
+# wall), so the cost of a path is the sum of the bytes of every cell on it
+# but the start. Tentative distances are kept in MAX_COST + 1 buckets used
+# as a ring: bucket ``d % (MAX_COST + 1)`` holds the cells at distance d,
+# and no push lands more than MAX_COST buckets ahead of the one being
+# emptied, so the queue never needs a heap. Each cell is pushed at most once
+# per improvement and each bucket is visited once per distance, giving
+# O(cells + path cost) instead of Dijkstra's O(cells log cells) and
+# running close to a plain BFS.
+#
+# Buckets are emptied first in, first out, so on a unit-cost grid the search
+# expands cells in the order of bfs_solver.BFS.process and finds the same
+# path. Cells are indexed ``x * height + y``. Like BFS.process, a blocked
+# start still steps onto its open neighbours, and a blocked goal is only
+# reached by starting on it.
+def dial_search(open_cells, width, height, start, goal):
+    """Return ``(path, nodes_expanded)``; ``path`` lists every cell or is None."""
+    distances, parents, closed, buckets = _start(width, height, start)
+    ring = len(buckets)
+    pending = 1
+    distance = 0
+    nodes_expanded = 0
+    last_column, bottom = (width - 1) * height, height - 1
+
+    while pending:
+        bucket = buckets[distance % ring]
+        # Every push goes to a later bucket, so this one doesn't grow while it's emptied
+        pending -= len(bucket)
+        for current in bucket:
+            if closed[current] or distances[current] != distance:
+                continue  # superseded by a cheaper push
+            closed[current] = 1
+            nodes_expanded += 1
+
+            if current == goal:
+                return _path(parents, start, goal), nodes_expanded
+
+            y = current % height
+            for neighbor, inside in ((current + height, current < last_column), (current - 1, y > 0),
+                                     (current - height, current >= height), (current + 1, y < bottom)):
+                if inside and not closed[neighbor]:
+                    cost = open_cells[neighbor]
+                    if cost:
+                        new_distance = distance + cost
+                        old_distance = distances[neighbor]
+                        if old_distance == -1 or new_distance < old_distance:
+                            distances[neighbor] = new_distance
+                            parents[neighbor] = current
+                            buckets[new_distance % ring].append(neighbor)
+                            pending += 1
+        bucket.clear()
+        distance += 1
+
+    return None, nodes_expanded
+
+
+# dial_search() stays a plain loop because yielding events costs it about a
+# third of its speed; this generator version is for traces and the visualizers.
+def iter_dial_search(open_cells, width, height, start, goal):
+    """Like dial_search(), but yields search_events and returns its result."""
+    distances, parents, closed, buckets = _start(width, height, start)
+    ring = len(buckets)
+    pending = 1
+    distance = 0
+    nodes_expanded = 0
+    last_column, bottom = (width - 1) * height, height - 1
+
+    while pending:
+        bucket = buckets[distance % ring]
+        pending -= len(bucket)
+        for current in bucket:
+            if closed[current] or distances[current] != distance:
+                continue
+            closed[current] = 1
+            nodes_expanded += 1
+
+            if current == goal:
+                return _path(parents, start, goal), nodes_expanded
+
+            y = current % height
+            for neighbor, inside in ((current + height, current < last_column), (current - 1, y > 0),
+                                     (current - height, current >= height), (current + 1, y < bottom)):
+                if inside and not closed[neighbor]:
+                    cost = open_cells[neighbor]
+                    if cost:
+                        new_distance = distance + cost
+                        old_distance = distances[neighbor]
+                        if old_distance == -1 or new_distance < old_distance:
+                            distances[neighbor] = new_distance
+                            parents[neighbor] = current
+                            buckets[new_distance % ring].append(neighbor)
+                            pending += 1
+                            yield OPEN, neighbor
+
+            yield CLOSED, current
+        bucket.clear()
+        distance += 1
+
+    return None, nodes_expanded
+
+
+def _start(width, height, start):
+    # Distances, parents, closed flags and the bucket ring with only the start queued
+    size = width * height
+    distances = array('q', [-1]) * size
+    distances[start] = 0
+    buckets = [[] for _ in range(MAX_COST + 1)]
+    buckets[0].append(start)
+    return distances, array('i', [-1]) * size, bytearray(size), buckets
+
+
+def _path(parents, start, goal):
+    path = [goal]
+    while path[-1] != start:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return path
+
+
+def path_cost(open_cells, path):
+    """Cost of walking ``path`` (a list of cells): every step costs the cell stepped onto."""
+    return sum(open_cells[cell] for cell in path[1:])
@@ -0,0 +1,511 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import warnings
+from array import array
+from collections import deque
+from itertools import compress, repeat
+from operator import add, mul
+
+try:
+    import numpy
+except ImportError:  # the standard-library chunk parser is used instead
+    numpy = None
+
+# Dungeon file loading.
+#
+# The text format is a "M N" line, one "x y" line per obstacle, an optional
+# "Tile costs" section and an optional "Obstacle to remove = k" line, after
+# which the file is ignored. The "Tile costs" line is followed by one "x y c"
+# line per cell that costs c (2..MAX_COST) to step onto instead of 1, such
+# as mud or traps; an obstacle listed there too stays an obstacle. The
+# section goes before the removal line: one found after it is reported
+# rather than ignored. Blank lines are skipped; anything else is reported
+# with its line number.
+#
+# Big dungeons have millions of obstacle lines, so the file is memory-mapped
+# and the obstacle section is handled in chunks of whole lines: each chunk
+# is checked, split and converted with bytes/array/map calls that run in C
+# (or with NumPy when it is installed, several times faster), and the
+# obstacle cells are written straight into the ``reachable`` grid. Only a
+# chunk that fails the checks is walked line by line, to find the line to
+# report. Tile costs are stored in the grid itself: every open cell's byte
+# is its cost, so unit-cost grids hold only 0s and 1s and the engines that
+# ignore costs still see any non-zero byte as open.
+#
+# The binary format skips parsing altogether: BINARY_HEADER (magic, version,
+# packing, width, height, start cell, goal cell, removal budget, obstacle
+# count) followed by the obstacle map, either one byte per cell in the
+# ``reachable`` layout (non-zero = open, the byte being the tile cost) or
+# bit-packed (unit costs only), eight cells per byte
+# with the first cell in the lowest bit. A byte map is used as the grid
+# straight from a copy-on-write memory map, so even a 10000x10000 dungeon
+# opens without reading the map; opening cells later touches only the pages
+# they are on, and never the file. Binary files have no obstacle order, so
+# their obstacles come in cell order (see ObstacleList.from_map).
+
+CHUNK_SIZE = 1 << 22
+FOOTER = b"Obstacle to remove"
+COSTS_HEADER = b"Tile costs"
+# Tile costs are stored one byte per cell
+MAX_COST = 255
+
+BINARY_MAGIC = b"DNGN"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBB2xIIIIII")
+BYTE_MAP, BIT_MAP = 0, 1
+
+# Eight map bytes, read as one native uint64, for every packed byte and back
+_UNPACKED = [int.from_bytes(bytes((byte >> bit) & 1 for bit in range(8)), sys.byteorder) for byte in range(256)]
+_PACKED = {unpacked: byte for byte, unpacked in enumerate(_UNPACKED)}
+# bytes.translate() tables marking the open (non-zero), the blocked or the costlier than 1 cells with 1
+_OPEN_TABLE = bytes([0]) + bytes([1]) * 255
+_BLOCKED_TABLE = bytes([1]) + bytes(255)
+_COSTLY_TABLE = bytes(2) + bytes([1]) * 254
+
+
+class DungeonFormatError(ValueError):
+    def __init__(self, filename, line_number, message):
+        super().__init__(f"{filename}, line {line_number}: {message}")
+        self.filename = filename
+        self.line_number = line_number
+
+
+class Dungeon:
+    """A loaded dungeon: ``reachable`` holds one byte per ``x * height + y``
+    cell and ``obstacles`` is an ObstacleList. Start and goal default to the
+    top-left and bottom-right corners, the only ones the text format knows."""
+
+    def __init__(self, width, height, reachable, obstacles, removal_budget=0, start=None, goal=None):
+        self.width = width
+        self.height = height
+        self.reachable = reachable
+        self.obstacles = obstacles
+        self.removal_budget = removal_budget
+        self.start = 0 if start is None else start
+        self.goal = width * height - 1 if goal is None else goal
+
+
+class ObstacleList:
+    """Obstacle coordinates in input order, stored as flat ``x * height + y`` cells.
+
+    Behaves like the list of ``(x, y)`` tuples it replaces (len, iteration,
+    indexing, append and pop) at 4 bytes per obstacle instead of a tuple
+    and two ints each.
+    """
+
+    def __init__(self, height, obstacles=(), cells=None):
+        self.height = height
+        self._cells = array('i') if cells is None else cells
+        self._map = None
+        self._count = 0
+        for x, y in obstacles:
+            self.append((x, y))
+
+    @classmethod
+    def from_map(cls, height, reachable, count):
+        """The ``count`` blocked cells of ``reachable``, in cell order.
+
+        The map is only scanned when the cells are first needed, so loading
+        a binary dungeon stays instant; until then ``reachable`` must only
+        change through this list.
+        """
+        obstacles = cls(height)
+        obstacles._cells = None
+        obstacles._map = reachable
+        obstacles._count = count
+        return obstacles
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            self._cells = _blocked_cells(self._map)
+            self._map = None
+        return self._cells
+
+    def __len__(self):
+        return self._count if self._cells is None else len(self._cells)
+
+    def __iter__(self):
+        height = self.height
+        for cell in self.cells:
+            yield divmod(cell, height)
+
+    def __getitem__(self, index):
+        return divmod(self.cells[index], self.height)
+
+    def append(self, obstacle):
+        x, y = obstacle
+        self.cells.append(x * self.height + y)
+
+    def pop(self):
+        return divmod(self.cells.pop(), self.height)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"ObstacleList({list(self)!r})"
+
+
+def read_dungeon(filename):
+    """Load a text or binary dungeon file, told apart by the binary magic."""
+    with open(filename, "rb") as file:
+        magic = file.read(len(BINARY_MAGIC))
+    if magic == BINARY_MAGIC:
+        return read_binary_dungeon(filename)
+    return read_text_dungeon(filename)
+
+
+def read_text_dungeon(filename):
+    """Parse a text dungeon file into a Dungeon with a bytearray grid.
+
+    Raises DungeonFormatError for malformed lines and OSError when the file
+    can't be read.
+    """
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise DungeonFormatError(filename, 1, "the file is empty; expected the grid size 'M N'")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _parse(filename, data)
+
+
+def _parse(filename, data):
+    header_end = data.find(b"\n")
+    if header_end == -1:
+        header_end = len(data)
+    width, height = _parse_header(filename, data[:header_end])
+
+    body_start = min(header_end + 1, len(data))
+    footer_start = _find_footer(data, body_start)
+    body_end = len(data) if footer_start == -1 else footer_start
+    costs_start = _find_line(data, COSTS_HEADER, body_start, body_end)
+
+    reachable = bytearray(b'\x01') * (width * height)
+    obstacles_end = body_end if costs_start == -1 else costs_start
+    (cells,), line_number = _parse_section(filename, data, body_start, obstacles_end, 2, width, height, fields=2)
+    if costs_start != -1:
+        costs_body = data.find(b"\n", costs_start, body_end)
+        costs_body = body_end if costs_body == -1 else costs_body + 1
+        header = data[costs_start:costs_body]
+        if header.strip() != COSTS_HEADER:
+            raise DungeonFormatError(filename, line_number, f"expected '{COSTS_HEADER.decode()}', got {_shown(header)}")
+        (cost_cells, costs), line_number = _parse_section(filename, data, costs_body, body_end, line_number + 1,
+                                                          width, height, fields=3)
+        # Write every cost, then clear the obstacles over them, without a Python-level loop
+        if numpy is not None:
+            numpy.frombuffer(reachable, dtype=numpy.uint8)[numpy.frombuffer(cost_cells, dtype=numpy.int32)] = \
+                numpy.frombuffer(costs, dtype=numpy.int32)
+        else:
+            deque(map(reachable.__setitem__, cost_cells, costs), maxlen=0)
+
+    # Clear every obstacle cell without a Python-level loop
+    if numpy is not None:
+        numpy.frombuffer(reachable, dtype=numpy.uint8)[numpy.frombuffer(cells, dtype=numpy.int32)] = 0
+    else:
+        deque(map(reachable.__setitem__, cells, repeat(0)), maxlen=0)
+
+    removal_budget = 0
+    if footer_start != -1:
+        footer_end = data.find(b"\n", footer_start)
+        footer = data[footer_start:len(data) if footer_end == -1 else footer_end]
+        removal_budget = _parse_footer(filename, footer, line_number)
+        misplaced = _find_line(data, COSTS_HEADER, footer_start, len(data))
+        if misplaced != -1:
+            raise DungeonFormatError(filename, line_number + data[footer_start:misplaced].count(b"\n"),
+                                     f"the '{COSTS_HEADER.decode()}' section must come before the "
+                                     f"'{FOOTER.decode()}' line")
+
+    return Dungeon(width, height, reachable, ObstacleList(height, cells=cells), removal_budget)
+
+
+def _parse_section(filename, data, start, end, line_number, width, height, fields):
+    # Parse the lines of data[start:end] holding ``fields`` numbers each, a
+    # chunk at a time; return the per-field arrays (cells, then costs) and
+    # the line number after the section
+    columns = None
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = data.find(b"\n", min(chunk_start + CHUNK_SIZE, end) - 1, end)
+        chunk_end = end if chunk_end == -1 else chunk_end + 1
+        chunk = data[chunk_start:chunk_end]
+        chunk_columns = None
+        if numpy is not None:
+            chunk_columns = _parse_chunk_numpy(chunk, width, height, fields)
+        if chunk_columns is None:
+            chunk_columns = _parse_chunk(chunk, width, height, fields)
+        if chunk_columns is None:
+            _report_bad_line(filename, chunk, line_number, width, height, fields)
+        if columns is None:
+            columns = chunk_columns
+        else:
+            for column, chunk_column in zip(columns, chunk_columns):
+                column.extend(chunk_column)
+        line_number += chunk.count(b"\n")
+        chunk_start = chunk_end
+    if columns is None:
+        columns = tuple(array('i') for _ in range(fields - 1))
+    return columns, line_number
+
+
+def read_binary_dungeon(filename):
+    """Open a binary dungeon file as a Dungeon.
+
+    A byte map becomes the grid as is, through a private memory map; a bit
+    map is unpacked into a bytearray. Raises ValueError for files that
+    aren't binary dungeons or are truncated, and OSError when the file
+    can't be read.
+    """
+    with open(filename, "rb") as file:
+        header = file.read(BINARY_HEADER.size)
+        if len(header) < BINARY_HEADER.size or header[:4] != BINARY_MAGIC:
+            raise ValueError(f"{filename} is not a binary dungeon")
+        (_, version, packing, width, height, start, goal,
+         removal_budget, num_obstacles) = BINARY_HEADER.unpack(header)
+        if version != BINARY_VERSION:
+            raise ValueError(f"{filename} is a version {version} binary dungeon, expected version {BINARY_VERSION}")
+        if packing not in (BYTE_MAP, BIT_MAP):
+            raise ValueError(f"{filename} has an unknown obstacle map packing {packing}")
+        size = width * height
+        if width <= 0 or height <= 0 or not (0 <= start < size and 0 <= goal < size):
+            raise ValueError(f"{filename} has an invalid binary dungeon header")
+        map_size = size if packing == BYTE_MAP else (size + 7) // 8
+        if os.fstat(file.fileno()).st_size < BINARY_HEADER.size + map_size:
+            raise ValueError(f"{filename} has a truncated obstacle map")
+
+        if packing == BYTE_MAP:
+            # ACCESS_COPY: writes to the grid stay in this process's memory
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+            reachable = memoryview(data)[BINARY_HEADER.size:BINARY_HEADER.size + size]
+        else:
+            reachable = unpack_bits(file.read(map_size), size)
+    return Dungeon(width, height, reachable, ObstacleList.from_map(height, reachable, num_obstacles),
+                   removal_budget, start, goal)
+
+
+def write_binary_dungeon(filename, dungeon, packed=False):
+    """Write a Dungeon in the binary format, bit-packed if ``packed``.
+
+    Raises ValueError for a bit-packed map of a dungeon with tile costs.
+    """
+    cells = bytes(dungeon.reachable)
+    if packed:
+        if max_cost(cells) > 1:
+            raise ValueError("a bit-packed obstacle map can't hold tile costs; write a byte map instead")
+        # Any non-zero byte is open; the map is packed as 0/1
+        cells = cells.translate(_OPEN_TABLE)
+    num_obstacles = cells.count(0)
+    with open(filename, "wb") as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, BIT_MAP if packed else BYTE_MAP,
+                                      dungeon.width, dungeon.height, dungeon.start, dungeon.goal,
+                                      dungeon.removal_budget, num_obstacles))
+        file.write(pack_bits(cells) if packed else cells)
+
+
+def write_text_dungeon(filename, dungeon):
+    """Write a Dungeon in the text format, its obstacles in list order and any tile costs before the removal count."""
+    if dungeon.start != 0 or dungeon.goal != dungeon.width * dungeon.height - 1:
+        raise ValueError("the text format can only hold dungeons that start and end at the corners")
+    height = dungeon.height
+    with open(filename, "w") as file:
+        file.write(f"{dungeon.width} {height}\n")
+        cells = dungeon.obstacles.cells
+        for chunk_start in range(0, len(cells), CHUNK_SIZE):
+            file.writelines(f"{cell // height} {cell % height}\n"
+                            for cell in cells[chunk_start:chunk_start + CHUNK_SIZE])
+        costly = _costly_cells(dungeon.reachable)
+        if costly:
+            reachable = dungeon.reachable
+            file.write(f"{COSTS_HEADER.decode()}\n")
+            for chunk_start in range(0, len(costly), CHUNK_SIZE):
+                file.writelines(f"{cell // height} {cell % height} {reachable[cell]}\n"
+                                for cell in costly[chunk_start:chunk_start + CHUNK_SIZE])
+        file.write(f"Obstacle to remove = {dungeon.removal_budget}\n")
+
+
+def pack_bits(cells):
+    """Pack a 0/1 byte map eight cells per byte, the first cell in the lowest bit."""
+    padding = -len(cells) % 8
+    groups = array('Q')
+    groups.frombytes(bytes(cells) + bytes(padding))
+    return bytes(map(_PACKED.__getitem__, groups))
+
+
+def unpack_bits(packed, size):
+    """The bytearray 0/1 map of ``size`` cells packed by pack_bits."""
+    cells = bytearray(array('Q', map(_UNPACKED.__getitem__, packed)).tobytes())
+    del cells[size:]
+    return cells
+
+
+def max_cost(reachable):
+    """The highest tile cost in a grid: 1 when every open cell costs 1, 0 when none is open."""
+    if numpy is not None:
+        return int(numpy.frombuffer(reachable, dtype=numpy.uint8).max(initial=0))
+    cells = bytes(reachable)
+    # Only the costly cells are left to scan
+    return max(cells.translate(None, b"\x00\x01"), default=1 if 1 in cells else 0)
+
+
+def _costly_cells(reachable):
+    if numpy is not None:
+        return array('i', numpy.flatnonzero(numpy.frombuffer(reachable, dtype=numpy.uint8) > 1)
+                     .astype(numpy.int32).tobytes())
+    return array('i', compress(range(len(reachable)), bytes(reachable).translate(_COSTLY_TABLE)))
+
+
+def _blocked_cells(reachable):
+    if numpy is not None:
+        return array('i', numpy.flatnonzero(numpy.frombuffer(reachable, dtype=numpy.uint8) == 0)
+                     .astype(numpy.int32).tobytes())
+    return array('i', compress(range(len(reachable)), bytes(reachable).translate(_BLOCKED_TABLE)))
+
+
+def _find_footer(data, start):
+    return _find_line(data, FOOTER, start, len(data))
+
+
+def _find_line(data, marker, start, end):
+    # Start of the first line in data[start:end] beginning with marker (after optional indentation)
+    position = data.find(marker, start, end)
+    while position != -1:
+        line_start = data.rfind(b"\n", 0, position) + 1
+        if not data[line_start:position].strip():
+            return line_start
+        position = data.find(marker, position + 1, end)
+    return -1
+
+
+def _parse_header(filename, line):
+    fields = line.split()
+    try:
+        width, height = map(int, fields)
+    except ValueError:
+        raise DungeonFormatError(filename, 1, f"expected the grid size 'M N', got {_shown(line)}") from None
+    if width <= 0 or height <= 0:
+        raise DungeonFormatError(filename, 1, f"grid size must be positive, got {width}x{height}")
+    return width, height
+
+
+def _parse_footer(filename, line, line_number):
+    _, equals, value = line.partition(b"=")
+    try:
+        if not equals:
+            raise ValueError
+        budget = int(value)
+    except ValueError:
+        raise DungeonFormatError(filename, line_number,
+                                 f"expected 'Obstacle to remove = k', got {_shown(line)}") from None
+    if budget < 0:
+        raise DungeonFormatError(filename, line_number, f"the removal budget can't be negative, got {budget}")
+    return budget
+
+
+def _parse_chunk(chunk, width, height, fields=2):
+    """Return the chunk's cells as ``(cells,)``, or ``(cells, costs)`` for
+    three-field cost lines, or None if any line is malformed."""
+    # Every line must hold ``fields`` fields (blank lines hold none)
+    if not {len(line) for line in map(bytes.split, chunk.splitlines())} <= {0, fields}:
+        return None
+    try:
+        values = array('i', map(int, chunk.split()))
+    except (ValueError, OverflowError):
+        return None
+    xs, ys = values[0::fields], values[1::fields]
+    if xs and (min(xs) < 0 or max(xs) >= width or min(ys) < 0 or max(ys) >= height):
+        return None
+    cells = array('i', map(add, map(mul, xs, repeat(height)), ys))
+    if fields == 2:
+        return (cells,)
+    costs = values[2::3]
+    if costs and (min(costs) < 2 or max(costs) > MAX_COST):
+        return None
+    return cells, costs
+
+
+def _parse_chunk_numpy(chunk, width, height, fields=2):
+    """Like _parse_chunk, but vectorized with NumPy."""
+    raw = numpy.frombuffer(chunk, dtype=numpy.uint8)
+    newline = raw == ord("\n")
+    blank = newline | (raw == ord(" ")) | (raw == ord("\t")) | (raw == ord("\r"))
+    # A field starts at every non-blank byte after a blank one; count them per line
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    fields_per_line = numpy.bincount(numpy.cumsum(newline)[starts])
+    if numpy.any((fields_per_line != 0) & (fields_per_line != fields)):
+        return None
+    try:
+        with warnings.catch_warnings():
+            # Older NumPy only warns, and stops early, at a field it can't read
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = numpy.fromstring(chunk, dtype=numpy.int64, sep=" ")
+    except ValueError:
+        return None
+    if len(values) != numpy.count_nonzero(starts):
+        return None
+    xs, ys = values[0::fields], values[1::fields]
+    if len(xs) and (xs.min() < 0 or xs.max() >= width or ys.min() < 0 or ys.max() >= height):
+        return None
+    cells = array('i', (xs * height + ys).astype(numpy.int32).tobytes())
+    if fields == 2:
+        return (cells,)
+    costs = values[2::3]
+    if len(costs) and (costs.min() < 2 or costs.max() > MAX_COST):
+        return None
+    return cells, array('i', costs.astype(numpy.int32).tobytes())
+
+
+def _report_bad_line(filename, chunk, line_number, width, height, fields=2):
+    kind, expected = ("obstacle", "an obstacle 'x y'") if fields == 2 else ("tile cost", "a tile cost 'x y c'")
+    for offset, line in enumerate(chunk.split(b"\n")):
+        values = line.split()
+        if not values:
+            continue
+        try:
+            x, y, *cost = map(int, values)
+            if len(cost) != fields - 2:
+                raise ValueError
+        except ValueError:
+            raise DungeonFormatError(filename, line_number + offset,
+                                     f"expected {expected}, got {_shown(line)}") from None
+        if not (0 <= x < width and 0 <= y < height):
+            raise DungeonFormatError(filename, line_number + offset,
+                                     f"{kind} ({x}, {y}) is outside the {width}x{height} grid")
+        if cost and not 2 <= cost[0] <= MAX_COST:
+            raise DungeonFormatError(filename, line_number + offset,
+                                     f"tile cost {cost[0]} at ({x}, {y}) is outside 2..{MAX_COST}")
+    raise DungeonFormatError(filename, line_number, f"malformed {kind} section")
+
+
+def _shown(line):
+    return repr(line.strip().decode(errors="replace"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert dungeon files between the text and binary formats.")
+    parser.add_argument("input_file", help="text or binary dungeon file")
+    parser.add_argument("output_file", help="file to write")
+    parser.add_argument("--to", choices=("binary", "text"), default="binary",
+                        help="format to write (default: binary)")
+    parser.add_argument("--packed", action="store_true",
+                        help="bit-pack the binary obstacle map (8x smaller, but unpacked on load)")
+    args = parser.parse_args()
+
+    try:
+        dungeon = read_dungeon(args.input_file)
+        if args.to == "binary":
+            write_binary_dungeon(args.output_file, dungeon, packed=args.packed)
+        else:
+            write_text_dungeon(args.output_file, dungeon)
+    except (OSError, ValueError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    print(f"Wrote the {dungeon.width}x{dungeon.height} dungeon with {len(dungeon.obstacles)} obstacles "
+          f"to {args.output_file} ({os.path.getsize(args.output_file)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,33 @@
+import os
 import pygame
 import sys
 import math
-from queue import PriorityQueue
-from queue import Queue
+from collections import deque
+
+import astar_solver
+import dial_solver
+import dungeon_io
+import instrumentation
+import jps_solver
+import hpa_solver
+import lpa_solver
+import reachability
+import result_cache
+from renderer import MIN_CELL_SIZE, DirtyRectRenderer, PixelArrayRenderer
+from search_events import CLOSED, DEFAULT_SPEED, FPS, FRAME_BUDGET, OPEN, PATH, SPEEDS, Playback, map_events, speed_name
+from search_trace import SearchTrace, TraceCursor
 
 WIDTH = 800
 WIN = pygame.display.set_mode((WIDTH, WIDTH))
 pygame.display.set_caption("Visualisation")
 
+# Search counters and phase times, switched on with SEARCH_PROFILE (see instrumentation)
+PROFILER = instrumentation.from_environment()
+
+# Finished searches by grid contents, so re-running an unchanged grid shows the
+# path at once; SEARCH_CACHE_DIR keeps them on disk too (see result_cache)
+RESULT_CACHE = result_cache.ResultCache(directory=os.environ.get("SEARCH_CACHE_DIR"))
+
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 255, 0)
@@ -18,18 +38,47 @@ PURPLE = (128, 0, 128)
 ORANGE = (255, 165 ,0)
 GREY = (128, 128, 128)
 TURQUOISE = (64, 224, 208)
+SAND = (238, 214, 175)
+MUD = (101, 67, 33)
+
+# Tile costs the number keys paint with (0 paints walls); dearer terrain is
+# drawn darker, from sand to mud, and costs above the highest as it
+MAX_BRUSH_COST = 9
+
+def terrain_color(cost):
+    if cost <= 1:
+        return WHITE
+    shade = (min(cost, MAX_BRUSH_COST) - 2) / (MAX_BRUSH_COST - 2)
+    return tuple(round(light + (dark - light) * shade) for light, dark in zip(SAND, MUD))
 
 class Spot:
+	# Spots whose colour changed since the last frame, drained by the renderer;
+	# None while nothing is rendering
+	changed = None
+
 	def __init__(self, row, col, width, total_rows):
 		self.row = row
 		self.col = col
 		self.x = row * width
 		self.y = col * width
-		self.color = WHITE
+		self._color = WHITE
+		# Cost of stepping onto this spot when it isn't a barrier
+		self.cost = 1
 		self.neighbors = []
 		self.width = width
 		self.total_rows = total_rows
 
+	@property
+	def color(self):
+		return self._color
+
+	@color.setter
+	def color(self, color):
+		if color != self._color:
+			self._color = color
+			if Spot.changed is not None:
+				Spot.changed.append(self)
+
 	def get_pos(self):
 		return self.row, self.col
 
@@ -49,7 +98,11 @@ class Spot:
 		return self.color == TURQUOISE
 
 	def reset(self):
-		self.color = WHITE
+		self.color = terrain_color(self.cost)
+
+	def make_terrain(self, cost):
+		self.cost = cost
+		self.reset()
 
 	def make_start(self):
 		self.color = ORANGE
@@ -90,112 +143,259 @@ class Spot:
 		return False
 
 
-def h(p1, p2):
-	x1, y1 = p1
-	x2, y2 = p2
-	return abs(x1 - x2) + abs(y1 - y2)
+# How each search event recolours a spot; start, end and barriers keep their colours
+EVENT_COLORS = {OPEN: Spot.make_open, CLOSED: Spot.make_closed, PATH: Spot.make_path}
+
+def apply_event(event):
+    kind, spot = event
+    if not (spot.is_start() or spot.is_end() or spot.is_barrier()):
+        EVENT_COLORS[kind](spot)
+
 
+# The algorithms below are generators of search_events over spots; the main
+# loop plays them back at the selected speed.
 
-def reconstruct_path(came_from, current, draw):
+def reconstruct_path(came_from, current):
     path = []
     # Start with the current node (which should be the end node when this function is called)
     while current in came_from:
         path.append(current)
         current = came_from[current]
-        current.make_path()
-        draw()
     # Reverse the path to start from the beginning (the start node will be added separately if needed)
     path.reverse()
     return path
 
 
+def report_path(path, nodes_expanded, shown="explored nodes", expanded_label="Nodes expanded"):
+    for spot in reversed(path):
+        yield PATH, spot
+    print(f"The visualized grid shows the {shown} and the final path.\n")
+    print(f"The shortest path is {len(path) - 1}. Such path is: " +
+          " -> ".join(f"({spot.row}, {spot.col})" for spot in path))
+    print(f"{expanded_label}: {nodes_expanded}")
+
+
+def astar_algorithm(grid, start, end, heuristic="manhattan", tie_break="fifo"):
+    print(f"--- Starting A* algorithm ({heuristic} heuristic, {tie_break} tie-breaking) ---\n")
+    # The engine works on integer indices; map them back to spots here
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    neighbors = lambda index: [spot.row * cols + spot.col for spot in spot_at(index).neighbors]
+    start_index, end_index = start.row * cols + start.col, end.row * cols + end.col
+    landmarks = None
+    if heuristic == "alt":
+        landmarks = astar_solver.Landmarks(neighbors, len(grid) * cols, first=start_index)
+
+    path, nodes_expanded = yield from map_events(astar_solver.iter_astar(
+        start_index,
+        end_index,
+        neighbors,
+        astar_solver.make_heuristic(heuristic, end_index, cols, landmarks),
+        tie_break=astar_solver.make_tie_breaker(tie_break, start_index, end_index, cols),
+    ), spot_at)
+
+    if path is not None:
+        yield from report_path([spot_at(index) for index in path], nodes_expanded)
+        return True
 
-def astar_algorithm(draw, grid, start, end):
-    print("--- Starting A* algorithm ---\n")
-    count = 0
-    open_set = PriorityQueue()
-    open_set.put((0, count, start))
-    came_from = {}
-    g_score = {spot: float("inf") for row in grid for spot in row}
-    g_score[start] = 0
-    f_score = {spot: float("inf") for row in grid for spot in row}
-    f_score[start] = h(start.get_pos(), end.get_pos())
+    print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return False
 
-    open_set_hash = {start}
+def bfs_algorithm(grid, start, end):
+    print("--- Starting BFS algorithm ---\n")
+    queue = deque([start])
+    came_from = {}
+    visited = {start}
+    nodes_expanded = 0
 
-    while not open_set.empty():
-        current = open_set.get()[2]
-        open_set_hash.remove(current)
+    while queue:
+        current = queue.popleft()
+        nodes_expanded += 1
 
         if current == end:
-            path = reconstruct_path(came_from, current, draw)
+            path = reconstruct_path(came_from, current)
             path.insert(0, start)  # Include start in the path
-            path_length = len(path) - 1  # Since path includes start and end
-            print("The visualized grid shows the explored nodes and the final path.\n")
-            print(f"The shortest path is {path_length}. Such path is: " +
-                  " -> ".join(f"({spot.row}, {spot.col})" for spot in path))
+            yield from report_path(path, nodes_expanded)
             return True
 
         for neighbor in current.neighbors:
-            temp_g_score = g_score[current] + 1
-
-            if temp_g_score < g_score[neighbor]:
+            if neighbor not in visited and not neighbor.is_barrier():
                 came_from[neighbor] = current
-                g_score[neighbor] = temp_g_score
-                f_score[neighbor] = temp_g_score + h(neighbor.get_pos(), end.get_pos())
-                if neighbor not in open_set_hash:
-                    count += 1
-                    open_set.put((f_score[neighbor], count, neighbor))
-                    open_set_hash.add(neighbor)
-                    neighbor.make_open()
+                visited.add(neighbor)
+                queue.append(neighbor)
+                yield OPEN, neighbor
 
-        draw()
+        yield CLOSED, current
+
+    print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return False
 
-        if current != start:
-            current.make_closed()
+def bidirectional_bfs_algorithm(grid, start, end):
+    print("--- Starting bidirectional BFS algorithm ---\n")
+    # Frontiers grow from both corners; side 0 is the start's, side 1 the end's
+    frontiers = (deque([start]), deque([end]))
+    came_from = ({}, {})
+    side = {start: 0, end: 1}
+    depth = {start: 0, end: 0}
+    nodes_expanded = 0
+
+    while frontiers[0] and frontiers[1]:
+        # Expand one whole layer of the smaller frontier
+        expanding = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        queue = frontiers[expanding]
+        meeting = None
+
+        for _ in range(len(queue)):
+            current = queue.popleft()
+            nodes_expanded += 1
+            for neighbor in current.neighbors:
+                if neighbor.is_barrier():
+                    continue
+                if neighbor not in side:
+                    side[neighbor] = expanding
+                    depth[neighbor] = depth[current] + 1
+                    came_from[expanding][neighbor] = current
+                    queue.append(neighbor)
+                    yield OPEN, neighbor
+                elif side[neighbor] != expanding:
+                    length = depth[current] + 1 + depth[neighbor]
+                    if meeting is None or length < meeting[0]:
+                        meeting = (length, current, neighbor)
+
+            yield CLOSED, current
+
+        if meeting:
+            _, meet_start, meet_end = meeting
+            if expanding == 1:
+                meet_start, meet_end = meet_end, meet_start
+            path = [meet_start]
+            while path[-1] in came_from[0]:
+                path.append(came_from[0][path[-1]])
+            path.reverse()
+            path.append(meet_end)
+            while path[-1] in came_from[1]:
+                path.append(came_from[1][path[-1]])
+            yield from report_path(path, nodes_expanded)
+            return True
 
     print("No solution is found! We need to eliminate more obstacles to find such a walk.")
     return False
 
-def bfs_algorithm(draw, grid, start, end):
-    print("--- Starting BFS algorithm ---\n")
-    queue = Queue()
-    queue.put(start)
-    came_from = {}
-    visited = {spot: False for row in grid for spot in row}
-    visited[start] = True
+def jps_algorithm(grid, start, end):
+    print("--- Starting Jump Point Search algorithm ---\n")
+    # The engine works on x * height + y indices with x = row and y = col
+    rows, cols = len(grid), len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    open_cells = bytearray(not spot.is_barrier() for row in grid for spot in row)
 
-    while not queue.empty():
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
+    path, jump_points = yield from map_events(jps_solver.iter_jump_point_search(
+        open_cells, rows, cols,
+        start.row * cols + start.col,
+        end.row * cols + end.col,
+    ), spot_at)
 
-        current = queue.get()
+    if path is not None:
+        yield from report_path([spot_at(index) for index in path], jump_points, "jump points", "Jump points expanded")
+        return True
 
-        if current == end:
-            path = reconstruct_path(came_from, current, draw)
-            path.insert(0, start)  # Include start in the path
-            path_length = len(path) - 1  # Since path includes start and end
-            print("The visualized grid shows the explored nodes and the final path.\n")
-            print(f"The shortest path is {path_length}. Such path is: " +
-                  " -> ".join(f"({spot.row}, {spot.col})" for spot in path))
-            return True
+    print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return False
 
-        for neighbor in current.neighbors:
-            if not visited[neighbor] and not neighbor.is_barrier():
-                came_from[neighbor] = current
-                visited[neighbor] = True
-                queue.put(neighbor)
-                neighbor.make_open()
+def lpa_algorithm(grid, start, end, planner):
+    print("--- Starting LPA* (incremental) algorithm ---\n")
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
 
-        draw()
+    # Clear the previous run's colours so the repaired region stands out
+    clear_search(grid)
+
+    # Newly blocked cells are expanded too, to raise their distance; apply_event leaves them black
+    path, nodes_expanded = yield from map_events(planner.iter_compute_path(), spot_at)
+
+    if path is not None:
+        yield from report_path([spot_at(index) for index in path], nodes_expanded, "re-expanded nodes")
+        return True
+
+    print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return False
+
+def cached_algorithm(grid, cached):
+    print("--- Showing the cached result for this grid ---\n")
+    cols = len(grid[0])
+    clear_search(grid)
+    found = yield from result_cache.replay_path(cached, lambda index: grid[index // cols][index % cols])
+    if found:
+        print(f"The shortest path is {len(cached['path']) - 1}.")
+    else:
+        print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return found
+
+def walled_off_algorithm(grid):
+    print("--- The princess is walled off from the knight; nothing to search ---\n")
+    clear_search(grid)
+    print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return False
+    yield  # a search with no events
+
+def hpa_algorithm(grid, start, end, hierarchy):
+    print("--- Starting HPA* (hierarchical) algorithm ---\n")
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+
+    # Only the abstract nodes (cluster entrances) are searched; the path is refined afterwards
+    path, nodes_expanded = yield from map_events(
+        hierarchy.iter_find_path(start.row * cols + start.col, end.row * cols + end.col), spot_at)
+
+    if path is not None:
+        yield from report_path([spot_at(index) for index in path], nodes_expanded, "abstract nodes",
+                               "Abstract nodes expanded")
+        return True
+
+    print("No solution is found! We need to eliminate more obstacles to find such a walk.")
+    return False
 
-        if current != start:
-            current.make_closed()
+def dial_algorithm(grid, start, end):
+    print("--- Starting Dial's algorithm (tile costs) ---\n")
+    # The engine works on x * height + y indices with x = row and y = col
+    rows, cols = len(grid), len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    cells = grid_cells(grid)
+
+    path, nodes_expanded = yield from map_events(dial_solver.iter_dial_search(
+        cells, rows, cols, start.row * cols + start.col, end.row * cols + end.col), spot_at)
+
+    if path is not None:
+        yield from report_path([spot_at(index) for index in path], nodes_expanded)
+        print(f"The path costs {dial_solver.path_cost(cells, path)}.")
+        return True
 
     print("No solution is found! We need to eliminate more obstacles to find such a walk.")
     return False
 
+def clear_search(grid):
+    for row in grid:
+        for spot in row:
+            if spot.is_open() or spot.is_closed() or spot.color == PURPLE:
+                spot.reset()
+
+def grid_cells(grid):
+    """One byte per spot as in dungeon_io: 0 for barriers, otherwise the spot's cost."""
+    return bytearray(0 if spot.is_barrier() else spot.cost for row in grid for spot in row)
+
+def place_dungeon(grid, dungeon):
+    """Lay a dungeon_io.Dungeon onto the grid; return its start and end spots."""
+    cols = len(grid[0])
+    spot_at = lambda index: grid[index // cols][index % cols]
+    for index, cost in enumerate(dungeon.reachable):
+        if not cost:
+            spot_at(index).make_barrier()
+        elif cost > 1:
+            spot_at(index).make_terrain(cost)
+    start, end = spot_at(dungeon.start), spot_at(dungeon.goal)
+    start.make_start()
+    end.make_end()
+    return start, end
+
 def make_grid(rows, width):
 	grid = []
 	gap = width // rows
@@ -212,26 +412,23 @@ def draw_grid(win, rows, width):
 	gap = width // rows
 	for i in range(rows):
 		pygame.draw.line(win, GREY, (0, i * gap), (width, i * gap))
-		for j in range(rows):
-			pygame.draw.line(win, GREY, (j * gap, 0), (j * gap, width))
+		pygame.draw.line(win, GREY, (i * gap, 0), (i * gap, width))
 
 def draw_text(win, text, position, size=20, color=(255, 255, 255)):
     font = pygame.font.SysFont(None, size)
     text_surface = font.render(text, True, color)
     win.blit(text_surface, position)
 
-def draw(win, grid, rows, width):
-	win.fill(WHITE)
-
-	for row in grid:
-		for spot in row:
-			spot.draw(win)
-
-	draw_grid(win, rows, width)
-	pygame.display.update()
+def make_renderer(win, grid, rows, width):
+	# Cells too small for a rectangle and grid lines each are drawn as a zoomable pixel array
+	if width // rows < MIN_CELL_SIZE:
+		return PixelArrayRenderer(win, grid, Spot.changed, GREY)
+	return DirtyRectRenderer(win, grid, Spot.changed, lambda surface: draw_grid(surface, rows, width))
 
-
-def get_clicked_pos(pos, rows, width):
+def get_clicked_pos(pos, rows, width, view):
+	# None off the grid of a zoomed pixel array
+	if isinstance(view, PixelArrayRenderer):
+		return view.cell_at(pos)
 	gap = width // rows
 	y, x = pos
 
@@ -241,64 +438,273 @@ def get_clicked_pos(pos, rows, width):
 	return row, col
 
 
+def replay(win, width, trace, speed=DEFAULT_SPEED):
+    """Play back a trace recorded by "bfs_solver.py --trace".
+
+    Space pauses and resumes, left/right step back and forth by 1% of the
+    trace, home/end and the number keys jump to the start, the end or that
+    many tenths of the way, and up/down change the speed.
+    """
+    if trace.width != trace.height:
+        print(f"game.py only shows square grids; replay this {trace.width}x{trace.height} trace with all.py.")
+        return
+    rows = trace.width
+    grid = make_grid(rows, width)
+    spot_at = lambda index: grid[index // rows][index % rows]
+    for index, cost in enumerate(trace.open_cells):
+        if not cost:
+            spot_at(index).make_barrier()
+        elif cost > 1:
+            spot_at(index).make_terrain(cost)
+    spot_at(trace.start).make_start()
+    spot_at(trace.goal).make_end()
+    path = trace.path()
+    print(f"Replaying the {trace.engine} search trace ({len(trace)} events): "
+          f"shortest path {len(path) - 1 if path else 'not found'}, {trace.nodes_expanded} nodes expanded")
+
+    Spot.changed = []
+    view = make_renderer(win, grid, rows, width)
+    draw = view.render
+    apply = lambda event: apply_event((event[0], spot_at(event[1])))
+    cursor = TraceCursor(trace, apply, lambda: clear_search(grid))
+    playback = Playback(cursor.play(), apply, speed)
+    scrub = max(len(trace) // 100, 1)
+    clock = pygame.time.Clock()
+    run = True
+
+    while run:
+        if playback is not None and playback.advance(FRAME_BUDGET):
+            playback = None
+        draw()
+        pygame.display.set_caption(f"Replay - step {cursor.step}/{len(trace)} - speed: {speed_name(speed)}")
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            if view.handle_event(event):
+                continue
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    if playback is not None:
+                        playback = None
+                    else:
+                        if cursor.step == len(trace):
+                            cursor.seek(0)
+                        playback = Playback(cursor.play(), apply, speed)
+                elif event.key == pygame.K_LEFT:
+                    cursor.seek(cursor.step - scrub)
+                elif event.key == pygame.K_RIGHT:
+                    cursor.seek(cursor.step + scrub)
+                elif event.key == pygame.K_HOME:
+                    cursor.seek(0)
+                elif event.key == pygame.K_END:
+                    cursor.seek(len(trace))
+                elif pygame.K_0 <= event.key <= pygame.K_9:
+                    cursor.seek(len(trace) * (event.key - pygame.K_0) // 10)
+                elif event.key in (pygame.K_UP, pygame.K_DOWN):
+                    step = 1 if event.key == pygame.K_UP else -1
+                    speed = min(max(speed + step, 0), len(SPEEDS) - 1)
+                    if playback is not None:
+                        playback.level = speed
+
+    pygame.quit()
+
 def main(win, width):
-    if len(sys.argv) > 2:
-        rows = int(sys.argv[1])  # Read the grid size from command line
-        algorithm = sys.argv[2]  # Read the algorithm choice from command line
+    # "game.py replay TRACE [speed]" plays back a trace from "bfs_solver.py --trace"
+    if len(sys.argv) > 2 and sys.argv[1] == "replay":
+        speed = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_SPEED
+        replay(win, width, SearchTrace.load(sys.argv[2]), speed)
+        return
+
+    # "game.py open DUNGEON [algorithm ...]" starts from a text or binary dungeon
+    # file instead of an empty grid; the grid size comes from the file
+    args = sys.argv[1:]
+    dungeon = None
+    if len(args) > 1 and args[0] == "open":
+        with PROFILER.phase("parse"):
+            dungeon = dungeon_io.read_dungeon(args[1])
+        if dungeon.width != dungeon.height:
+            print(f"game.py only shows square grids; open this {dungeon.width}x{dungeon.height} dungeon with all.py.")
+            return
+        args = [str(dungeon.width)] + args[2:]
+
+    if len(args) > 1:
+        rows = int(args[0])  # Read the grid size from command line
+        algorithm = args[1]  # Read the algorithm choice from command line
     else:
         rows = 10  # Default size
         algorithm = "bfs"  # Default algorithm
+    # Optional A* heuristic and tie-breaking policy, e.g. "game.py 50 astar alt high_g"
+    heuristic = args[2] if len(args) > 2 else "manhattan"
+    tie_break = args[3] if len(args) > 3 else "fifo"
+    # Optional playback speed level from search_events.SPEEDS, e.g. "game.py 500 bfs manhattan fifo 7"
+    speed = int(args[4]) if len(args) > 4 else DEFAULT_SPEED
 
     win = pygame.display.set_mode((width, width))
-    grid = make_grid(rows, width)
+    with PROFILER.phase("grid_build"):
+        grid = make_grid(rows, width)
    
-    # Initialize the start node at the top-left corner of the grid
-    start = grid[0][0]
-    start.make_start()
-    # Initialize the end node at the bottom-right corner of the grid
-    end = grid[rows-1][rows-1]
-    end.make_end()
+        if dungeon is not None:
+            start, end = place_dungeon(grid, dungeon)
+        else:
+            # Initialize the start node at the top-left corner of the grid
+            start = grid[0][0]
+            start.make_start()
+            # Initialize the end node at the bottom-right corner of the grid
+            end = grid[rows-1][rows-1]
+            end.make_end()
     run = True
 
+    # Only spots whose colour changed are repainted each frame
+    Spot.changed = []
+    view = make_renderer(win, grid, rows, width)
+    draw = view.render
+
+    # The LPA* planner and the HPA* clusters outlive a single run; barrier edits are reported to them
+    planner = None
+    hierarchy = None
+
+    # Components of the open spots, kept once a search finds no path so later
+    # hopeless runs are answered at once; only opened spots are merged in
+    components = None
+
+    def barrier_changed(spot):
+        nonlocal components
+        index = spot.row * rows + spot.col
+        if planner is not None:
+            planner.open_cells[index] = not spot.is_barrier()
+            planner.update_cells([index])
+        if hierarchy is not None:
+            hierarchy.open_cells[index] = not spot.is_barrier()
+            hierarchy.update_cells([index])
+        if components is not None:
+            if spot.is_barrier():
+                components = None
+            else:
+                components.open_cells[index] = 1
+                components.cells_opened([index])
+
+    # The running search, played back a frame's worth of events at a time
+    playback = None
+    clock = pygame.time.Clock()
+
+    # Left clicks paint walls, or terrain of this cost once a number key picks one
+    brush = None
+
+    def show_status():
+        brush_name = "walls" if brush is None else f"cost {brush}"
+        pygame.display.set_caption(f"Visualisation - speed: {speed_name(speed)} (up/down to change)"
+                                   f" - brush: {brush_name} (0-{MAX_BRUSH_COST} to change)")
+
+    show_status()
     while run:
-        draw(win, grid, rows, width)
+        if playback is not None and playback.advance(FRAME_BUDGET):
+            PROFILER.report(engine=algorithm, width=rows, height=rows)
+            if not playback.found_path and components is None:
+                open_cells = bytearray(not spot.is_barrier() for row in grid for spot in row)
+                components = reachability.ReachabilityIndex(open_cells, rows, rows)
+            playback = None
+        draw()
+        clock.tick(FPS)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
+            if view.handle_event(event):
+                continue
 
-             # Allow the user to place barriers with left mouse clicks
-            if pygame.mouse.get_pressed()[0]: # LEFT
+             # Allow the user to place barriers, or paint terrain, with left mouse clicks
+             # (the grid can't be edited under a running search)
+            if playback is None and pygame.mouse.get_pressed()[0]: # LEFT
                 pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pos(pos, rows, width)
-                spot = grid[row][col]
-                if spot != start and spot != end:
-                    spot.make_barrier()
+                cell = get_clicked_pos(pos, rows, width, view)
+                spot = None if cell is None else grid[cell[0]][cell[1]]
+                if spot is not None and spot != start and spot != end:
+                    was_barrier = spot.is_barrier()
+                    if brush is None:
+                        spot.make_barrier()
+                    else:
+                        spot.make_terrain(brush)
+                    if spot.is_barrier() != was_barrier:
+                        barrier_changed(spot)
 
             # Allow the user to reset spots with right mouse clicks
-            elif pygame.mouse.get_pressed()[2]: # RIGHT
+            elif playback is None and pygame.mouse.get_pressed()[2]: # RIGHT
                 pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pos(pos, rows, width)
-                spot = grid[row][col]
-                if spot != start and spot != end:
-                    spot.reset()
+                cell = get_clicked_pos(pos, rows, width, view)
+                spot = None if cell is None else grid[cell[0]][cell[1]]
+                if spot is not None and spot != start and spot != end:
+                    was_barrier = spot.is_barrier()
+                    spot.make_terrain(1)
+                    if was_barrier:
+                        barrier_changed(spot)
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and start and end:
-                    for row in grid:
-                        for spot in row:
-                            spot.update_neighbors(grid)
-
-                    if algorithm == "bfs":
-                        bfs_algorithm(lambda: draw(win, grid, rows, width), grid, start, end)
+                if event.key == pygame.K_SPACE and start and end and playback is None:
+                    with PROFILER.phase("grid_build"):
+                        for row in grid:
+                            for spot in row:
+                                spot.update_neighbors(grid)
+
+                    open_cells = grid_cells(grid)
+                    start_index, end_index = start.row * rows + start.col, end.row * rows + end.col
+                    key = result_cache.make_key(
+                        result_cache.grid_digest(open_cells, rows, rows, start_index, end_index),
+                        frontend="game", engine=algorithm, heuristic=heuristic, tie_break=tie_break)
+                    cached = RESULT_CACHE.get(key)
+
+                    search = None
+                    if cached is not None:
+                        search = cached_algorithm(grid, cached)
+                    elif components is not None and not components.connected(start_index, end_index):
+                        search = walled_off_algorithm(grid)
+                    elif algorithm == "bfs":
+                        search = bfs_algorithm(grid, start, end)
                     elif algorithm == "astar":
-                        astar_algorithm(lambda: draw(win, grid, rows, width), grid, start, end)
+                        search = astar_algorithm(grid, start, end, heuristic, tie_break)
+                    elif algorithm == "bibfs":
+                        search = bidirectional_bfs_algorithm(grid, start, end)
+                    elif algorithm == "jps":
+                        search = jps_algorithm(grid, start, end)
+                    elif algorithm == "dial":
+                        search = dial_algorithm(grid, start, end)
+                    elif algorithm == "lpa":
+                        if planner is None:
+                            planner = lpa_solver.LPAStar(open_cells, rows, rows, start_index, end_index)
+                        search = lpa_algorithm(grid, start, end, planner)
+                    elif algorithm == "hpa":
+                        if hierarchy is None:
+                            hierarchy = hpa_solver.HierarchicalPlanner(open_cells, rows, rows)
+                        search = hpa_algorithm(grid, start, end, hierarchy)
+                    if search is not None and cached is None:
+                        search = result_cache.record_path(search, RESULT_CACHE, key,
+                                                          lambda spot: spot.row * rows + spot.col)
+                    if search is not None:
+                        playback = Playback(PROFILER.watch(search), apply_event, speed)
+
+                # Step through the playback speeds, up to "instant"
+                if event.key in (pygame.K_UP, pygame.K_DOWN):
+                    step = 1 if event.key == pygame.K_UP else -1
+                    speed = min(max(speed + step, 0), len(SPEEDS) - 1)
+                    if playback is not None:
+                        playback.level = speed
+                    show_status()
+
+                # Pick the brush: 0 for walls, 1 to MAX_BRUSH_COST for terrain of that cost
+                if pygame.K_0 <= event.key <= pygame.K_0 + MAX_BRUSH_COST:
+                    brush = event.key - pygame.K_0 or None
+                    show_status()
 
                 if event.key == pygame.K_c:
                     # Reset grid but maintain start and end nodes
                     for row in grid:
                         for spot in row:
                             if spot != start and spot != end:
-                                spot.reset()
+                                spot.make_terrain(1)
+                    planner = None
+                    hierarchy = None
+                    components = None
+                    playback = None
 
     pygame.quit()
 
@@ -0,0 +1,147 @@
+import heapq
+from array import array
+from collections import deque
+
+from search_events import CLOSED, OPEN, drive
+
+
+# Cached goal distance field for repeated and multi-start queries.
+#
+# One reverse BFS from the goal stores every cell's distance to it (-1 where
+# the goal can't be reached). After that the shortest path from any start
+# is found by walking downhill, each step to a neighbour exactly one closer,
+# in O(path length) instead of a search over the grid.
+#
+# Cells are indexed ``x * height + y`` and open_cells is read live, like
+# lpa_solver.LPAStar. When cells open, cells_opened() patches the field by
+# lowering distances outward from them, touching only the cells that got
+# closer. Cells that close aren't patched; call invalidate() and the field
+# is rebuilt on the next query. Like bfs_solver.BFS.process, a blocked start
+# still steps off onto its open neighbours, and a blocked goal is only
+# reached by starting on it.
+class GoalField:
+    def __init__(self, open_cells, width, height, goal):
+        self.open_cells = open_cells
+        self.width = width
+        self.height = height
+        self.goal = goal
+        self.distances = None
+
+    def _neighbors(self, cell):
+        x, y = divmod(cell, self.height)
+        cells = []
+        if x < self.width - 1:
+            cells.append(cell + self.height)
+        if y > 0:
+            cells.append(cell - 1)
+        if x > 0:
+            cells.append(cell - self.height)
+        if y < self.height - 1:
+            cells.append(cell + 1)
+        return cells
+
+    def build(self):
+        """Compute the distance field; return the number of cells expanded."""
+        return drive(self.iter_build())
+
+    def iter_build(self):
+        """Like build(), but yields search_events and returns its result."""
+        open_cells = self.open_cells
+        distances = array('i', [-1]) * (self.width * self.height)
+        distances[self.goal] = 0
+        self.distances = distances
+        if not open_cells[self.goal]:
+            return 0
+        queue = deque([self.goal])
+        nodes_expanded = 0
+
+        while queue:
+            current = queue.popleft()
+            nodes_expanded += 1
+            next_distance = distances[current] + 1
+            for neighbor in self._neighbors(current):
+                if open_cells[neighbor] and distances[neighbor] == -1:
+                    distances[neighbor] = next_distance
+                    queue.append(neighbor)
+                    yield OPEN, neighbor
+            yield CLOSED, current
+
+        return nodes_expanded
+
+    def invalidate(self):
+        self.distances = None
+
+    def distance_from(self, start):
+        """Shortest distance from ``start`` to the goal, or None if there is no walk."""
+        if self.distances is None:
+            self.build()
+        if start == self.goal:
+            return 0
+        distance = self.distances[start]
+        if distance == -1:
+            first_step = self._first_step(start)
+            if first_step is None:
+                return None
+            distance = self.distances[first_step] + 1
+        return distance
+
+    def path_from(self, start):
+        """Shortest path from ``start`` to the goal as a list of cells, or None."""
+        if self.distances is None:
+            self.build()
+        distances = self.distances
+        path = [start]
+        cell = start
+        if cell != self.goal and distances[cell] == -1:
+            cell = self._first_step(start)
+            if cell is None:
+                return None
+            path.append(cell)
+
+        while cell != self.goal:
+            closer = distances[cell] - 1
+            for neighbor in self._neighbors(cell):
+                if distances[neighbor] == closer:
+                    cell = neighbor
+                    break
+            path.append(cell)
+        return path
+
+    def _first_step(self, start):
+        # Only a blocked start is off the field yet next to it (a blocked
+        # goal is on the field, but can't be walked through)
+        if self.open_cells[start]:
+            return None
+        distances = self.distances
+        reached = [neighbor for neighbor in self._neighbors(start)
+                   if distances[neighbor] != -1 and self.open_cells[neighbor]]
+        return min(reached, key=distances.__getitem__, default=None)
+
+    def cells_opened(self, cells):
+        """Patch the field after the given cells opened."""
+        if self.distances is None:
+            return
+        distances, open_cells = self.distances, self.open_cells
+        heap = []
+        for cell in cells:
+            if not open_cells[cell]:
+                continue
+            if cell == self.goal:
+                heap.append((0, cell))
+                continue
+            best = min((distances[neighbor] + 1 for neighbor in self._neighbors(cell)
+                        if distances[neighbor] != -1 and open_cells[neighbor]), default=-1)
+            if best != -1 and (distances[cell] == -1 or best < distances[cell]):
+                distances[cell] = best
+                heap.append((best, cell))
+        heapq.heapify(heap)
+
+        # Lower distances outward, nearest first, while they keep improving
+        while heap:
+            distance, cell = heapq.heappop(heap)
+            if distance != distances[cell]:
+                continue  # superseded by a shorter distance
+            for neighbor in self._neighbors(cell):
+                if open_cells[neighbor] and (distances[neighbor] == -1 or distances[neighbor] > distance + 1):
+                    distances[neighbor] = distance + 1
+                    heapq.heappush(heap, (distance + 1, neighbor))
@@ -0,0 +1,316 @@
+import heapq
+
+from search_events import CLOSED, OPEN, drive
+
+CLUSTER_SIZE = 32
+# Entrances at least this wide get a transition at each end instead of one in the middle
+WIDE_ENTRANCE = 6
+
+
+# Hierarchical Path-Finding A* (HPA*) on a 4-connected, unit-cost grid.
+#
+# The grid is cut into CLUSTER_SIZE x CLUSTER_SIZE clusters. Where a border
+# between two clusters has a run of cells open on both sides (an entrance),
+# one or two transitions are placed across it. The transition cells are
+# the nodes of a small abstract graph whose edges are the transitions
+# (cost 1) and the distances between nodes of one cluster, found by a BFS
+# kept inside it. A query links the start and goal into that graph, runs A*
+# over it and then refines the abstract path cluster by cluster, so only
+# the clusters the path crosses are searched cell by cell.
+#
+# Entrances and intra-cluster distances are computed the first time a query
+# needs them and kept; update_cells() drops only the data of the clusters
+# (and borders) an edited cell belongs to. Paths stay within a few percent
+# of the shortest, but aren't guaranteed to be shortest: a path can't
+# cross a border between transitions.
+#
+# Cells are indexed ``x * height + y`` and open_cells is read live, like
+# lpa_solver.LPAStar. Like bfs_solver.BFS.process, a blocked start still
+# steps onto its open neighbours, and a blocked goal is never reached.
+class HierarchicalPlanner:
+    def __init__(self, open_cells, width, height, cluster_size=CLUSTER_SIZE):
+        self.open_cells = open_cells
+        self.width = width
+        self.height = height
+        self.cluster_size = cluster_size
+        # Clusters are numbered cluster_x * cluster_rows + cluster_y
+        self.cluster_rows = -(-height // cluster_size)
+        # (cluster, axis) -> transitions [(cell, cell across)] to the next cluster along x (axis 0) or y (axis 1)
+        self._borders = {}
+        # Transition cell -> cells across the borders it sits on
+        self._partners = {}
+        # Cluster -> {node: [(node, distance), ...]} within the cluster
+        self._edges = {}
+
+    def find_path(self, start, goal, on_open=None, on_expanded=None):
+        """Return ``(path, abstract_nodes_expanded)``; ``path`` lists every cell or is None."""
+        return drive(self.iter_find_path(start, goal), on_open, on_expanded)
+
+    def cluster_of(self, cell):
+        x, y = divmod(cell, self.height)
+        return x // self.cluster_size * self.cluster_rows + y // self.cluster_size
+
+    def _bounds(self, cluster):
+        cluster_x, cluster_y = divmod(cluster, self.cluster_rows)
+        x0, y0 = cluster_x * self.cluster_size, cluster_y * self.cluster_size
+        return x0, min(x0 + self.cluster_size, self.width), y0, min(y0 + self.cluster_size, self.height)
+
+    def _border(self, cluster, axis):
+        # Transitions from cluster to its neighbour along axis, found once per border
+        key = (cluster, axis)
+        transitions = self._borders.get(key)
+        if transitions is not None:
+            return transitions
+        x0, x1, y0, y1 = self._bounds(cluster)
+        height, open_cells = self.height, self.open_cells
+        if axis == 0:
+            pairs = [] if x1 >= self.width else [
+                ((x1 - 1) * height + y, x1 * height + y) for y in range(y0, y1)]
+        else:
+            pairs = [] if y1 >= height else [
+                (x * height + y1 - 1, x * height + y1) for x in range(x0, x1)]
+
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and open_cells[pair[0]] and open_cells[pair[1]]:
+                run.append(pair)
+                continue
+            if len(run) >= WIDE_ENTRANCE:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        for inside, across in transitions:
+            self._partners.setdefault(inside, []).append(across)
+            self._partners.setdefault(across, []).append(inside)
+        self._borders[key] = transitions
+        return transitions
+
+    def _drop_border(self, cluster, axis):
+        for inside, across in self._borders.pop((cluster, axis), ()):
+            for cell, other in ((inside, across), (across, inside)):
+                partners = self._partners[cell]
+                partners.remove(other)
+                if not partners:
+                    del self._partners[cell]
+
+    def _nodes(self, cluster):
+        # Transition cells on this cluster's side of its four borders
+        cluster_x, cluster_y = divmod(cluster, self.cluster_rows)
+        nodes = [inside for inside, _ in self._border(cluster, 0)]
+        nodes += [inside for inside, _ in self._border(cluster, 1)]
+        if cluster_x > 0:
+            nodes += [across for _, across in self._border(cluster - self.cluster_rows, 0)]
+        if cluster_y > 0:
+            nodes += [across for _, across in self._border(cluster - 1, 1)]
+        return list(dict.fromkeys(nodes))
+
+    def _cluster_edges(self, cluster):
+        edges = self._edges.get(cluster)
+        if edges is None:
+            bounds = self._bounds(cluster)
+            adjacency = self._local_graph(bounds)
+            nodes = self._nodes(cluster)
+            local_nodes = [self._to_local(node, bounds) for node in nodes]
+            edges = {}
+            for node, local_node in zip(nodes, local_nodes):
+                distances = _distances(adjacency, local_node)
+                edges[node] = [(other, distances[local_other]) for other, local_other in zip(nodes, local_nodes)
+                               if other != node and distances[local_other] >= 0]
+            self._edges[cluster] = edges
+        return edges
+
+    def _to_local(self, cell, bounds):
+        x, y = divmod(cell, self.height)
+        return (x - bounds[0]) * (bounds[3] - bounds[2]) + y - bounds[2]
+
+    def _to_global(self, index, bounds):
+        x, y = divmod(index, bounds[3] - bounds[2])
+        return (bounds[0] + x) * self.height + bounds[2] + y
+
+    def _local_graph(self, bounds):
+        # Open neighbours of every open cell inside the cluster, in local indices
+        # (x - x0) * cluster height + (y - y0); one copy of the cluster's cells
+        # makes the many searches inside it cheap
+        x0, x1, y0, y1 = bounds
+        rows, height = y1 - y0, self.height
+        local_open = b"".join(bytes(self.open_cells[x * height + y0:x * height + y1]) for x in range(x0, x1))
+        area = len(local_open)
+        adjacency = [()] * area
+        for index in range(area):
+            if local_open[index]:
+                y = index % rows
+                neighbors = []
+                if index + rows < area and local_open[index + rows]:
+                    neighbors.append(index + rows)
+                if y > 0 and local_open[index - 1]:
+                    neighbors.append(index - 1)
+                if index >= rows and local_open[index - rows]:
+                    neighbors.append(index - rows)
+                if y + 1 < rows and local_open[index + 1]:
+                    neighbors.append(index + 1)
+                adjacency[index] = neighbors
+        return adjacency
+
+    def _local_distances(self, source, cluster, targets):
+        # Distances from source to the targets it reaches without leaving cluster
+        bounds = self._bounds(cluster)
+        distances = _distances(self._local_graph(bounds), self._to_local(source, bounds))
+        reached = {}
+        for target in targets:
+            distance = distances[self._to_local(target, bounds)]
+            if distance >= 0:
+                reached[target] = distance
+        return reached
+
+    def _local_path(self, source, target, cluster):
+        bounds = self._bounds(cluster)
+        adjacency = self._local_graph(bounds)
+        source, target = self._to_local(source, bounds), self._to_local(target, bounds)
+        parents = [-1] * len(adjacency)
+        parents[source] = source
+        queue = [source]
+        for current in queue:
+            if current == target:
+                break
+            for neighbor in adjacency[current]:
+                if parents[neighbor] < 0:
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+        path = [target]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return [self._to_global(index, bounds) for index in path]
+
+    def update_cells(self, cells):
+        """Forget the clusters and borders of cells that opened or closed."""
+        for cell in cells:
+            cluster = self.cluster_of(cell)
+            x, y = divmod(cell, self.height)
+            x0, x1, y0, y1 = self._bounds(cluster)
+            self._edges.pop(cluster, None)
+            # A cell on a border changes that border's transitions, and so the node set across it
+            for on_border, owner, axis, other in (
+                    (x == x1 - 1, cluster, 0, cluster + self.cluster_rows),
+                    (x == x0 and x0 > 0, cluster - self.cluster_rows, 0, cluster - self.cluster_rows),
+                    (y == y1 - 1, cluster, 1, cluster + 1),
+                    (y == y0 and y0 > 0, cluster - 1, 1, cluster - 1)):
+                if on_border:
+                    self._drop_border(owner, axis)
+                    self._edges.pop(other, None)
+
+    def iter_find_path(self, start, goal):
+        """Like find_path(), but yields search_events over abstract nodes and returns its result."""
+        if start == goal:
+            return [start], 0
+        if not self.open_cells[goal]:
+            return None, 0
+        height, open_cells = self.height, self.open_cells
+        goal_x, goal_y = divmod(goal, height)
+        goal_cluster = self.cluster_of(goal)
+
+        # Link the goal to the nodes of its cluster...
+        to_goal = self._local_distances(goal, goal_cluster, self._nodes(goal_cluster))
+
+        # ...and the start to the nodes of its own, or, when it's blocked, of its neighbours'
+        if open_cells[start]:
+            sources = [(start, 0)]
+        else:
+            x, y = divmod(start, height)
+            sources = [(neighbor, 1) for neighbor, inside in (
+                (start + height, x + 1 < self.width), (start - 1, y > 0),
+                (start - height, x > 0), (start + 1, y + 1 < height)) if inside and open_cells[neighbor]]
+        # node -> (cost, the source the start leaves through)
+        from_start = {}
+        for source, offset in sources:
+            cluster = self.cluster_of(source)
+            targets = self._nodes(cluster) + ([goal] if cluster == goal_cluster else [])
+            links = list(self._local_distances(source, cluster, targets).items())
+            links += [(across, 1) for across in self._partners.get(source, ())]
+            for node, cost in links:
+                if node != start and offset + cost < from_start.get(node, (offset + cost + 1,))[0]:
+                    from_start[node] = (offset + cost, source)
+
+        def neighbors(node):
+            if node == start:
+                return [(other, cost) for other, (cost, _) in from_start.items()]
+            links = self._cluster_edges(self.cluster_of(node)).get(node, [])
+            links = links + [(across, 1) for across in self._partners.get(node, ())]
+            if node in to_goal:
+                links.append((goal, to_goal[node]))
+            return links
+
+        def heuristic(cell):
+            x, y = divmod(cell, height)
+            return abs(x - goal_x) + abs(y - goal_y)
+
+        # A* over the abstract graph; ties go to the deeper node
+        count = 0
+        open_heap = [(heuristic(start), 0, count, start)]
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        nodes_expanded = 0
+
+        while open_heap:
+            current = heapq.heappop(open_heap)[3]
+            if current in closed:
+                continue  # stale entry left behind by a cheaper push
+            closed.add(current)
+            nodes_expanded += 1
+
+            if current == goal:
+                return self._refine(came_from, start, goal, from_start), nodes_expanded
+
+            for neighbor, cost in neighbors(current):
+                if neighbor in closed:
+                    continue
+                tentative_g = g_score[current] + cost
+                if tentative_g < g_score.get(neighbor, tentative_g + 1):
+                    yield OPEN, neighbor
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    count += 1
+                    heapq.heappush(open_heap, (tentative_g + heuristic(neighbor), -tentative_g, count, neighbor))
+
+            yield CLOSED, current
+
+        return None, nodes_expanded
+
+    def _refine(self, came_from, start, goal, from_start):
+        # Expand the abstract path into cells, one cluster-local search per step
+        nodes = [goal]
+        while nodes[-1] != start:
+            nodes.append(came_from[nodes[-1]])
+        nodes.reverse()
+
+        path = [start]
+        source = from_start[nodes[1]][1]
+        if source != start:
+            path.append(source)
+        for node in nodes[1:]:
+            current = path[-1]
+            if current == node:
+                continue
+            cluster = self.cluster_of(current)
+            if self.cluster_of(node) != cluster:
+                path.append(node)  # a transition across the border
+            else:
+                path += self._local_path(current, node, cluster)[1:]
+        return path
+
+
+def _distances(adjacency, source):
+    distances = [-1] * len(adjacency)
+    distances[source] = 0
+    queue = [source]
+    for current in queue:
+        next_distance = distances[current] + 1
+        for neighbor in adjacency[current]:
+            if distances[neighbor] < 0:
+                distances[neighbor] = next_distance
+                queue.append(neighbor)
+    return distances
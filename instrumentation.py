@@ -0,0 +1,133 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+from search_events import CLOSED, OPEN, PATH
+
+# Search instrumentation.
+#
+# A SearchProfiler sits between a search's event stream (see search_events)
+# and whatever consumes it, and reports every search as one JSON line for
+# monitoring to scrape:
+#
+#   {"timestamp": ..., "mode": "summary", "engine": "astar", "path_length": ...,
+#    "nodes_expanded": ..., "nodes_generated": ..., "peak_frontier": ...,
+#    "duplicate_pushes": ...,
+#    "phases": {"parse": ..., "grid_build": ..., "search": ..., "reconstruction": ...}}
+#
+# nodes_generated counts pushes onto the frontier (open events) and
+# duplicate_pushes the ones for a node that was already on it. Phase times
+# are in seconds: parse and grid_build cover loading the dungeon, search the
+# time spent inside the engine until its first path event, and
+# reconstruction the rest (or, for bfs_solver, building the coordinate
+# path). Only time spent producing events counts, so a search played back
+# over many frames still reports its own cost. "detailed" reports also
+# sample the frontier every SAMPLE_INTERVAL expansions.
+#
+# The mode comes from --profile in bfs_solver.py or the SEARCH_PROFILE
+# environment variable, and the report file from --profile-file or
+# SEARCH_PROFILE_FILE (default: stderr). A disabled profiler hands the
+# event stream back untouched and bfs_solver keeps its plain search loops,
+# so it costs nothing.
+DISABLED, SUMMARY, DETAILED = "disabled", "summary", "detailed"
+MODES = (DISABLED, SUMMARY, DETAILED)
+PHASES = ("parse", "grid_build", "search", "reconstruction")
+SAMPLE_INTERVAL = 1000
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class SearchProfiler:
+    def __init__(self, mode=DISABLED, filename=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.enabled = mode != DISABLED
+        self.filename = filename
+        self._start_record()
+
+    def _start_record(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = {"nodes_expanded": 0, "nodes_generated": 0, "peak_frontier": 0, "duplicate_pushes": 0}
+        self.samples = []
+
+    def phase(self, name):
+        """Context manager adding the time spent in its block to phase ``name``."""
+        if not self.enabled:
+            return _NO_PHASE
+        return self._timed_phase(name)
+
+    @contextlib.contextmanager
+    def _timed_phase(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start_time
+
+    def watch(self, events):
+        """Pass ``events`` through unchanged, counting them, and return their result."""
+        if not self.enabled:
+            return events
+        return self._watch(events)
+
+    def _watch(self, events):
+        counters, phases = self.counters, self.phases
+        detailed = self.mode == DETAILED
+        frontier = set()
+        phase = "search"
+        clock = time.perf_counter
+        while True:
+            start_time = clock()
+            try:
+                event = next(events)
+            except StopIteration as done:
+                phases[phase] += clock() - start_time
+                return done.value
+            kind, node = event
+            if kind == PATH:
+                phase = "reconstruction"
+            phases[phase] += clock() - start_time
+
+            if kind == OPEN:
+                counters["nodes_generated"] += 1
+                if node in frontier:
+                    counters["duplicate_pushes"] += 1
+                else:
+                    frontier.add(node)
+                    if len(frontier) > counters["peak_frontier"]:
+                        counters["peak_frontier"] = len(frontier)
+            elif kind == CLOSED:
+                frontier.discard(node)
+                counters["nodes_expanded"] += 1
+                if detailed and counters["nodes_expanded"] % SAMPLE_INTERVAL == 0:
+                    self.samples.append([counters["nodes_expanded"], len(frontier), round(phases["search"], 6)])
+            yield event
+
+    def report(self, **fields):
+        """Write the searches watched since the last report as one JSON line.
+
+        ``fields`` label the record (engine, grid size, ...) and override the
+        counted ones, e.g. with the engine's own nodes_expanded.
+        """
+        if not self.enabled:
+            return
+        record = {"timestamp": round(time.time(), 3), "mode": self.mode, **self.counters, **fields,
+                  "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()}}
+        if self.mode == DETAILED:
+            record["samples"] = self.samples
+        line = json.dumps(record) + "\n"
+        if self.filename:
+            with open(self.filename, "a") as file:
+                file.write(line)
+        else:
+            sys.stderr.write(line)
+            sys.stderr.flush()
+        self._start_record()
+
+
+def from_environment():
+    """A SearchProfiler set up from SEARCH_PROFILE and SEARCH_PROFILE_FILE."""
+    return SearchProfiler(os.environ.get("SEARCH_PROFILE", DISABLED), os.environ.get("SEARCH_PROFILE_FILE"))
@@ -0,0 +1,130 @@
+import heapq
+
+from search_events import CLOSED, OPEN, drive
+
+
+# Jump Point Search for 4-connected, uniform-cost grids.
+#
+# Cells are indexed ``x * height + y`` and open_cells holds one truthy byte
+# per walkable cell (the same layout as bfs_solver.BFS.reachable). Instead of
+# pushing every cell of an open room, the search jumps in straight lines and
+# only stops at jump points: the goal, cells with a forced neighbour (a side
+# cell that opens up right after a wall), and, when moving along y, cells from
+# which a jump along x reaches such a point. A* then runs over jump points
+# only, with the Manhattan distance as heuristic, so the path length stays
+# optimal.
+#
+# on_open(cell) is called whenever a jump point is pushed onto the open set and
+# on_expanded(cell) after a jump point's successors have been generated.
+def jump_point_search(open_cells, width, height, start, goal, on_open=None, on_expanded=None):
+    """Return ``(path, jump_points_expanded)``; ``path`` lists every cell or is None."""
+    return drive(iter_jump_point_search(open_cells, width, height, start, goal), on_open, on_expanded)
+
+
+def iter_jump_point_search(open_cells, width, height, start, goal):
+    """Like jump_point_search(), but yields search_events and returns its result."""
+    goal_x, goal_y = divmod(goal, height)
+
+    def walkable(x, y):
+        return 0 <= x < width and 0 <= y < height and open_cells[x * height + y]
+
+    def jump_x(x, y, dx):
+        while True:
+            x += dx
+            if not walkable(x, y):
+                return None
+            if x == goal_x and y == goal_y:
+                return x * height + y
+            if (walkable(x, y - 1) and not walkable(x - dx, y - 1)) or \
+                    (walkable(x, y + 1) and not walkable(x - dx, y + 1)):
+                return x * height + y
+
+    def jump_y(x, y, dy):
+        while True:
+            y += dy
+            if not walkable(x, y):
+                return None
+            if x == goal_x and y == goal_y:
+                return x * height + y
+            if (walkable(x - 1, y) and not walkable(x - 1, y - dy)) or \
+                    (walkable(x + 1, y) and not walkable(x + 1, y - dy)):
+                return x * height + y
+            # Moving along y, stop wherever a sideways jump finds something
+            if jump_x(x, y, 1) is not None or jump_x(x, y, -1) is not None:
+                return x * height + y
+
+    def successors(cell):
+        x, y = divmod(cell, height)
+        parent = came_from.get(cell)
+        if parent is None:
+            directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
+        else:
+            parent_x, parent_y = divmod(parent, height)
+            dx = (x > parent_x) - (x < parent_x)
+            dy = (y > parent_y) - (y < parent_y)
+            if dx:
+                directions = ((dx, 0), (0, 1), (0, -1))
+            else:
+                directions = ((0, dy), (1, 0), (-1, 0))
+        for dx, dy in directions:
+            jump_point = jump_x(x, y, dx) if dx else jump_y(x, y, dy)
+            if jump_point is not None:
+                yield jump_point
+
+    def heuristic(cell):
+        x, y = divmod(cell, height)
+        return abs(x - goal_x) + abs(y - goal_y)
+
+    count = 0
+    open_heap = [(heuristic(start), count, start)]
+    g_score = {start: 0}
+    came_from = {}
+    closed = set()
+    jump_points_expanded = 0
+
+    while open_heap:
+        current = heapq.heappop(open_heap)[2]
+        if current in closed:
+            continue  # stale entry left behind by a cheaper push
+        closed.add(current)
+        jump_points_expanded += 1
+
+        if current == goal:
+            return expand_path(came_from, current, height), jump_points_expanded
+
+        x, y = divmod(current, height)
+        for jump_point in successors(current):
+            if jump_point in closed:
+                continue
+            point_x, point_y = divmod(jump_point, height)
+            tentative_g = g_score[current] + abs(point_x - x) + abs(point_y - y)
+            if tentative_g < g_score.get(jump_point, tentative_g + 1):
+                yield OPEN, jump_point
+                came_from[jump_point] = current
+                g_score[jump_point] = tentative_g
+                count += 1
+                heapq.heappush(open_heap, (tentative_g + heuristic(jump_point), count, jump_point))
+
+        yield CLOSED, current
+
+    return None, jump_points_expanded
+
+
+def expand_path(came_from, current, height):
+    # Consecutive jump points share a row or a column; fill in the cells between
+    jump_points = [current]
+    while current in came_from:
+        current = came_from[current]
+        jump_points.append(current)
+    jump_points.reverse()
+
+    path = [jump_points[0]]
+    for cell in jump_points[1:]:
+        x, y = divmod(path[-1], height)
+        end_x, end_y = divmod(cell, height)
+        step_x = (end_x > x) - (end_x < x)
+        step_y = (end_y > y) - (end_y < y)
+        while (x, y) != (end_x, end_y):
+            x, y = x + step_x, y + step_y
+            path.append(x * height + y)
+    return path
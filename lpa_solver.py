@@ -0,0 +1,132 @@
+import heapq
+from array import array
+
+from search_events import CLOSED, OPEN, drive
+
+INF = float("inf")
+
+
+# Lifelong Planning A* (LPA*) for a fixed start and goal on a 4-connected,
+# unit-cost grid whose cells open and close between queries.
+#
+# Cells are indexed ``x * height + y`` and open_cells is read live, so the
+# caller edits it in place and then reports the edited cells through
+# update_cells(). The planner keeps its g/rhs values between queries and the
+# next compute_path() only re-expands the cells whose distance actually
+# changed, instead of searching the whole grid again. The start counts as
+# open even if it is marked blocked, like bfs_solver.BFS.process.
+class LPAStar:
+    def __init__(self, open_cells, width, height, start, goal):
+        self.open_cells = open_cells
+        self.width = width
+        self.height = height
+        self.start = start
+        self.goal = goal
+        self.goal_x, self.goal_y = divmod(goal, height)
+
+        self.g = array('d', [INF]) * (width * height)
+        self.rhs = array('d', [INF]) * (width * height)
+        self.rhs[start] = 0
+        # Current key of every queued cell; heap entries with another key are stale
+        self.queued = {}
+        self.open_heap = []
+        self._push(start)
+
+    def _heuristic(self, cell):
+        x, y = divmod(cell, self.height)
+        return abs(x - self.goal_x) + abs(y - self.goal_y)
+
+    def _key(self, cell):
+        best = min(self.g[cell], self.rhs[cell])
+        return (best + self._heuristic(cell), best)
+
+    def _push(self, cell):
+        key = self._key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.open_heap, (key, cell))
+
+    def _passable(self, cell):
+        return cell == self.start or self.open_cells[cell]
+
+    def _neighbors(self, cell):
+        x, y = divmod(cell, self.height)
+        if x < self.width - 1:
+            yield cell + self.height
+        if y > 0:
+            yield cell - 1
+        if x > 0:
+            yield cell - self.height
+        if y < self.height - 1:
+            yield cell + 1
+
+    def _update_vertex(self, cell):
+        if cell != self.start:
+            best = INF
+            if self._passable(cell):
+                for neighbor in self._neighbors(cell):
+                    if self._passable(neighbor) and self.g[neighbor] + 1 < best:
+                        best = self.g[neighbor] + 1
+            self.rhs[cell] = best
+        if self.g[cell] != self.rhs[cell]:
+            self._push(cell)
+            return True
+        self.queued.pop(cell, None)
+        return False
+
+    def _top(self):
+        # Drop stale heap entries so the top reflects the current queue
+        while self.open_heap:
+            key, cell = self.open_heap[0]
+            if self.queued.get(cell) == key:
+                return key, cell
+            heapq.heappop(self.open_heap)
+        return (INF, INF), None
+
+    def update_cells(self, cells):
+        """Repair the search state after the given cells opened or closed."""
+        for cell in cells:
+            self._update_vertex(cell)
+            for neighbor in self._neighbors(cell):
+                self._update_vertex(neighbor)
+
+    def compute_path(self, on_expanded=None):
+        """Return ``(path, nodes_expanded)``; ``path`` is a list of cells or None."""
+        return drive(self.iter_compute_path(), on_expanded=on_expanded)
+
+    def iter_compute_path(self):
+        """Like compute_path(), but yields search_events and returns its result."""
+        nodes_expanded = 0
+        while True:
+            top_key, cell = self._top()
+            if cell is None or (top_key >= self._key(self.goal) and self.rhs[self.goal] == self.g[self.goal]):
+                break
+            heapq.heappop(self.open_heap)
+            del self.queued[cell]
+            nodes_expanded += 1
+
+            if self.g[cell] > self.rhs[cell]:
+                self.g[cell] = self.rhs[cell]
+            else:
+                self.g[cell] = INF
+                if self._update_vertex(cell):
+                    yield OPEN, cell
+            for neighbor in self._neighbors(cell):
+                if self._update_vertex(neighbor):
+                    yield OPEN, neighbor
+
+            yield CLOSED, cell
+
+        return self.extract_path(), nodes_expanded
+
+    def extract_path(self):
+        if self.g[self.goal] == INF:
+            return None
+        # Walk back from the goal along neighbours exactly one step closer
+        path = [self.goal]
+        cell = self.goal
+        while cell != self.start:
+            cell = min((neighbor for neighbor in self._neighbors(cell) if self._passable(neighbor)),
+                       key=lambda neighbor: self.g[neighbor])
+            path.append(cell)
+        path.reverse()
+        return path
@@ -0,0 +1,118 @@
+from array import array
+from collections import deque
+
+
+# Connected components of the open cells, for "can the goal be reached at
+# all?" without a search.
+#
+# Components are labelled lazily: a cell's component is flood-filled the
+# first time it's asked about, and the labels are joined by union-find, so
+# a query touches only the regions it involves and repeated queries are
+# O(1). Every labelled component is flooded whole, so none borders an
+# unlabelled open cell. When cells open, cells_opened() floods each one that
+# touches a labelled component, merging it with its neighbours' components
+# and whatever unlabelled region it links them to; the others are left for
+# later queries. Cells that close aren't tracked; build a new index instead.
+#
+# Cells are indexed ``x * height + y`` and open_cells is read live, like
+# goal_field.GoalField. Like bfs_solver.BFS.process, a blocked start still
+# steps onto its open neighbours, and a blocked goal is never reached.
+class ReachabilityIndex:
+    def __init__(self, open_cells, width, height):
+        self.open_cells = open_cells
+        self.width = width
+        self.height = height
+        self.labels = array('i', [-1]) * (width * height)
+        # Union-find over labels: parent label and component size
+        self.parents = array('i')
+        self.sizes = array('i')
+
+    def _neighbors(self, cell):
+        x, y = divmod(cell, self.height)
+        cells = []
+        if x < self.width - 1:
+            cells.append(cell + self.height)
+        if y > 0:
+            cells.append(cell - 1)
+        if x > 0:
+            cells.append(cell - self.height)
+        if y < self.height - 1:
+            cells.append(cell + 1)
+        return cells
+
+    def _new_label(self):
+        self.parents.append(len(self.parents))
+        self.sizes.append(0)
+        return len(self.parents) - 1
+
+    def _find(self, label):
+        parents = self.parents
+        root = label
+        while parents[root] != root:
+            root = parents[root]
+        while parents[label] != root:
+            parents[label], label = root, parents[label]
+        return root
+
+    def _union(self, first, second):
+        first, second = self._find(first), self._find(second)
+        if first == second:
+            return first
+        if self.sizes[first] < self.sizes[second]:
+            first, second = second, first
+        self.parents[second] = first
+        self.sizes[first] += self.sizes[second]
+        return first
+
+    def _flood(self, cell):
+        # Label the unlabelled region around cell, joining any labelled one it touches
+        open_cells, labels = self.open_cells, self.labels
+        label = self._new_label()
+        labels[cell] = label
+        queue = deque([cell])
+        count = 0
+        while queue:
+            current = queue.popleft()
+            count += 1
+            for neighbor in self._neighbors(current):
+                if not open_cells[neighbor]:
+                    continue
+                if labels[neighbor] == -1:
+                    labels[neighbor] = label
+                    queue.append(neighbor)
+                elif labels[neighbor] != label:
+                    self._union(label, labels[neighbor])
+        root = self._find(label)
+        self.sizes[root] += count
+        return root
+
+    def component(self, cell):
+        """Component id of an open cell (equal ids are connected), or None if it's blocked."""
+        if not self.open_cells[cell]:
+            return None
+        if self.labels[cell] == -1:
+            return self._flood(cell)
+        return self._find(self.labels[cell])
+
+    def connected(self, start, goal):
+        """Whether a walk from ``start`` can reach ``goal``."""
+        if start == goal:
+            return True
+        if self.component(goal) is None:
+            return False
+        starts = [start] if self.open_cells[start] else self._neighbors(start)
+        for cell in starts:
+            # Flooding cell may merge it into the goal's component, so look that up after
+            label = self.component(cell)
+            if label is not None and label == self.component(goal):
+                return True
+        return False
+
+    def cells_opened(self, cells):
+        """Merge the components joined by the given newly opened cells."""
+        open_cells, labels = self.open_cells, self.labels
+        for cell in cells:
+            if not open_cells[cell] or labels[cell] != -1:
+                continue
+            if any(labels[neighbor] != -1 for neighbor in self._neighbors(cell)):
+                self._flood(cell)
@@ -0,0 +1,224 @@
+import math
+from array import array
+from operator import attrgetter
+
+import pygame
+
+try:
+    import numpy
+except ImportError:  # changed cells are set on the surface one at a time instead
+    numpy = None
+
+# Colour key for the transparent parts of the cached grid-line overlay
+OVERLAY_KEY = (255, 0, 255)
+
+# Cells narrower than this many pixels are drawn by PixelArrayRenderer
+MIN_CELL_SIZE = 4
+# Pixels per cell at the highest zoom, and once grid lines are drawn
+MAX_ZOOM = 32
+GRID_LINE_ZOOM = 8
+# Zoom factor per mouse-wheel notch
+ZOOM_STEP = 1.25
+# Colour of the window outside the grid
+BACKGROUND = (64, 64, 64)
+
+
+# Dirty-rectangle renderer for the pygame visualizers.
+#
+# Spots append themselves to a shared ``changed`` list whenever their colour
+# changes. Each frame only those cells are filled, the cached grid-line
+# overlay is blitted back over them, and pygame.display.update() is given
+# just their rectangles, so a frame costs O(changed cells) instead of a full
+# redraw of every spot and grid line. draw_lines(surface) draws the grid
+# lines; the visualizers pass their existing draw_grid function.
+class DirtyRectRenderer:
+    def __init__(self, win, grid, changed, draw_lines):
+        self.win = win
+        self.grid = grid
+        self.changed = changed
+        width, height = win.get_size()
+        self.lines = pygame.Surface((width, height))
+        self.lines.fill(OVERLAY_KEY)
+        self.lines.set_colorkey(OVERLAY_KEY)
+        draw_lines(self.lines)
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Repaint the whole window on the next frame."""
+        self.full_redraw = True
+
+    def handle_event(self, event):
+        """Every cell has a fixed place on screen, so no event changes the view."""
+        return False
+
+    def render(self):
+        if self.full_redraw:
+            for row in self.grid:
+                for spot in row:
+                    spot.draw(self.win)
+            self.win.blit(self.lines, (0, 0))
+            pygame.display.update()
+            self.changed.clear()
+            self.full_redraw = False
+            return
+
+        if not self.changed:
+            return
+        rects = []
+        for spot in dict.fromkeys(self.changed):
+            rect = pygame.Rect(spot.x, spot.y, spot.width, getattr(spot, "height", spot.width))
+            self.win.fill(spot.color, rect)
+            self.win.blit(self.lines, rect, area=rect)
+            rects.append(rect)
+        self.changed.clear()
+        pygame.display.update(rects)
+
+
+# Pixel-array renderer for grids too fine for a rectangle per spot.
+#
+# Every cell is one pixel of an off-screen surface, and with NumPy its
+# colour is also kept as one mapped 32-bit value in a compact array (16 MB
+# for 2000x2000 cells). Changed spots only write their value, and the
+# bounding box of a frame's changes is copied onto the surface with
+# pygame.surfarray.blit_array; the part of the grid in view is then scaled
+# with pygame.transform.scale and blitted in one go. A frame costs its
+# changed cells plus one scaled blit, whatever the grid size, and frames
+# where nothing changed cost nothing. Without NumPy changed cells are set
+# on the surface one at a time.
+#
+# The view zooms around the pointer with the mouse wheel, pans with a
+# middle-button drag or W/A/S/D, and F fits the whole grid again; grid lines
+# appear once cells are GRID_LINE_ZOOM pixels wide. grid[i][j] is drawn at
+# x = i, y = j (game.py), or at x = j, y = i when ``transposed`` (all.py).
+class PixelArrayRenderer:
+    def __init__(self, win, grid, changed, line_color, transposed=False):
+        self.win = win
+        self.grid = grid
+        self.changed = changed
+        self.line_color = line_color
+        self.transposed = transposed
+        # Screen position (x, y) of a spot's cell
+        self.position = attrgetter("col", "row") if transposed else attrgetter("row", "col")
+        self.columns, self.rows = (len(grid[0]), len(grid)) if transposed else (len(grid), len(grid[0]))
+        self.cells = pygame.Surface((self.columns, self.rows), 0, 32)
+        self.pixels = None
+        self.fit()
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Repaint the whole window on the next frame."""
+        self.full_redraw = True
+
+    def fit(self):
+        """Zoom out to show the whole grid."""
+        width, height = self.win.get_size()
+        self.min_zoom = min(width / self.columns, height / self.rows)
+        self.zoom = self.min_zoom
+        self.left = self.top = 0.0
+        self.moved = True
+
+    def zoom_at(self, factor, pos):
+        """Zoom by factor, keeping the cell under pos where it is."""
+        x, y = self.left + pos[0] / self.zoom, self.top + pos[1] / self.zoom
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), max(MAX_ZOOM, self.min_zoom))
+        self.pan(x - pos[0] / self.zoom - self.left, y - pos[1] / self.zoom - self.top)
+
+    def pan(self, dx, dy):
+        """Move the view by dx, dy cells, stopping at the edges of the grid."""
+        width, height = self.win.get_size()
+        self.left = min(max(self.left + dx, 0.0), max(self.columns - width / self.zoom, 0.0))
+        self.top = min(max(self.top + dy, 0.0), max(self.rows - height / self.zoom, 0.0))
+        self.moved = True
+
+    def handle_event(self, event):
+        """Zoom or pan on a mouse-wheel, middle-drag or W/A/S/D/F event; True if it was one."""
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom_at(ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+        elif event.type == pygame.MOUSEMOTION and event.buttons[1]:
+            self.pan(-event.rel[0] / self.zoom, -event.rel[1] / self.zoom)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d):
+            # A quarter of the window per press
+            width, height = self.win.get_size()
+            step_x, step_y = width / 4 / self.zoom, height / 4 / self.zoom
+            self.pan({pygame.K_a: -step_x, pygame.K_d: step_x}.get(event.key, 0.0),
+                     {pygame.K_w: -step_y, pygame.K_s: step_y}.get(event.key, 0.0))
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+            self.fit()
+        else:
+            return False
+        return True
+
+    def cell_at(self, pos):
+        """The (i, j) of the grid spot under window position pos, or None outside the grid."""
+        (x0, y0, x1, y1), offset, size = self._layout()
+        # The pixel transform.scale drew there
+        x = x0 + (pos[0] - offset[0]) * (x1 - x0) // size[0]
+        y = y0 + (pos[1] - offset[1]) * (y1 - y0) // size[1]
+        if not (pos[0] >= offset[0] and pos[1] >= offset[1] and x < x1 and y < y1):
+            return None
+        return (y, x) if self.transposed else (x, y)
+
+    def _layout(self):
+        # The cells in view (including the partly visible ones at the edges),
+        # and where and how big they are drawn
+        width, height = self.win.get_size()
+        x0, y0 = int(self.left), int(self.top)
+        x1 = min(math.ceil(self.left + width / self.zoom), self.columns)
+        y1 = min(math.ceil(self.top + height / self.zoom), self.rows)
+        offset = (round((x0 - self.left) * self.zoom), round((y0 - self.top) * self.zoom))
+        size = (max(round((x1 - x0) * self.zoom), 1), max(round((y1 - y0) * self.zoom), 1))
+        return (x0, y0, x1, y1), offset, size
+
+    def render(self):
+        if self.full_redraw:
+            self._paint_all()
+            self.changed.clear()
+            self.full_redraw = False
+        elif self.changed:
+            self._paint_changed()
+            self.changed.clear()
+        elif not self.moved:
+            return
+        self.moved = False
+        self._show()
+
+    def _paint_all(self):
+        map_rgb = self.cells.map_rgb
+        if numpy is None:
+            for row in self.grid:
+                for spot in row:
+                    self.cells.set_at(self.position(spot), spot.color)
+            return
+        values = array('I', [map_rgb(spot.color) for row in self.grid for spot in row])
+        pixels = numpy.frombuffer(values, dtype=numpy.uint32).reshape(len(self.grid), len(self.grid[0]))
+        # surfarray indexes pixels [x, y]
+        self.pixels = numpy.ascontiguousarray(pixels.T) if self.transposed else pixels
+        pygame.surfarray.blit_array(self.cells, self.pixels)
+
+    def _paint_changed(self):
+        spots = dict.fromkeys(self.changed)
+        if numpy is None:
+            for spot in spots:
+                self.cells.set_at(self.position(spot), spot.color)
+            return
+        map_rgb = self.cells.map_rgb
+        xs, ys = numpy.array([self.position(spot) for spot in spots]).T
+        self.pixels[xs, ys] = [map_rgb(spot.color) for spot in spots]
+        x0, x1, y0, y1 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+        pygame.surfarray.blit_array(self.cells.subsurface((x0, y0, x1 - x0, y1 - y0)), self.pixels[x0:x1, y0:y1])
+
+    def _show(self):
+        (x0, y0, x1, y1), offset, size = self._layout()
+        view = pygame.transform.scale(self.cells.subsurface((x0, y0, x1 - x0, y1 - y0)), size)
+        self.win.fill(BACKGROUND)
+        self.win.blit(view, offset)
+        if self.zoom >= GRID_LINE_ZOOM:
+            # On the first pixel of each scaled cell
+            right, bottom = offset[0] + size[0], offset[1] + size[1]
+            for x in range(x0, x1 + 1):
+                line_x = offset[0] + -(-(x - x0) * size[0] // (x1 - x0))
+                pygame.draw.line(self.win, self.line_color, (line_x, offset[1]), (line_x, bottom))
+            for y in range(y0, y1 + 1):
+                line_y = offset[1] + -(-(y - y0) * size[1] // (y1 - y0))
+                pygame.draw.line(self.win, self.line_color, (offset[0], line_y), (right, line_y))
+        pygame.display.update()
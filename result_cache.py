@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from search_events import PATH
+
+# Content-addressed cache of finished searches.
+#
+# A result is filed under a key hashed from the grid itself (size, start,
+# goal and every cell's open/blocked byte) and the settings that shape the
+# answer (algorithm, heuristic, removal budget, ...), so resubmitting an
+# identical dungeon, whatever its file name, or re-running an unchanged grid
+# in a visualizer returns the stored result instead of searching again.
+# Results are JSON-ready dicts; the most recent CACHE_SIZE stay in memory
+# and, given a directory, every result is also kept on disk as
+# ``<key>.json`` for later runs. bfs_solver.py and batch_solver.py take the
+# directory from --cache-dir, and game.py and all.py from the
+# SEARCH_CACHE_DIR environment variable. game.py and all.py store different
+# results (a found flag and a summary message), so each puts its name in
+# its keys as ``frontend`` to keep a shared directory's entries apart.
+CACHE_SIZE = 256
+
+
+def grid_digest(open_cells, width, height, start, goal):
+    """Hex digest identifying a grid's contents, start and goal."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{width}x{height}:{start}:{goal}:".encode())
+    digest.update(open_cells)
+    return digest.hexdigest()
+
+
+def make_key(grid, **settings):
+    """Cache key for the search described by ``settings`` on the grid with digest ``grid``."""
+    text = json.dumps([grid, settings], sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, capacity=CACHE_SIZE, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """The result stored under ``key``, or None."""
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        elif self.directory:
+            try:
+                with open(self._filename(key)) as file:
+                    result = json.load(file)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logging.warning("Ignoring unreadable cached result %s: %s", key, e)
+            if result is not None:
+                self._remember(key, result)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store ``result``, a JSON-ready dict, under ``key``."""
+        self._remember(key, result)
+        if self.directory:
+            # Write then rename, so a reader never sees half a file
+            filename = self._filename(key)
+            temporary = f"{filename}.{os.getpid()}.tmp"
+            try:
+                with open(temporary, "w") as file:
+                    json.dump(result, file)
+                os.replace(temporary, filename)
+            except OSError as e:
+                logging.warning("Could not store cached result %s: %s", key, e)
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def record_path(events, cache, key, encode):
+    """Pass a search's events through and cache its path and result when it finishes.
+
+    The path is stored as the nodes of its path events, in order, each
+    passed through encode() to make it JSON-ready.
+    """
+    path = []
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as done:
+            cache.put(key, {"path": path, "result": done.value})
+            return done.value
+        if event[0] == PATH:
+            path.append(encode(event[1]))
+        yield event
+
+
+def replay_path(result, decode):
+    """Yield the path events of a result cached by record_path() and return its result."""
+    for node in result["path"]:
+        yield PATH, decode(node)
+    return result["result"]
+
+
+_shared = {}
+
+
+def shared_cache(directory=None):
+    """This process's cache for ``directory``, created on first use."""
+    if directory not in _shared:
+        _shared[directory] = ResultCache(directory=directory)
+    return _shared[directory]
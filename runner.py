@@ -2,13 +2,15 @@ from customtkinter import *
 from tkinter import messagebox
 import subprocess
 
+from search_events import DEFAULT_SPEED, SPEEDS, speed_name
+
 def main():
     window = CTk()
     window.title("Rescuing the Princess | Visualizer")
     window.configure(bg="#242424")
   # Set the geometry of the Tkinter window
     app_width = 420
-    app_height = 260
+    app_height = 320
     # Get the screen dimensions
     screen_width = window.winfo_screenwidth()
     screen_height = window.winfo_screenheight()
@@ -19,19 +21,28 @@ def main():
     window.resizable(0, 0)
 
     label1 = CTkLabel(window, text="Algorithm", fg_color="transparent", font=("calibri", 15), text_color="#00FF89")
-    label1.place(relx=0.5, rely=0.15, anchor=CENTER)
+    label1.place(relx=0.5, rely=0.12, anchor=CENTER)
 
     choice = StringVar()
-    combobox1 = CTkComboBox(window, values=["BFS Algorithm", "A* Algorithm"], variable=choice, state="readonly", button_color="#00FF89")
+    combobox1 = CTkComboBox(window, values=["BFS Algorithm", "A* Algorithm", "Bidirectional BFS", "Jump Point Search", "LPA* (incremental)", "HPA* (hierarchical)", "Dial (tile costs)"], variable=choice, state="readonly", button_color="#00FF89")
     combobox1.set("A* Algorithm")
-    combobox1.place(relx=0.5, rely=0.30, anchor=CENTER)
+    combobox1.place(relx=0.5, rely=0.24, anchor=CENTER)
 
     label2 = CTkLabel(window, text="Grid Dimension", fg_color="transparent", font=("calibri", 15), text_color="#FF0099")
-    label2.place(relx=0.5, rely=0.50, anchor=CENTER)
+    label2.place(relx=0.5, rely=0.40, anchor=CENTER)
 
     gridDimension = StringVar()
     entryGridDimension = CTkEntry(window, textvariable=gridDimension, width=120, placeholder_text="e.g., 10x10")
-    entryGridDimension.place(relx=0.5, rely=0.65, anchor=CENTER)
+    entryGridDimension.place(relx=0.5, rely=0.52, anchor=CENTER)
+
+    # Playback speed of the search, from one event per frame up to "instant"
+    speed_label = CTkLabel(window, text=f"Speed: {speed_name(DEFAULT_SPEED)}", fg_color="transparent", font=("calibri", 15), text_color="#00FF89")
+    speed_label.place(relx=0.5, rely=0.66, anchor=CENTER)
+
+    speed_slider = CTkSlider(window, from_=0, to=len(SPEEDS) - 1, number_of_steps=len(SPEEDS) - 1, button_color="#FF0099",
+                             command=lambda value: speed_label.configure(text=f"Speed: {speed_name(round(value))}"))
+    speed_slider.set(DEFAULT_SPEED)
+    speed_slider.place(relx=0.5, rely=0.76, anchor=CENTER)
 
     def parse_grid_dimensions(dim_str):
         parts = dim_str.split('x')
@@ -55,15 +66,15 @@ def main():
         algorithm_choice = choice.get()
         if grid_dims:
             # Map the combobox choice to the corresponding algorithm name expected by the Pygame script.
-            algorithm_name = "astar" if algorithm_choice == "A* Algorithm" else "bfs"
-            # Start the Pygame script with the grid size and the algorithm as command line arguments.
-            subprocess.Popen(['python', 'game.py', str(grid_dims[0]), algorithm_name])
+            algorithm_name = {"A* Algorithm": "astar", "Bidirectional BFS": "bibfs", "Jump Point Search": "jps", "LPA* (incremental)": "lpa", "HPA* (hierarchical)": "hpa", "Dial (tile costs)": "dial"}.get(algorithm_choice, "bfs")
+            # Start the Pygame script with the grid size, the algorithm and the speed as command line arguments.
+            subprocess.Popen(['python', 'game.py', str(grid_dims[0]), algorithm_name, 'manhattan', 'fifo', str(round(speed_slider.get()))])
         else:
             messagebox.showerror("Error", "Invalid grid dimensions. Please enter a square grid dimension like '10x10'.")
 
 
     submit_button = CTkButton(window, text="Start", command=runner, font=('calibri', 12, 'bold'))
-    submit_button.place(relx=0.5, rely=0.85, anchor=CENTER)
+    submit_button.place(relx=0.5, rely=0.90, anchor=CENTER)
 
     window.mainloop()
 
@@ -0,0 +1,91 @@
+import time
+
+# Search events.
+#
+# The engines in astar_solver, jps_solver and lpa_solver, and the visualizer
+# algorithms in game.py and all.py, are generators that yield ``(kind, node)``
+# events and return their result when they finish:
+#   open   - a node was pushed onto the open set (or the BFS queue); it is
+#            pushed again when a cheaper route to it turns up
+#   closed - a node has been expanded
+#   path   - a node lies on the final path, yielded from the goal backwards
+# Running the search is then separate from showing it: drive() consumes the
+# events straight away for headless callers, and Playback applies them a
+# frame's worth at a time so the pygame loop stays responsive.
+OPEN = "open"
+CLOSED = "closed"
+PATH = "path"
+
+
+def drive(events, on_open=None, on_expanded=None):
+    """Run an event generator to the end, calling the callbacks; return its result."""
+    while True:
+        try:
+            kind, node = next(events)
+        except StopIteration as done:
+            return done.value
+        if kind == OPEN:
+            if on_open:
+                on_open(node)
+        elif kind == CLOSED and on_expanded:
+            on_expanded(node)
+
+
+def map_events(events, convert):
+    """Yield ``events`` with convert() applied to every node; return their result."""
+    while True:
+        try:
+            kind, node = next(events)
+        except StopIteration as done:
+            return done.value
+        yield kind, convert(node)
+
+
+# Target frame rate of the visualizers, and the speed levels they step through:
+# the number of events applied per frame, None meaning as many as fit in the
+# frame budget ("instant")
+FPS = 60
+# Seconds of each frame spent applying events; the rest is left for drawing
+FRAME_BUDGET = 0.75 / FPS
+SPEEDS = (1, 4, 16, 64, 256, 1024, 4096, None)
+DEFAULT_SPEED = 2
+
+
+def speed_name(level):
+    speed = SPEEDS[level]
+    return "instant" if speed is None else f"{speed} events/frame"
+
+
+class Playback:
+    """Applies the events of a running search a frame's worth at a time."""
+
+    # How many events to apply between clock checks
+    CLOCK_INTERVAL = 64
+
+    def __init__(self, events, apply, level=DEFAULT_SPEED):
+        self.events = events
+        self.apply = apply
+        self.level = level
+        self.finished = False
+        self.result = None
+        # Whether the search has shown a path, i.e. found one
+        self.found_path = False
+
+    def advance(self, budget):
+        """Apply up to one frame's events within ``budget`` seconds; return True once finished."""
+        limit = SPEEDS[self.level]
+        deadline = time.perf_counter() + budget
+        applied = 0
+        try:
+            while limit is None or applied < limit:
+                event = next(self.events)
+                self.apply(event)
+                if event[0] == PATH:
+                    self.found_path = True
+                applied += 1
+                if applied % self.CLOCK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                    break
+        except StopIteration as done:
+            self.finished = True
+            self.result = done.value
+        return self.finished
@@ -0,0 +1,150 @@
+import struct
+import sys
+import zlib
+from array import array
+
+from search_events import CLOSED, OPEN, PATH, drive
+
+# Binary search traces.
+#
+# A trace is the event stream of one search (see search_events) plus what is
+# needed to show it without the dungeon file: the grid size, start, goal and
+# open cells. Cells are indexed ``x * height + y`` like bfs_solver.BFS, which
+# is ``row * cols + col`` for the visualizer grids. Events are stored as two
+# packed arrays, one kind byte and one little-endian uint32 cell per event,
+# and the body is zlib-compressed, so a search over millions of cells can be
+# recorded once on a server and replayed or scrubbed anywhere.
+#
+# File layout: HEADER, then zlib(open cells | kinds | cells).
+MAGIC = b"DTRC"
+VERSION = 1
+HEADER = struct.Struct("<4sB16sIIIIII")
+KINDS = (OPEN, CLOSED, PATH)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+
+class SearchTrace:
+    def __init__(self, width, height, start, goal, open_cells, engine=""):
+        self.width = width
+        self.height = height
+        self.start = start
+        self.goal = goal
+        self.open_cells = bytes(open_cells)
+        self.engine = engine
+        self.nodes_expanded = 0
+        self.kinds = bytearray()
+        self.cells = array('I')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def record(self, events):
+        """Store every event of a search, then its path; return the search's ``(path, nodes_expanded)``."""
+        kinds, cells = self.kinds, self.cells
+        open_code, closed_code = KIND_CODES[OPEN], KIND_CODES[CLOSED]
+
+        def on_open(cell):
+            kinds.append(open_code)
+            cells.append(cell)
+
+        def on_expanded(cell):
+            kinds.append(closed_code)
+            cells.append(cell)
+
+        path, self.nodes_expanded = drive(events, on_open, on_expanded)
+        if path is not None:
+            # Like the visualizers, the path is shown from the goal back to the start
+            for cell in reversed(path):
+                kinds.append(KIND_CODES[PATH])
+                cells.append(cell)
+        return path, self.nodes_expanded
+
+    def event(self, step):
+        return KINDS[self.kinds[step]], self.cells[step]
+
+    def events(self, start=0, stop=None):
+        """Yield the ``(kind, cell)`` events from step ``start`` up to ``stop``."""
+        for step in range(start, len(self) if stop is None else stop):
+            yield KINDS[self.kinds[step]], self.cells[step]
+
+    def last_events(self, step):
+        """Return ``{cell: kind}`` for the last event of every cell before ``step``."""
+        last = {}
+        for kind, cell in zip(self.kinds[:step], self.cells[:step]):
+            last[cell] = kind
+        return {cell: KINDS[kind] for cell, kind in last.items()}
+
+    def path(self):
+        """Return the recorded path from start to goal as cells, or None."""
+        code = KIND_CODES[PATH]
+        path = [cell for kind, cell in zip(self.kinds, self.cells) if kind == code]
+        path.reverse()
+        return path or None
+
+    def save(self, filename):
+        cells = array('I', self.cells)
+        if sys.byteorder == "big":
+            cells.byteswap()
+        with open(filename, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.engine.encode()[:16], self.width, self.height,
+                                   self.start, self.goal, self.nodes_expanded, len(self)))
+            file.write(zlib.compress(self.open_cells + bytes(self.kinds) + cells.tobytes()))
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "rb") as file:
+            header = file.read(HEADER.size)
+            body = file.read()
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError(f"{filename} is not a search trace")
+        _, version, engine, width, height, start, goal, nodes_expanded, num_events = HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError(f"{filename} is a version {version} search trace, expected version {VERSION}")
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as error:
+            raise ValueError(f"{filename} has a corrupt search trace body: {error}") from error
+        size = width * height
+        if len(body) != size + 5 * num_events:
+            raise ValueError(f"{filename} has a truncated search trace body")
+
+        trace = cls(width, height, start, goal, body[:size], engine.rstrip(b"\0").decode())
+        trace.nodes_expanded = nodes_expanded
+        trace.kinds = bytearray(body[size:size + num_events])
+        trace.cells.frombytes(body[size + num_events:])
+        if sys.byteorder == "big":
+            trace.cells.byteswap()
+        return trace
+
+
+class TraceCursor:
+    """A position in a trace that can be played forwards or moved to any step.
+
+    apply((kind, cell)) shows one event and clear() wipes every event colour
+    off the grid. ``step`` counts the events currently shown.
+    """
+
+    def __init__(self, trace, apply, clear):
+        self.trace = trace
+        self.apply = apply
+        self.clear = clear
+        self.step = 0
+
+    def seek(self, step):
+        step = min(max(step, 0), len(self.trace))
+        if step < self.step:
+            # Going back: redraw only the last event of each cell up to ``step``
+            self.clear()
+            for cell, kind in self.trace.last_events(step).items():
+                self.apply((kind, cell))
+        else:
+            for event in self.trace.events(self.step, step):
+                self.apply(event)
+        self.step = step
+
+    def play(self):
+        """Yield the events from the current step on; follows seek() while running."""
+        while self.step < len(self.trace):
+            event = self.trace.event(self.step)
+            self.step += 1
+            yield event
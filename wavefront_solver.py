@@ -0,0 +1,161 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:  # the standard-library level loop is used instead
+    numpy = None
+
+from search_events import CLOSED, OPEN
+
+# Layers of at least this many cells are expanded with NumPy
+VECTOR_LAYER = 256
+
+
+# Level-synchronous ("wavefront") BFS for 4-connected, unit-cost grids.
+#
+# Instead of popping one cell at a time, a whole BFS layer is expanded per
+# step with array operations: the frontier is an array of cell indices in
+# queue order, its neighbours are the frontier shifted by +height, -1,
+# -height and +1 (the order of bfs_solver.BFS.get_adjacent_cells), and the
+# visited set is one boolean per cell. Keeping the first discovery of
+# every cell in that order gives each cell the same parent, the same queue
+# order and so the same path and nodes-expanded count as BFS.process, at
+# array-op speed instead of a Python loop per cell. Without NumPy, and for
+# layers too thin to be worth NumPy's per-call cost (all of a maze's), the
+# same layers are built by a plain loop.
+#
+# Cells are indexed ``x * height + y`` and open_cells holds one truthy byte
+# per walkable cell. Like BFS.process, a blocked start still steps onto its
+# open neighbours, and a blocked goal is only reached by starting on it.
+def wavefront_search(open_cells, width, height, start, goal):
+    """Return ``(path, nodes_expanded)``; ``path`` lists every cell or is None."""
+    if start == goal:
+        return [start], 1
+    layers = _layers(open_cells, width, height, start)
+    parents = next(layers)
+    nodes_expanded = 0
+    for layer, discovered in layers:
+        if _contains(discovered, goal):
+            # BFS.process pops the rest of this layer, then the next one up to the goal
+            return _path(parents, start, goal), nodes_expanded + len(layer) + _position(discovered, goal) + 1
+        nodes_expanded += len(layer)
+    return None, nodes_expanded
+
+
+def iter_wavefront_search(open_cells, width, height, start, goal):
+    """Like wavefront_search(), but yields search_events layer by layer and returns its result.
+
+    Yielding every cell costs a Python step per cell again, so this is only
+    meant for traces and profiling.
+    """
+    if start == goal:
+        return [start], 1
+    layers = _layers(open_cells, width, height, start)
+    parents = next(layers)
+    nodes_expanded = 0
+    for layer, discovered in layers:
+        if _contains(discovered, goal):
+            return _path(parents, start, goal), nodes_expanded + len(layer) + _position(discovered, goal) + 1
+        for cell in discovered:
+            yield OPEN, int(cell)
+        for cell in layer:
+            yield CLOSED, int(cell)
+        nodes_expanded += len(layer)
+    return None, nodes_expanded
+
+
+def distance_field(open_cells, width, height, source):
+    """BFS distance from ``source`` to every cell as an array('i'), -1 where unreachable."""
+    distances = array('i', [-1]) * (width * height)
+    if numpy is not None:
+        view = numpy.frombuffer(distances, dtype=numpy.int32)
+    layers = _layers(open_cells, width, height, source)
+    next(layers)
+    distances[source] = 0
+    distance = 0
+    for _, discovered in layers:
+        distance += 1
+        if isinstance(discovered, list):
+            for cell in discovered:
+                distances[cell] = distance
+        else:
+            view[discovered] = distance
+    return distances
+
+
+def _layers(open_cells, width, height, start):
+    # Yields the parent array first, then (layer, next layer) per BFS step in
+    # queue order, filling in the parents of the next layer as it goes.
+    # Layers under VECTOR_LAYER cells (all of a maze's) are cheaper to expand
+    # with a plain loop than to pay NumPy's per-call overhead for; both ways
+    # work on the same bytearray and array, NumPy through views of them.
+    size = width * height
+    parents = array('q', [-1]) * size
+    visited = bytearray(size)
+    yield parents
+
+    visited[start] = 1
+    last_column, bottom = (width - 1) * height, height - 1
+    if numpy is not None:
+        passable = numpy.frombuffer(open_cells, dtype=numpy.uint8) != 0
+        seen = numpy.frombuffer(visited, dtype=bool)
+        parent_view = numpy.frombuffer(parents, dtype=numpy.int64)
+    layer = [start]
+    while len(layer):
+        if numpy is None or len(layer) < VECTOR_LAYER:
+            discovered = []
+            for cell in (layer if isinstance(layer, list) else layer.tolist()):
+                y = cell % height
+                for neighbor, inside in ((cell + height, cell < last_column), (cell - 1, y > 0),
+                                         (cell - height, cell >= height), (cell + 1, y < bottom)):
+                    if inside and open_cells[neighbor] and not visited[neighbor]:
+                        visited[neighbor] = 1
+                        parents[neighbor] = cell
+                        discovered.append(neighbor)
+        else:
+            layer = numpy.asarray(layer, dtype=numpy.int64)
+            y = layer % height
+            neighbors = numpy.empty((len(layer), 4), dtype=numpy.int64)
+            neighbors[:, 0] = layer + height
+            neighbors[:, 1] = layer - 1
+            neighbors[:, 2] = layer - height
+            neighbors[:, 3] = layer + 1
+            inside = numpy.empty((len(layer), 4), dtype=bool)
+            inside[:, 0] = layer < last_column
+            inside[:, 1] = y > 0
+            inside[:, 2] = layer >= height
+            inside[:, 3] = y < bottom
+
+            # Positions in (frontier cell, direction) order of every new neighbour
+            positions = numpy.flatnonzero(inside.ravel())
+            cells = neighbors.ravel()[positions]
+            fresh = passable[cells] & ~seen[cells]
+            positions, cells = positions[fresh], cells[fresh]
+            # Keep each cell's first discovery, in discovery order
+            cells, first = numpy.unique(cells, return_index=True)
+            order = numpy.argsort(first, kind="stable")
+            discovered, first = cells[order], first[order]
+            seen[discovered] = True
+            parent_view[discovered] = layer[positions[first] // 4]
+        yield layer, discovered
+        layer = discovered
+
+
+def _contains(discovered, cell):
+    if isinstance(discovered, list):
+        return cell in discovered
+    return bool((discovered == cell).any())
+
+
+def _position(discovered, cell):
+    if isinstance(discovered, list):
+        return discovered.index(cell)
+    return int(numpy.flatnonzero(discovered == cell)[0])
+
+
+def _path(parents, start, goal):
+    path = [goal]
+    while path[-1] != start:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return path